@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import Counter
+
+from mlflow.tracking import MlflowClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mlops_pipeline", "scripts"))
+
+from mlflow_batch import BatchLogger
+
+
+class CountingClient:
+    # Stand-in for the remote tracking server: counts every store call and adds a fixed
+    # round-trip delay on top of the local file store.
+
+    def __init__(self, client, rtt_ms):
+        self._client = client
+        self._rtt = rtt_ms / 1000
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            self.calls[name] += 1
+            time.sleep(self._rtt)
+            return attr(*args, **kwargs)
+        return wrapper
+
+
+def workload(n_metrics, n_params, n_tags):
+    metrics = [(f"metric_{i}", float(i)) for i in range(n_metrics)]
+    params = [(f"param_{i}", str(i)) for i in range(n_params)]
+    tags = [(f"tag_{i}", str(i)) for i in range(n_tags)]
+    return metrics, params, tags
+
+
+def run_naive(client, run_id, metrics, params, tags):
+    for key, value in metrics:
+        client.log_metric(run_id, key, value)
+    for key, value in params:
+        client.log_param(run_id, key, value)
+    for key, value in tags:
+        client.set_tag(run_id, key, value)
+
+
+def run_batched(client, run_id, metrics, params, tags):
+    with BatchLogger(client, run_id) as batch_logger:
+        for key, value in metrics:
+            batch_logger.log_metric(key, value)
+        for key, value in params:
+            batch_logger.log_param(key, value)
+        for key, value in tags:
+            batch_logger.set_tag(key, value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round-trips: per-call MLflow logging vs BatchLogger")
+    parser.add_argument("--metrics", type=int, default=150, help="~ train.py in search mode + evaluate.py")
+    parser.add_argument("--params", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=25)
+    parser.add_argument("--versions", type=int, default=50, help="registered versions for the promote lookup")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="simulated tracking server round-trip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MlflowClient(tracking_uri=f"file:{tmp}/mlruns", registry_uri=f"file:{tmp}/mlruns")
+        experiment_id = store.create_experiment("bench")
+        metrics, params, tags = workload(args.metrics, args.params, args.tags)
+
+        print(f"{'mode':<10} {'round_trips':>12} {'seconds':>9}")
+        for name, fn in (("naive", run_naive), ("batched", run_batched)):
+            run_id = store.create_run(experiment_id).info.run_id
+            client = CountingClient(store, args.rtt_ms)
+            start = time.perf_counter()
+            fn(client, run_id, metrics, params, tags)
+            seconds = time.perf_counter() - start
+
+            logged = store.get_run(run_id).data
+            assert len(logged.metrics) == args.metrics and len(logged.params) == args.params
+            print(f"{name:<10} {sum(client.calls.values()):>12} {seconds:>9.2f}")
+
+        store.create_registered_model("BenchModel")
+        for _ in range(args.versions):
+            store.create_model_version("BenchModel", source=f"{tmp}/artifacts", run_id=run_id)
+
+        client = CountingClient(store, args.rtt_ms)
+        everything = client.search_model_versions("name='BenchModel'")
+        newest = max(everything, key=lambda v: int(v.version))
+        top = client.search_model_versions("name='BenchModel'", max_results=1, order_by=["version_number DESC"])
+        assert top[0].version == newest.version
+        print(f"promote lookup: {len(everything)} versions listed before, {len(top)} fetched now "
+              f"(newest = v{top[0].version})")
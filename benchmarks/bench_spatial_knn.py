@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mlops_pipeline", "scripts"))
+
+import datagen
+from spatial_knn import SpatialKNNRegressor
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def single_row_latency(model, rows, warmup=50):
+    # One-row DataFrames, as app.py / inference.py hand them to predict
+    for row in rows[:warmup]:
+        model.predict(row)
+    latencies = np.empty(len(rows) - warmup)
+    for i, row in enumerate(rows[warmup:]):
+        start = time.perf_counter()
+        model.predict(row)
+        latencies[i] = time.perf_counter() - start
+    return np.percentile(latencies * 1000, [50, 99])
+
+
+def artifact(model, tmp):
+    path = os.path.join(tmp, "model.pkl")
+    joblib.dump(model, path)
+    return os.path.getsize(path) / 1e6, best_of(lambda: joblib.load(path), 3) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query latency of the spatial kNN model vs linear regression")
+    parser.add_argument("--index-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--trees", nargs="+", default=["kd_tree", "ball_tree"])
+    parser.add_argument("--n-neighbors", type=int, default=10)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    queries = datagen.frame(max(args.single_rows + 50, args.batch_rows), rng)
+    rows = [queries[datagen.FEATURE_COLUMNS].iloc[[i]] for i in range(args.single_rows + 50)]
+    batch = queries[datagen.FEATURE_COLUMNS].iloc[:args.batch_rows]
+
+    print(f"{'index':>9} {'model':<20} {'fit_s':>7} {'p50_ms':>7} {'p99_ms':>7} {'batch_us/row':>12} "
+          f"{'artifact_mb':>11} {'load_ms':>8} {'rmse':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.index_sizes:
+            train = datagen.frame(size, rng)
+            X, y = train[datagen.FEATURE_COLUMNS], train[datagen.TARGET_COLUMN]
+            models = {"linear": LinearRegression()}
+            for tree in args.trees:
+                models[f"spatial_knn/{tree}"] = SpatialKNNRegressor(n_neighbors=args.n_neighbors, tree=tree)
+
+            for name, model in models.items():
+                start = time.perf_counter()
+                model.fit(X, y)
+                fit_s = time.perf_counter() - start
+
+                p50, p99 = single_row_latency(model, rows)
+                batch_s = best_of(lambda: model.predict(batch), args.repeat)
+                size_mb, load_ms = artifact(model, tmp)
+                rmse = float(np.sqrt(np.mean((model.predict(queries[datagen.FEATURE_COLUMNS])
+                                              - queries[datagen.TARGET_COLUMN]) ** 2)))
+
+                print(f"{size:>9} {name:<20} {fit_s:>7.2f} {p50:>7.3f} {p99:>7.3f} "
+                      f"{batch_s / len(batch) * 1e6:>12.2f} {size_mb:>11.2f} {load_ms:>8.1f} {rmse:>7.2f}")
@@ -0,0 +1,80 @@
+import csv
+import json
+from io import StringIO
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import FEATURE_COLUMNS, TARGET as TARGET_COLUMN
+
+
+def features(n, rng, shift=0.0):
+    # Same ranges as the real estate dataset; `shift` moves the distance/age columns for drifted data
+    return np.column_stack([
+        rng.uniform(2012.6, 2013.6, n),
+        rng.uniform(0, 45, n) * (1 + shift),
+        rng.uniform(20, 6500, n) * (1 + 2 * shift),
+        rng.integers(0, 11, n).astype(np.float64),
+        rng.uniform(24.93, 25.02, n),
+        rng.uniform(121.47, 121.57, n),
+    ])
+
+
+def target(X, rng):
+    coef = np.array([5.0, -0.27, -0.0045, 1.1, 225.0, -12.0])
+    return X @ coef + rng.normal(0, 7.5, len(X)) - 8000
+
+
+def frame(n, rng, shift=0.0):
+    X = features(n, rng, shift)
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    df[TARGET_COLUMN] = target(X, rng)
+    return df
+
+
+def json_payload(rows):
+    return json.dumps({"data": rows.tolist()})
+
+
+def csv_payload(rows):
+    buf = StringIO()
+    csv.writer(buf).writerows(rows.tolist())
+    return buf.getvalue()
+
+
+def prediction_records(n, rng):
+    # Records as lambda_api_wrapper/main.py logs them, in every payload/prediction shape the
+    # monitoring job has to normalise
+    X = features(n, rng).round(4).tolist()
+    y = target(np.asarray(X), rng).round(3).tolist()
+    start = datetime(2024, 1, 1)
+    records = []
+    for i, (row, pred) in enumerate(zip(X, y)):
+        shape = i % 4
+        records.append({
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "request_id": f"req-{i}",
+            "features": {"data": [row]} if shape < 2 else [row] if shape == 2 else row,
+            "prediction": [pred] if shape != 1 else [[pred]],
+        })
+    return records
+
+
+def evidently_report(n_features=6, rng=None):
+    # Shape of Report(metrics=[DataDriftPreset()]).as_dict() as consumed by drift_history.rows_from_report
+    rng = rng or np.random.default_rng(0)
+    columns = FEATURE_COLUMNS[:n_features] + ["prediction"]
+    drift_by_columns = {c: {"column_name": c, "column_type": "num", "stattest_name": "K-S p_value",
+                            "stattest_threshold": 0.05, "drift_score": float(rng.uniform()),
+                            "drift_detected": bool(rng.uniform() < 0.3)} for c in columns}
+    drifted = sum(v["drift_detected"] for v in drift_by_columns.values())
+    return {"metrics": [
+        {"metric": "DatasetDriftMetric",
+         "result": {"drift_share": 0.5, "number_of_columns": len(columns), "number_of_drifted_columns": drifted,
+                    "share_of_drifted_columns": drifted / len(columns), "dataset_drift": drifted / len(columns) >= 0.5}},
+        {"metric": "DataDriftTable",
+         "result": {"number_of_columns": len(columns), "number_of_drifted_columns": drifted,
+                    "share_of_drifted_columns": drifted / len(columns), "dataset_drift": drifted / len(columns) >= 0.5,
+                    "drift_by_columns": drift_by_columns}},
+    ]}
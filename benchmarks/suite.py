@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.linear_model import LinearRegression
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for path in ("terraform", os.path.join("mlops_pipeline", "scripts"), "monitoring"):
+    sys.path.insert(0, os.path.join(ROOT, path))
+
+import datagen
+import app as serving_app
+import inference
+from records import records_to_frame
+from drift_history import DriftHistory, rows_from_report
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Context:
+    def __init__(self, seed, batch_rows, record_sizes):
+        self.rng = np.random.default_rng(seed)
+        self.batch_rows = batch_rows
+        self.record_sizes = record_sizes
+
+        train = datagen.frame(5_000, self.rng)
+        self.model = LinearRegression().fit(train[datagen.FEATURE_COLUMNS], train[datagen.TARGET_COLUMN])
+        serving_app.model = self.model
+        self.client = serving_app.app.test_client()
+
+        self.single = datagen.features(1, self.rng).round(4)
+        self.batch = datagen.features(batch_rows, self.rng).round(4)
+        self.reference = datagen.frame(batch_rows, self.rng)
+        self.current = datagen.frame(batch_rows, self.rng, shift=0.2)
+        self.report = datagen.evidently_report(rng=self.rng)
+
+
+def build_cases(ctx):
+    # name -> (group, items per call, setup); setup() prepares the case's data and returns the timed
+    # zero-arg callable, so large inputs (1M records) only exist while their own case runs
+    cases = {}
+
+    single_json, batch_json = datagen.json_payload(ctx.single), datagen.json_payload(ctx.batch)
+    batch_csv = datagen.csv_payload(ctx.batch)
+
+    def post(body, content_type):
+        def call():
+            resp = ctx.client.post("/invocations", data=body, content_type=content_type)
+            assert resp.status_code == 200, resp.data
+        return lambda: call
+
+    cases["app_predict_single_json"] = ("serving", 1, post(single_json, "application/json"))
+    cases["app_predict_batch_json"] = ("serving", ctx.batch_rows, post(batch_json, "application/json"))
+    cases["app_predict_batch_csv"] = ("serving", ctx.batch_rows, post(batch_csv, "text/csv"))
+
+    def handlers(body, content_type):
+        return lambda: lambda: inference.output_fn(
+            inference.predict_fn(inference.input_fn(body, content_type), ctx.model), "application/json")
+
+    def parse(body, content_type):
+        return lambda: lambda: inference.input_fn(body, content_type)
+
+    cases["inference_single_json"] = ("scoring", 1, handlers(single_json, "application/json"))
+    cases["inference_batch_json"] = ("scoring", ctx.batch_rows, handlers(batch_json, "application/json"))
+    cases["inference_batch_csv"] = ("scoring", ctx.batch_rows, handlers(batch_csv, "text/csv"))
+    cases["parse_single_json"] = ("parsing", 1, parse(single_json, "application/json"))
+    cases["parse_single_csv"] = ("parsing", 1, parse(datagen.csv_payload(ctx.single), "text/csv"))
+    cases["parse_batch_json"] = ("parsing", ctx.batch_rows, parse(batch_json, "application/json"))
+    cases["parse_batch_csv"] = ("parsing", ctx.batch_rows, parse(batch_csv, "text/csv"))
+
+    def encode(rows):
+        prediction = ctx.model.predict(pd.DataFrame(rows, columns=datagen.FEATURE_COLUMNS))
+        return lambda: lambda: inference.output_fn(prediction, "application/json")
+
+    cases["encode_single"] = ("parsing", 1, encode(ctx.single))
+    cases["encode_batch"] = ("parsing", ctx.batch_rows, encode(ctx.batch))
+
+    def normalize(n):
+        def setup():
+            records = datagen.prediction_records(n, np.random.default_rng(n))
+            return lambda: records_to_frame(records, datagen.FEATURE_COLUMNS, "prediction")
+        return setup
+
+    for n in ctx.record_sizes:
+        cases[f"normalize_records_{n}"] = ("monitoring", n, normalize(n))
+
+    cases["drift_rows_from_report"] = ("drift", ctx.batch_rows, lambda: lambda: rows_from_report(
+        ctx.report, ctx.current, datagen.FEATURE_COLUMNS))
+
+    def history_append():
+        with tempfile.TemporaryDirectory() as tmp, DriftHistory(os.path.join(tmp, "h.sqlite")) as history:
+            rows = rows_from_report(ctx.report, ctx.current, datagen.FEATURE_COLUMNS)
+            for day in range(30):
+                history.append(f"2024-01-{day + 1:02d}", rows)
+    cases["drift_history_append_30d"] = ("drift", 30, lambda: history_append)
+
+    try:
+        from evidently.report import Report
+        from evidently.metric_preset import DataDriftPreset
+
+        def evidently_drift():
+            report = Report(metrics=[DataDriftPreset()])
+            report.run(reference_data=ctx.reference[datagen.FEATURE_COLUMNS],
+                       current_data=ctx.current[datagen.FEATURE_COLUMNS])
+            return report.as_dict()
+        cases["drift_evidently_preset"] = ("drift", ctx.batch_rows, lambda: evidently_drift)
+    except ImportError:
+        pass  # monitoring image dependency; the case shows up as "missing" against a baseline that has it
+
+    return cases
+
+
+def measure(fn, repeat, min_time):
+    # Each sample loops the call until it takes at least `min_time`, so fast cases aren't timer noise
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= max(2, min(10, int(min_time / max(elapsed, 1e-9)) + 1))
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return samples, loops
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor(),
+            "numpy": np.__version__, "pandas": pd.__version__, "sklearn": sklearn.__version__}
+
+
+def compare(results, baseline, tolerance, overrides, report_missing=True):
+    # A case regresses when its median is slower than the baseline's by more than its tolerance
+    rows = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            rows.append((name, None, "new"))
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        limit = 1 + overrides.get(name, tolerance)
+        rows.append((name, ratio, "REGRESSION" if ratio > limit else "faster" if ratio < 1 / limit else "ok"))
+    if report_missing:
+        rows.extend((name, None, "missing") for name in baseline.get("results", {}) if name not in results)
+    return rows
+
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, _, tolerance = value.partition("=")
+        overrides[name] = float(tolerance)
+    return overrides
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serving, scoring and monitoring hot-path benchmarks")
+    parser.add_argument("--filter", type=str, default="", help="Only run cases whose name contains this")
+    parser.add_argument("--batch-rows", type=int, default=1_000)
+    parser.add_argument("--record-sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per sample")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown vs baseline (0.15 = 15%%)")
+    parser.add_argument("--case-tolerance", action="append", metavar="NAME=TOL",
+                        help="Per-case tolerance override, e.g. app_predict_single_json=0.3")
+    parser.add_argument("--output-json", type=str)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # app.py scores unnamed frames; sklearn warns on every call
+    logging.disable(logging.INFO)  # per-request INFO lines; their message formatting is still timed
+
+    ctx = Context(args.seed, args.batch_rows, args.record_sizes)
+    cases = {k: v for k, v in build_cases(ctx).items() if args.filter in k}
+
+    results = {}
+    print(f"{'case':<28} {'group':<11} {'median_ms':>10} {'min_ms':>9} {'us/item':>9} {'loops':>6}")
+    for name, (group, items, setup) in cases.items():
+        samples, loops = measure(setup(), args.repeat, args.min_time)
+        median = float(np.median(samples))
+        results[name] = {"group": group, "items": items, "median_s": median, "min_s": min(samples),
+                         "per_item_us": median / items * 1e6, "loops": loops, "samples": samples}
+        print(f"{name:<28} {group:<11} {median * 1e3:>10.3f} {min(samples) * 1e3:>9.3f} "
+              f"{median / items * 1e6:>9.2f} {loops:>6}")
+
+    run = {"timestamp": datetime.utcnow().isoformat(), "environment": environment(),
+           "config": {"batch_rows": args.batch_rows, "record_sizes": args.record_sizes, "seed": args.seed},
+           "results": results}
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(run, f, indent=2)
+
+    baseline = None
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != run["environment"]:
+            print(f"Warning: baseline was recorded on {baseline.get('environment')}")
+        print(f"\nvs baseline {args.baseline} ({baseline.get('timestamp')}), tolerance {args.tolerance:.0%}")
+        for name, ratio, status in compare(results, baseline, args.tolerance, parse_overrides(args.case_tolerance),
+                                           report_missing=not args.filter):
+            print(f"{name:<28} {'' if ratio is None else f'{ratio:.2f}x':>7}  {status}")
+            if status == "REGRESSION":
+                regressions.append(name)
+    elif not args.save_baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+
+    if args.save_baseline:
+        if args.filter and baseline:
+            # A filtered run only refreshes its own cases
+            run["results"] = {**baseline["results"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
@@ -1,43 +1,284 @@
-import boto3
+import os
+import sys
 import json
-import random
 import time
+import random
+import argparse
+import threading
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-REGION = "eu-north-1"
-PROJECT_NAME = "mlops-real-estate"
+import boto3
 
-lambda_client = boto3.client("lambda", region_name=REGION)
-functions = lambda_client.list_functions()
-inference_fn_name = next(
-    (f["FunctionName"] for f in functions["Functions"]
-     if f["FunctionName"].startswith("InferenceLambda") and PROJECT_NAME in f["FunctionName"]),
-    None
-)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mlops_pipeline", "scripts"))
+from feature_schema import FEATURE_COLUMNS
 
-if not inference_fn_name:
-    print("❌ Не знайдено Inference Lambda. Перевірте ім'я в консолі.")
-    exit(1)
+REGION = "eu-north-1"
+PROJECT_NAME = "mlops-real-estate"
 
-print(f"🚀 Sending traffic to: {inference_fn_name}...")
 
-for i in range(15):
-    payload = {
-        "data": [[
+def random_records(count, interval):
+    # The original generator: uniform random rows every `interval` seconds
+    for i in range(count):
+        yield {"offset": i * interval, "rows": [[
             2013.5 + random.uniform(0, 1),  # Transaction date
             random.uniform(5, 50),          # House age
             random.uniform(100, 2000),      # Distance to MRT
             random.randint(1, 10),          # Convenience stores
             24.9 + random.uniform(0, 0.1),  # Latitude
             121.5 + random.uniform(0, 0.1)  # Longitude
-        ]]
-    }
-
-    response = lambda_client.invoke(
-        FunctionName=inference_fn_name,
-        InvocationType='Event',
-        Payload=json.dumps(payload)
-    )
-    print(f"Request {i+1}: Sent. Status: {response['StatusCode']}")
-    time.sleep(0.5)
-
-print("✅ Traffic generation complete. Logs should be in S3.")
\ No newline at end of file
+        ]]}
+
+
+def parse_record(raw):
+    # Accepts the API wrapper's prediction logs ({"timestamp", "features": {"data": [[...]]}, ...}),
+    # request payloads ({"data": [[...]]}) and bare rows
+    features = raw.get("features", raw) if isinstance(raw, dict) else raw
+    if isinstance(features, dict):
+        features = features.get("data")
+    if not isinstance(features, list) or not features:
+        return None
+    rows = features if isinstance(features[0], list) else [features]
+    timestamp = raw.get("timestamp") if isinstance(raw, dict) else None
+    if timestamp:
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    return {"timestamp": timestamp, "rows": rows}
+
+
+def iter_jsonl(path):
+    # Streamed line by line, so a whole day of compacted logs never sits in memory
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_directory(path):
+    # e.g. `aws s3 sync s3://<bucket>/monitoring/predictions/2024-05-01/ ./day`
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(".json"):
+                with open(os.path.join(root, name)) as f:
+                    yield json.load(f)
+            elif name.endswith(".jsonl"):
+                yield from iter_jsonl(os.path.join(root, name))
+
+
+def iter_s3(uri):
+    bucket, _, prefix = uri.replace("s3://", "", 1).partition("/")
+    s3 = boto3.client("s3", region_name=REGION)
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            body = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read().decode("utf-8")
+            if obj["Key"].endswith(".jsonl"):
+                yield from (json.loads(line) for line in body.splitlines() if line.strip())
+            elif obj["Key"].endswith(".json"):
+                yield json.loads(body)
+
+
+def recorded_records(source, rate):
+    # -> records with `offset` = recorded seconds since the first request (or 1/rate spacing)
+    if source.startswith("s3://"):
+        raw, ordered = iter_s3(source), False
+    elif os.path.isdir(source):
+        raw, ordered = iter_directory(source), False
+    else:
+        raw, ordered = iter_jsonl(source), True
+
+    records = (r for r in map(parse_record, raw) if r)
+    if not ordered:
+        # one object per request, listed in key (uuid) order: sort by the recorded timestamp
+        records = iter(sorted(records, key=lambda r: r["timestamp"] or 0))
+
+    first = None
+    for i, record in enumerate(records):
+        if rate or record["timestamp"] is None:
+            record["offset"] = i / (rate or 1.0)
+        else:
+            first = record["timestamp"] if first is None else first
+            record["offset"] = record["timestamp"] - first
+        yield record
+
+
+class Shift:
+    # FEATURE=op:value[,op:value...] with op in add / scale / noise (gaussian std) / set;
+    # FEATURE is a column name, X1..X6 or a 0-based index
+    OPS = ("add", "scale", "noise", "set")
+
+    def __init__(self, spec):
+        feature, _, ops = spec.partition("=")
+        self.index = self._index(feature.strip())
+        self.ops = []
+        for part in ops.split(","):
+            op, _, value = part.partition(":")
+            if op not in self.OPS:
+                raise argparse.ArgumentTypeError(f"Unknown shift op '{op}' in '{spec}', expected one of {self.OPS}")
+            self.ops.append((op, float(value)))
+
+    @staticmethod
+    def _index(feature):
+        if feature.isdigit():
+            return int(feature)
+        for i, name in enumerate(FEATURE_COLUMNS):
+            if feature == name or feature == name.split()[0]:
+                return i
+        raise argparse.ArgumentTypeError(f"Unknown feature '{feature}'")
+
+    def apply(self, row, strength, rng):
+        # strength in [0, 1] scales every op, so a ramp moves the distribution gradually
+        value = row[self.index]
+        for op, amount in self.ops:
+            if op == "add":
+                value += amount * strength
+            elif op == "scale":
+                value *= 1 + (amount - 1) * strength
+            elif op == "noise":
+                value += rng.gauss(0, amount * strength)
+            elif strength >= 1:
+                value = amount
+        row[self.index] = value
+
+
+def shift_strength(offset, start, ramp):
+    if offset < start:
+        return 0.0
+    return 1.0 if ramp <= 0 else min(1.0, (offset - start) / ramp)
+
+
+def lambda_sender(args):
+    client = boto3.client("lambda", region_name=REGION)
+    function_name = args.function_name
+    if not function_name:
+        functions = client.get_paginator("list_functions").paginate()
+        function_name = next(
+            (f["FunctionName"] for page in functions for f in page["Functions"]
+             if f["FunctionName"].startswith("InferenceLambda") and PROJECT_NAME in f["FunctionName"]),
+            None
+        )
+        if not function_name:
+            print("❌ Не знайдено Inference Lambda. Перевірте ім'я в консолі.")
+            exit(1)
+
+    def send(payload):
+        response = client.invoke(FunctionName=function_name, InvocationType=args.invocation_type,
+                                 Payload=json.dumps(payload))
+        if args.invocation_type == "Event":
+            return response["StatusCode"] == 202
+        return response["StatusCode"] == 200 and "FunctionError" not in response
+    return send, function_name
+
+
+def http_sender(args):
+    def send(payload):
+        request = urllib.request.Request(args.url, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status == 200
+    return send, args.url
+
+
+def local_sender(args):
+    # In-process SageMaker handler contract (inference.py), no server or network involved
+    import inference
+
+    model = inference.model_fn(args.model_dir)
+
+    def send(payload):
+        data = inference.input_fn(json.dumps(payload), "application/json")
+        inference.output_fn(inference.predict_fn(data, model), "application/json")
+        return True
+    return send, f"inference.py ({args.model_dir})"
+
+
+SENDERS = {"lambda": lambda_sender, "http": http_sender, "local": local_sender}
+
+
+def replay(records, send, args):
+    shifts = args.shift
+    rng = random.Random(args.seed)
+    stats = {"sent": 0, "errors": 0, "shifted": 0, "max_lag_s": 0.0}
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(args.concurrency * 4)
+
+    def fire(payload):
+        try:
+            ok = send(payload)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            ok = False
+        with lock:
+            stats["sent"] += 1
+            stats["errors"] += 0 if ok else 1
+            if args.verbose or stats["sent"] % args.progress_every == 0:
+                print(f"Request {stats['sent']}: {'Sent' if ok else 'Failed'}. Errors so far: {stats['errors']}")
+        in_flight.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for i, record in enumerate(records):
+            if args.limit and i >= args.limit:
+                break
+            due = start + record["offset"] / args.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            stats["max_lag_s"] = max(stats["max_lag_s"], -delay)
+
+            strength = shift_strength(record["offset"], args.shift_start, args.shift_ramp) if shifts else 0.0
+            rows = [list(row) for row in record["rows"]]
+            if strength > 0:
+                for row in rows:
+                    for shift in shifts:
+                        shift.apply(row, strength, rng)
+                stats["shifted"] += 1
+
+            in_flight.acquire()
+            executor.submit(fire, {"data": rows})
+
+    stats["elapsed_s"] = time.perf_counter() - start
+    stats["rate"] = stats["sent"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate or replay inference traffic, optionally with drift")
+    parser.add_argument("--source", default="random",
+                        help="'random', a .jsonl file, a directory of logged .json requests or an s3:// prefix")
+    parser.add_argument("--count", type=int, default=15, help="Requests for --source random")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between requests for --source random")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (60 = an hour per minute)")
+    parser.add_argument("--rate", type=float, help="Ignore recorded timestamps and send at this many req/s")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--target", choices=sorted(SENDERS), default="lambda")
+    parser.add_argument("--function-name", type=str, help="Inference Lambda (discovered by name when omitted)")
+    parser.add_argument("--invocation-type", choices=["Event", "RequestResponse"], default="Event")
+    parser.add_argument("--url", default="http://localhost:8080/invocations")
+    parser.add_argument("--model-dir", default="/opt/ml/model", help="model.pkl location for --target local")
+    parser.add_argument("--shift", type=Shift, action="append", default=[], metavar="FEATURE=OP:VALUE",
+                        help="Per-feature drift, e.g. 'X3=scale:1.5' or 'X2=add:10,noise:2' (repeatable)")
+    parser.add_argument("--shift-start", type=float, default=0.0,
+                        help="Recorded seconds after which the shift applies")
+    parser.add_argument("--shift-ramp", type=float, default=0.0,
+                        help="Recorded seconds over which the shift ramps from 0 to full strength")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--progress-every", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true", help="Print every request")
+    args = parser.parse_args()
+
+    if args.source == "random":
+        records = random_records(args.count, args.interval)
+        args.verbose = args.verbose or args.count <= args.progress_every
+    else:
+        records = recorded_records(args.source, args.rate)
+
+    send, target = SENDERS[args.target](args)
+    print(f"🚀 Sending traffic to: {target}...")
+
+    stats = replay(records, send, args)
+    print(f"✅ {stats['sent']} requests in {stats['elapsed_s']:.1f}s ({stats['rate']:.1f} req/s), "
+          f"{stats['errors']} errors, {stats['shifted']} shifted, max schedule lag {stats['max_lag_s']:.2f}s")
+    if args.target == "lambda":
+        print("Logs should be in S3.")
@@ -4,20 +4,34 @@ import json
 import logging
 import uuid
 import time
+import random
 from datetime import datetime
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Per-request lines (the whole event, each S3 log write) are DEBUG; set LOG_LEVEL=DEBUG to see them
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
 runtime_client = boto3.client('sagemaker-runtime')
 s3_client = boto3.client('s3')
 cw_client = boto3.client('cloudwatch')
+sm_client = boto3.client('sagemaker')
+lambda_client = boto3.client('lambda')
 
 ENDPOINT_NAME = os.environ.get('ENDPOINT_NAME')
 MONITORING_BUCKET = os.environ.get('MONITORING_BUCKET')
 MONITORING_PREFIX = os.environ.get('MONITORING_PREFIX', 'monitoring/predictions/')
 METRICS_NAMESPACE = "RealEstate/Inference"
 
+# Shadow mode: a sample of requests is mirrored to the challenger variant (weight 0) and both
+# answers are logged side by side for monitoring/shadow.py. The mirrored call runs in an asynchronous
+# invocation of this function, so a sampled request only pays for one Invoke call, not the challenger.
+SHADOW_VARIANT = os.environ.get('SHADOW_VARIANT', 'Shadow')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_PREFIX = os.environ.get('SHADOW_PREFIX', 'monitoring/shadow/')
+ENDPOINT_CACHE_SECONDS = 60
+
+_endpoint_cache = {"expires": 0.0, "config_name": None, "variants": []}
+
 
 def log_payload_to_s3(features, prediction, request_id):
     if not MONITORING_BUCKET:
@@ -42,7 +56,7 @@ def log_payload_to_s3(features, prediction, request_id):
             Body=json.dumps(log_data),
             ContentType='application/json'
         )
-        logger.info(f"Logged prediction to s3://{MONITORING_BUCKET}/{s3_key}")
+        logger.debug(f"Logged prediction to s3://{MONITORING_BUCKET}/{s3_key}")
 
     except Exception as e:
         logger.error(f"Failed to log to S3: {str(e)}")
@@ -88,8 +102,99 @@ def push_metrics_to_cw(latency_ms, prediction_value):
         logger.error(f"Failed to push metrics to CloudWatch: {e}")
 
 
+def endpoint_variants():
+    # Cached per container so only one DescribeEndpoint per minute is paid for shadow detection
+    now = time.time()
+    if now >= _endpoint_cache["expires"]:
+        try:
+            desc = sm_client.describe_endpoint(EndpointName=ENDPOINT_NAME)
+            _endpoint_cache["config_name"] = desc.get("EndpointConfigName")
+            _endpoint_cache["variants"] = [v["VariantName"] for v in desc.get("ProductionVariants", [])]
+        except Exception as e:
+            logger.error(f"Failed to describe endpoint: {e}")
+            _endpoint_cache["variants"] = []
+        _endpoint_cache["expires"] = now + ENDPOINT_CACHE_SECONDS
+    return _endpoint_cache["config_name"], _endpoint_cache["variants"]
+
+
+def invoke_shadow(payload, result):
+    # Runs in the asynchronous invocation, off the caller's request path
+    start = time.time()
+    try:
+        response = runtime_client.invoke_endpoint(
+            EndpointName=ENDPOINT_NAME,
+            TargetVariant=SHADOW_VARIANT,
+            ContentType='application/json',
+            Body=json.dumps(payload)
+        )
+        body = json.loads(response['Body'].read().decode('utf-8'))
+        result["prediction"] = body.get('predictions', body) if isinstance(body, dict) else body
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_ms"] = (time.time() - start) * 1000
+
+
+def mirror_to_shadow(payload, primary_variant, primary_latency, primary_prediction, request_id):
+    # Sampled first, so unsampled requests never pay for DescribeEndpoint either
+    if random.random() >= SHADOW_SAMPLE_RATE:
+        return
+    config_name, variants = endpoint_variants()
+    if SHADOW_VARIANT not in variants:
+        return
+    try:
+        lambda_client.invoke(
+            FunctionName=os.environ['AWS_LAMBDA_FUNCTION_NAME'],
+            InvocationType='Event',
+            Payload=json.dumps({
+                "shadow_mirror": {
+                    "payload": payload,
+                    "config_name": config_name,
+                    "primary_variant": primary_variant,
+                    "primary_latency_ms": primary_latency,
+                    "primary_prediction": primary_prediction,
+                    "request_id": request_id
+                }
+            })
+        )
+    except Exception as e:
+        logger.error(f"Failed to start shadow mirror: {e}")
+
+
+def log_shadow_to_s3(mirror):
+    result = {"config_name": mirror["config_name"]}
+    invoke_shadow(mirror["payload"], result)
+    request_id = mirror["request_id"]
+
+    try:
+        s3_key = f"{SHADOW_PREFIX}{datetime.utcnow().date().isoformat()}/{request_id}.json"
+        s3_client.put_object(
+            Bucket=MONITORING_BUCKET,
+            Key=s3_key,
+            Body=json.dumps({
+                "uuid": request_id,
+                "timestamp": datetime.utcnow().isoformat(),
+                "config_name": result["config_name"],
+                "primary_variant": mirror["primary_variant"],
+                "primary_latency_ms": mirror["primary_latency_ms"],
+                "primary_prediction": mirror["primary_prediction"],
+                "shadow_variant": SHADOW_VARIANT,
+                "shadow_latency_ms": result.get("latency_ms"),
+                "shadow_prediction": result.get("prediction"),
+                "shadow_error": result.get("error")
+            }),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        logger.error(f"Failed to log shadow comparison: {e}")
+
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Received event: {json.dumps(event)}")
+
+    if 'shadow_mirror' in event:
+        log_shadow_to_s3(event['shadow_mirror'])
+        return
 
     request_id = str(uuid.uuid4())
 
@@ -129,6 +234,9 @@ def lambda_handler(event, context):
 
         log_payload_to_s3(payload, prediction, request_id)
 
+        if MONITORING_BUCKET:
+            mirror_to_shadow(payload, response.get('InvokedProductionVariant'), latency, prediction, request_id)
+
         push_metrics_to_cw(latency, prediction)
 
         return {
@@ -0,0 +1,46 @@
+import os
+import argparse
+
+import boto3
+
+
+def latest_execution_arn(sm, pipeline_name):
+    executions = sm.list_pipeline_executions(PipelineName=pipeline_name, SortOrder="Descending",
+                                             MaxResults=1)["PipelineExecutionSummaries"]
+    if not executions:
+        raise SystemExit(f"No executions found for pipeline {pipeline_name}")
+    return executions[0]["PipelineExecutionArn"]
+
+
+def step_cache_report(sm, execution_arn):
+    steps = []
+    paginator = sm.get_paginator("list_pipeline_execution_steps")
+    for page in paginator.paginate(PipelineExecutionArn=execution_arn, SortOrder="Ascending"):
+        for step in page["PipelineExecutionSteps"]:
+            cache_hit = step.get("CacheHitResult", {}).get("SourcePipelineExecutionArn")
+            start, end = step.get("StartTime"), step.get("EndTime")
+            steps.append({
+                "step": step["StepName"],
+                "status": step["StepStatus"],
+                "cache": "HIT" if cache_hit else "MISS",
+                "source_execution": cache_hit,
+                "seconds": (end - start).total_seconds() if start and end else None,
+            })
+    return steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-step cache hit/miss for a SageMaker pipeline execution")
+    parser.add_argument("--pipeline-name", type=str, default="RealEstatePipeline-mlops-real-estate")
+    parser.add_argument("--execution-arn", type=str, help="Defaults to the latest execution of the pipeline")
+    args = parser.parse_args()
+
+    sm = boto3.client("sagemaker", region_name=os.environ.get("AWS_DEFAULT_REGION", "eu-north-1"))
+    execution_arn = args.execution_arn or latest_execution_arn(sm, args.pipeline_name)
+
+    print(f"Execution: {execution_arn}")
+    print(f"{'step':<24} {'status':<12} {'cache':<5} {'time':>9}  source")
+    for step in step_cache_report(sm, execution_arn):
+        seconds = f"{step['seconds']:.0f}s" if step["seconds"] is not None else "-"
+        print(f"{step['step']:<24} {step['status']:<12} {step['cache']:<5} {seconds:>9}  "
+              f"{step['source_execution'] or ''}")
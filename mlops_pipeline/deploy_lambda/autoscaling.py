@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+VARIANT_NAME = "AllTraffic"
+SCALABLE_DIMENSION = "sagemaker:variant:DesiredInstanceCount"
+POLICY_NAME = "InvocationsPerInstanceTargetTracking"
+
+# Capacity measurement of a single instance, taken by load testing the endpoint, e.g.
+# {"instance_type": "ml.m5.large", "sustainable_rps_per_instance": 40.0, "measured_at": "..."}
+
+
+def resource_id(endpoint_name, variant_name=VARIANT_NAME):
+    return f"endpoint/{endpoint_name}/variant/{variant_name}"
+
+
+def load_capacity(s3, uri):
+    if not uri:
+        return None
+    bucket, _, key = uri.replace("s3://", "", 1).partition("/")
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except ClientError as e:
+        logger.warning(f"No capacity measurement at {uri}: {e}")
+        return None
+
+
+def scaling_settings(s3):
+    instance_type = os.environ.get("INSTANCE_TYPE", "ml.m5.large")
+    utilization = float(os.environ.get("AUTOSCALING_TARGET_UTILIZATION", 0.7))
+    rps = float(os.environ.get("FALLBACK_RPS_PER_INSTANCE", 5))
+    source = "fallback"
+
+    capacity = load_capacity(s3, os.environ.get("CAPACITY_URI"))
+    if capacity and capacity.get("instance_type", instance_type) != instance_type:
+        logger.warning(f"Capacity was measured on {capacity['instance_type']}, endpoint uses {instance_type}; "
+                       f"using the fallback of {rps} RPS per instance")
+    elif capacity and capacity.get("sustainable_rps_per_instance"):
+        rps = float(capacity["sustainable_rps_per_instance"])
+        source = f"measured {capacity.get('measured_at', '')}".strip()
+
+    min_capacity = int(os.environ.get("AUTOSCALING_MIN_CAPACITY", 1))
+    return {
+        "instance_type": instance_type,
+        "min_capacity": min_capacity,
+        "max_capacity": max(min_capacity, int(os.environ.get("AUTOSCALING_MAX_CAPACITY", 4))),
+        # SageMakerVariantInvocationsPerInstance is a per-minute count
+        "target_value": max(1.0, round(rps * 60 * utilization, 1)),
+        "scale_in_cooldown": int(os.environ.get("AUTOSCALING_SCALE_IN_COOLDOWN", 300)),
+        "scale_out_cooldown": int(os.environ.get("AUTOSCALING_SCALE_OUT_COOLDOWN", 60)),
+        "rps_per_instance": rps,
+        "source": source,
+    }
+
+
+def register(aas, endpoint_name, settings):
+    aas.register_scalable_target(
+        ServiceNamespace="sagemaker",
+        ResourceId=resource_id(endpoint_name),
+        ScalableDimension=SCALABLE_DIMENSION,
+        MinCapacity=int(settings["min_capacity"]),
+        MaxCapacity=int(settings["max_capacity"]),
+    )
+    aas.put_scaling_policy(
+        PolicyName=POLICY_NAME,
+        ServiceNamespace="sagemaker",
+        ResourceId=resource_id(endpoint_name),
+        ScalableDimension=SCALABLE_DIMENSION,
+        PolicyType="TargetTrackingScaling",
+        TargetTrackingScalingPolicyConfiguration={
+            "TargetValue": float(settings["target_value"]),
+            "PredefinedMetricSpecification": {"PredefinedMetricType": "SageMakerVariantInvocationsPerInstance"},
+            "ScaleInCooldown": int(settings["scale_in_cooldown"]),
+            "ScaleOutCooldown": int(settings["scale_out_cooldown"]),
+        },
+    )
+    logger.info(f"📈 Autoscaling {endpoint_name}: {settings['min_capacity']}-{settings['max_capacity']} instances, "
+                f"target {settings['target_value']} invocations/instance/min ({settings['source']})")
+
+
+def is_registered(aas, endpoint_name):
+    targets = aas.describe_scalable_targets(ServiceNamespace="sagemaker", ResourceIds=[resource_id(endpoint_name)],
+                                            ScalableDimension=SCALABLE_DIMENSION)
+    return bool(targets["ScalableTargets"])
+
+
+def deregister(aas, endpoint_name):
+    # UpdateEndpoint is rejected while the variant is a scalable target
+    try:
+        aas.deregister_scalable_target(ServiceNamespace="sagemaker", ResourceId=resource_id(endpoint_name),
+                                       ScalableDimension=SCALABLE_DIMENSION)
+        logger.info(f"Suspended autoscaling on {endpoint_name} for the update")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ObjectNotFoundException":
+            raise
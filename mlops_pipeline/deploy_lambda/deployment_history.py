@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# One partition per endpoint. Deployment items are keyed by config name; the LATEST item holds the
+# current / previous / pending configs so rollback resolves its target with a single GetItem.
+LATEST = "#LATEST"
+# In-flight deployment state machine for the endpoint (see deployment_state.py)
+OPERATION = "#OPERATION"
+TIME_INDEX = "by_deployed_at"
+
+
+def _to_dynamo(value):
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+
+def _from_dynamo(value):
+    # DynamoDB returns every number as Decimal, which boto3 rejects as a request parameter
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+
+def _is_conditional_failure(e):
+    return e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+class DeploymentHistory:
+    def __init__(self, table_name=None, dynamodb=None):
+        table_name = table_name or os.environ.get("DEPLOYMENT_HISTORY_TABLE")
+        if not table_name:
+            raise ValueError("DEPLOYMENT_HISTORY_TABLE is not set")
+        self.table = (dynamodb or boto3.resource("dynamodb")).Table(table_name)
+
+    def latest(self, endpoint_name):
+        item = self.table.get_item(Key={"endpoint_name": endpoint_name, "config_name": LATEST}).get("Item")
+        return item or {}
+
+    def get(self, endpoint_name, config_name):
+        return self.table.get_item(Key={"endpoint_name": endpoint_name, "config_name": config_name}).get("Item")
+
+    def record_deployment(self, endpoint_name, config_name, model_name, model_package_arn, action,
+                          metrics=None, pipeline_execution_arn=None, **extra):
+        latest = self.latest(endpoint_name)
+        self.table.put_item(Item=_to_dynamo({
+            "endpoint_name": endpoint_name,
+            "config_name": config_name,
+            "model_name": model_name,
+            "model_package_arn": model_package_arn,
+            "action": action,
+            "status": "deploying",
+            "deployed_at": int(time.time()),
+            "previous_config": latest.get("current_config"),
+            "metrics": metrics or None,
+            "pipeline_execution_arn": pipeline_execution_arn,
+            **extra,
+        }))
+        self._update_latest(endpoint_name, pending_config=config_name)
+
+    def _update_latest(self, endpoint_name, **fields):
+        # None removes the attribute
+        fields["updated_at"] = int(time.time())
+        sets = [k for k, v in fields.items() if v is not None]
+        removes = [k for k, v in fields.items() if v is None]
+
+        expression = "SET " + ", ".join(f"{k} = :{k}" for k in sets)
+        if removes:
+            expression += " REMOVE " + ", ".join(removes)
+        self.table.update_item(
+            Key={"endpoint_name": endpoint_name, "config_name": LATEST},
+            UpdateExpression=expression,
+            ExpressionAttributeValues={f":{k}": fields[k] for k in sets},
+        )
+
+    def _set_status(self, endpoint_name, config_name, status):
+        self.table.update_item(
+            Key={"endpoint_name": endpoint_name, "config_name": config_name},
+            UpdateExpression="SET #s = :s, status_at = :t",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": status, ":t": int(time.time())},
+        )
+
+    def reconcile(self, endpoint_name, endpoint_config_name, endpoint_status):
+        # Called by the health check. A pending config becomes current once the endpoint serves it;
+        # if the endpoint settled on another config, the deployment was rolled back or failed.
+        latest = self.latest(endpoint_name)
+        pending = latest.get("pending_config")
+        if not pending or endpoint_status != "InService":
+            return None
+
+        if endpoint_config_name == pending:
+            self._set_status(endpoint_name, pending, "in_service")
+            current = latest.get("current_config")
+            self._update_latest(endpoint_name, current_config=pending, previous_config=current, pending_config=None)
+            logger.info(f"History: {pending} is now current for {endpoint_name} (previous: {current})")
+            return "in_service"
+
+        self._set_status(endpoint_name, pending, "rolled_back")
+        self._update_latest(endpoint_name, pending_config=None)
+        logger.warning(f"History: {pending} never went live on {endpoint_name}, marked rolled_back")
+        return "rolled_back"
+
+    def rollback_target(self, endpoint_name, serving_config):
+        # If the endpoint already serves a pending deployment the health check has not confirmed yet,
+        # the last good config is the recorded current one, not its predecessor
+        latest = self.latest(endpoint_name)
+        if serving_config == latest.get("pending_config"):
+            return self._live(endpoint_name, latest.get("current_config"))
+        return self._live(endpoint_name, latest.get("previous_config"))
+
+    def _live(self, endpoint_name, config_name):
+        # A config the deploy Lambda's cleanup already deleted is no rollback target
+        if config_name and "cleaned_at" not in (self.get(endpoint_name, config_name) or {}):
+            return config_name
+        return None
+
+    def record_rollback(self, endpoint_name, from_config, to_config):
+        # The config we return to becomes current; its own predecessor becomes the next rollback target
+        target = self.get(endpoint_name, to_config) or {}
+        self._set_status(endpoint_name, from_config, "rolled_back")
+        self._set_status(endpoint_name, to_config, "in_service")
+        self._update_latest(endpoint_name, current_config=to_config,
+                            previous_config=self._live(endpoint_name, target.get("previous_config")),
+                            pending_config=None)
+
+    def history(self, endpoint_name, limit=20):
+        response = self.table.query(
+            IndexName=TIME_INDEX,
+            KeyConditionExpression="endpoint_name = :e",
+            ExpressionAttributeValues={":e": endpoint_name},
+            ScanIndexForward=False,
+            Limit=limit,
+        )
+        return response.get("Items", [])
+
+    def set_timings(self, endpoint_name, config_name, timings):
+        # A deployment that failed in PREPARE has no record to attach them to
+        try:
+            self.table.update_item(
+                Key={"endpoint_name": endpoint_name, "config_name": config_name},
+                UpdateExpression="SET timings = :t",
+                ConditionExpression=Attr("config_name").exists(),
+                ExpressionAttributeValues={":t": _to_dynamo(timings)},
+            )
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+
+    def mark_cleaned(self, endpoint_name, config_name):
+        self.table.update_item(
+            Key={"endpoint_name": endpoint_name, "config_name": config_name},
+            UpdateExpression="SET cleaned_at = :t",
+            ExpressionAttributeValues={":t": int(time.time())},
+        )
+
+    def uncleaned(self, endpoint_name, limit=100):
+        response = self.table.query(
+            IndexName=TIME_INDEX,
+            KeyConditionExpression="endpoint_name = :e",
+            FilterExpression=Attr("cleaned_at").not_exists(),
+            ExpressionAttributeValues={":e": endpoint_name},
+            ScanIndexForward=False,
+            Limit=limit,
+        )
+        return response.get("Items", [])
+
+    # --- Deployment operation (state machine) with a lease so overlapping invocations don't race ---
+
+    def get_operation(self, endpoint_name):
+        # Resumed phases pass parts of the state (deployment_config, scaling) straight to AWS
+        item = self.get(endpoint_name, OPERATION)
+        return _from_dynamo(item) if item else None
+
+    def start_operation(self, state, owner, lease_seconds):
+        state.update(lease_owner=owner, lease_until=int(time.time()) + lease_seconds)
+        try:
+            self.table.put_item(
+                Item=_to_dynamo(dict(state, config_name=OPERATION)),
+                ConditionExpression=Attr("config_name").not_exists() | Attr("phase").is_in(["DONE", "FAILED"]),
+            )
+            return True
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False
+            raise
+
+    def acquire_lease(self, state, owner, lease_seconds):
+        now = int(time.time())
+        try:
+            self.table.update_item(
+                Key={"endpoint_name": state["endpoint_name"], "config_name": OPERATION},
+                UpdateExpression="SET lease_owner = :o, lease_until = :u",
+                ConditionExpression=Attr("lease_until").not_exists() | Attr("lease_until").lt(now)
+                                    | Attr("lease_owner").eq(owner),
+                ExpressionAttributeValues={":o": owner, ":u": now + lease_seconds},
+            )
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False
+            raise
+        state.update(lease_owner=owner, lease_until=now + lease_seconds)
+        return True
+
+    def save_operation(self, state, release=False):
+        # Only the lease holder may write; releasing drops the lease so the next invocation can resume
+        owner = state["lease_owner"]
+        item = dict(state, config_name=OPERATION)
+        if release:
+            item.pop("lease_owner")
+            item.pop("lease_until", None)
+        self.table.put_item(Item=_to_dynamo(item), ConditionExpression=Attr("lease_owner").eq(owner))
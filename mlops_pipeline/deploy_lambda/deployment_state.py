@@ -0,0 +1,311 @@
+import time
+import uuid
+import logging
+
+from botocore.exceptions import ClientError
+
+import autoscaling
+import mlflow_registry
+
+logger = logging.getLogger()
+
+PHASES = {
+    "create": ["PREPARE", "CREATE_ENDPOINT", "WAIT_IN_SERVICE", "APPROVE", "CONFIGURE_AUTOSCALING", "CLEANUP"],
+    "deploy": ["PREPARE", "SUSPEND_AUTOSCALING", "UPDATE_ENDPOINT", "WAIT_IN_SERVICE", "APPROVE",
+               "CONFIGURE_AUTOSCALING", "CLEANUP"],
+    # The challenger joins as a weight-0 variant next to the serving model; it only sees mirrored requests
+    # and stays unapproved until the shadow decision
+    "shadow": ["PREPARE", "SUSPEND_AUTOSCALING", "UPDATE_ENDPOINT", "WAIT_IN_SERVICE", "CONFIGURE_AUTOSCALING",
+               "CLEANUP"],
+    # Shadow decision "promote": a deploy that also moves the MLflow Production alias to the challenger
+    "promote": ["PREPARE", "SUSPEND_AUTOSCALING", "UPDATE_ENDPOINT", "WAIT_IN_SERVICE", "APPROVE",
+                "CONFIGURE_AUTOSCALING", "CLEANUP"],
+    "repair": ["PREPARE", "DELETE_ENDPOINT", "WAIT_DELETED", "CREATE_ENDPOINT", "WAIT_IN_SERVICE", "APPROVE",
+               "CONFIGURE_AUTOSCALING", "CLEANUP"],
+}
+PRIMARY_VARIANT = "AllTraffic"
+SHADOW_VARIANT = "Shadow"
+BUSY_STATUSES = ["Creating", "Updating", "SystemUpdating", "RollingBack", "Deleting"]
+
+ADVANCE, WAIT, FAIL = "advance", "wait", "fail"
+
+# A phase that raises is retried by the next invocations, then the deployment is marked FAILED
+MAX_PHASE_ATTEMPTS = 3
+
+
+def remaining_seconds(context):
+    if context is None:
+        return 60
+    return context.get_remaining_time_in_millis() / 1000
+
+
+def new_state(action, endpoint_name, model_package_arn, role_arn, scaling, deployment_config=None, metrics=None,
+              pipeline_execution_arn=None, base_config=None, base_model=None, mlflow_version=None):
+    timestamp = int(time.time())
+    now = time.time()
+    return {
+        "endpoint_name": endpoint_name,
+        "action": action,
+        "phase": PHASES[action][0],
+        "target_model": f"model-{timestamp}",
+        "target_config": f"config-{timestamp}",
+        "model_package_arn": model_package_arn,
+        "role_arn": role_arn,
+        "deployment_config": deployment_config,
+        "scaling": scaling,
+        "base_config": base_config,
+        "base_model": base_model,
+        "mlflow_version": mlflow_version,
+        "metrics": metrics,
+        "pipeline_execution_arn": pipeline_execution_arn,
+        "started_at": now,
+        "phase_started_at": now,
+        "attempts": 0,
+        "timings": {},
+        "invocations": 0,
+    }
+
+
+def _error_code(e):
+    return e.response.get("Error", {}).get("Code", "")
+
+
+class DeploymentStateMachine:
+    # Each phase is idempotent and returns ADVANCE, WAIT (poll again later) or FAIL. Progress is
+    # saved after every transition, so any later invocation can pick up where this one stopped.
+    # Nothing sleeps: on WAIT the state is saved and the next health check (every minute) polls again.
+
+    def __init__(self, sm, aas, history, context=None):
+        self.sm = sm
+        self.aas = aas
+        self.history = history
+        self.context = context
+        self.owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+        # Outlives this invocation slightly, so a crashed run frees the deployment on its own
+        self.lease_seconds = int(remaining_seconds(context)) + 30
+
+    def start(self, state):
+        if not self.history.start_operation(state, self.owner, self.lease_seconds):
+            raise RuntimeError(f"Another deployment is in progress for {state['endpoint_name']}")
+        logger.info(f"Starting {state['action']} of {state['model_package_arn']} as {state['target_config']}")
+        return self.run(state)
+
+    def resume(self, state):
+        if not self.history.acquire_lease(state, self.owner, self.lease_seconds):
+            logger.info(f"Deployment for {state['endpoint_name']} is being driven by another invocation")
+            return {"status": "in_progress", "action": "locked", "phase": state["phase"]}
+        logger.info(f"Resuming {state['action']} of {state['target_config']} at phase {state['phase']}")
+        return self.run(state)
+
+    def run(self, state):
+        state["invocations"] = int(state.get("invocations", 0)) + 1
+        phases = PHASES[state["action"]]
+
+        while state["phase"] not in ("DONE", "FAILED"):
+            try:
+                outcome = getattr(self, f"_phase_{state['phase'].lower()}")(state)
+            except Exception as e:
+                state["attempts"] = int(state.get("attempts", 0)) + 1
+                state["last_error"] = f"{type(e).__name__}: {e}"
+                logger.exception(f"Phase {state['phase']} failed (attempt {state['attempts']}/{MAX_PHASE_ATTEMPTS})")
+                if state["attempts"] < MAX_PHASE_ATTEMPTS:
+                    self.history.save_operation(state, release=True)
+                    return {"status": "in_progress", "action": state["action"], "phase": state["phase"],
+                            "error": state["last_error"]}
+                outcome = FAIL
+
+            if outcome == WAIT:
+                self.history.save_operation(state, release=True)
+                logger.info(f"Waiting in {state['phase']}, state saved; the health check resumes it")
+                return {"status": "in_progress", "action": state["action"], "phase": state["phase"]}
+
+            self._close_phase(state, failed=outcome == FAIL)
+            if outcome == FAIL:
+                state["phase"] = "FAILED"
+            else:
+                index = phases.index(state["phase"]) + 1
+                state["phase"] = phases[index] if index < len(phases) else "DONE"
+            self.history.save_operation(state, release=state["phase"] in ("DONE", "FAILED"))
+
+        timings = {k: round(float(v), 1) for k, v in state["timings"].items()}
+        timings["total"] = round(time.time() - float(state["started_at"]), 1)
+        logger.info(f"Deployment {state['target_config']} {state['phase']}: "
+                    + ", ".join(f"{k}={v}s" for k, v in timings.items()))
+        self.history.set_timings(state["endpoint_name"], state["target_config"], timings)
+        status = "deployed" if state["phase"] == "DONE" and not state.get("rolled_back") else "failed"
+        result = {"status": status, "action": state["action"], "config": state["target_config"], "timings": timings}
+        if state.get("last_error"):
+            result["error"] = state["last_error"]
+        return result
+
+    def _close_phase(self, state, failed=False):
+        now = time.time()
+        phase = state["phase"]
+        state["timings"][phase] = float(state["timings"].get(phase, 0)) + now - float(state["phase_started_at"])
+        state["phase_started_at"] = now
+        state["attempts"] = 0
+        if not failed:
+            state.pop("last_error", None)
+
+    def _describe(self, endpoint_name):
+        try:
+            return self.sm.describe_endpoint(EndpointName=endpoint_name)
+        except ClientError as e:
+            if _error_code(e) == "ValidationException":
+                return None
+            raise
+
+    def _delete_if_exists(self, delete, **kwargs):
+        try:
+            delete(**kwargs)
+        except ClientError as e:
+            if _error_code(e) != "ValidationException":  # already gone
+                raise
+
+    # --- Phases ---
+
+    def _phase_prepare(self, state):
+        try:
+            self.sm.create_model(
+                ModelName=state["target_model"],
+                PrimaryContainer={"ModelPackageName": state["model_package_arn"]},
+                ExecutionRoleArn=state["role_arn"]
+            )
+        except ClientError as e:
+            if "already exist" not in str(e):
+                raise
+        shadow = state["action"] == "shadow"
+        variants = [{
+            "VariantName": PRIMARY_VARIANT,
+            "ModelName": state["base_model"] if shadow else state["target_model"],
+            "InitialInstanceCount": int(state["scaling"]["min_capacity"]),
+            "InstanceType": state["scaling"]["instance_type"],
+            "InitialVariantWeight": 1.0
+        }]
+        if shadow:
+            variants.append({
+                "VariantName": SHADOW_VARIANT,
+                "ModelName": state["target_model"],
+                "InitialInstanceCount": 1,
+                "InstanceType": state["scaling"]["instance_type"],
+                "InitialVariantWeight": 0.0
+            })
+        try:
+            self.sm.create_endpoint_config(EndpointConfigName=state["target_config"], ProductionVariants=variants)
+        except ClientError as e:
+            if "already exist" not in str(e):
+                raise
+        self.history.record_deployment(state["endpoint_name"], state["target_config"], state["target_model"],
+                                       state["model_package_arn"], state["action"], metrics=state.get("metrics"),
+                                       pipeline_execution_arn=state.get("pipeline_execution_arn"),
+                                       base_config=state.get("base_config"), base_model=state.get("base_model"),
+                                       mlflow_version=state.get("mlflow_version"))
+        return ADVANCE
+
+    def _phase_suspend_autoscaling(self, state):
+        autoscaling.deregister(self.aas, state["endpoint_name"])
+        return ADVANCE
+
+    def _phase_approve(self, state):
+        # Approved = has served all traffic, so the repair path never redeploys a shadow challenger
+        if state.get("rolled_back"):
+            return ADVANCE
+        self.sm.update_model_package(ModelPackageArn=state["model_package_arn"], ModelApprovalStatus="Approved")
+        if state["action"] == "promote":
+            # In shadow mode the pipeline leaves the alias on the champion (promote.py --deployment-mode)
+            if state.get("mlflow_version"):
+                mlflow_registry.set_alias(mlflow_registry.MODEL_NAME, "Production", state["mlflow_version"])
+            else:
+                logger.warning(f"No MLflow version recorded for {state['model_package_arn']}; alias not moved")
+        return ADVANCE
+
+    def _phase_configure_autoscaling(self, state):
+        # Also after a SageMaker rollback: the old variant lost its scalable target in SUSPEND_AUTOSCALING
+        autoscaling.register(self.aas, state["endpoint_name"], state["scaling"])
+        return ADVANCE
+
+    def _phase_delete_endpoint(self, state):
+        endpoint = self._describe(state["endpoint_name"])
+        if endpoint is None:
+            return ADVANCE
+        if endpoint["EndpointStatus"] != "Deleting":
+            logger.warning(f"🚑 Deleting broken endpoint {state['endpoint_name']} ({endpoint['EndpointStatus']})")
+            self.sm.delete_endpoint(EndpointName=state["endpoint_name"])
+        return ADVANCE
+
+    def _phase_wait_deleted(self, state):
+        return ADVANCE if self._describe(state["endpoint_name"]) is None else WAIT
+
+    def _phase_create_endpoint(self, state):
+        endpoint = self._describe(state["endpoint_name"])
+        if endpoint is not None:
+            if endpoint.get("EndpointConfigName") == state["target_config"]:
+                return ADVANCE  # created by an earlier invocation
+            logger.error(f"Endpoint {state['endpoint_name']} appeared with config {endpoint.get('EndpointConfigName')}")
+            return FAIL
+        logger.info(f"✨ Creating endpoint {state['endpoint_name']} with {state['target_config']}")
+        self.sm.create_endpoint(EndpointName=state["endpoint_name"], EndpointConfigName=state["target_config"])
+        return ADVANCE
+
+    def _phase_update_endpoint(self, state):
+        endpoint = self._describe(state["endpoint_name"])
+        if endpoint is None:
+            logger.error(f"Endpoint {state['endpoint_name']} disappeared before the update")
+            return FAIL
+        if endpoint["EndpointStatus"] in BUSY_STATUSES:
+            return WAIT
+        if endpoint.get("EndpointConfigName") == state["target_config"]:
+            return ADVANCE
+        # Deployment guardrails (blue/green with alarm rollback) only support single-variant endpoints, so
+        # switching to or from a shadow config is a plain update
+        variants = [len(self.sm.describe_endpoint_config(EndpointConfigName=c)["ProductionVariants"])
+                    for c in (endpoint["EndpointConfigName"], state["target_config"])]
+        guarded = variants == [1, 1] and state.get("deployment_config")
+        logger.info(f"🚀 Updating endpoint {state['endpoint_name']} to {state['target_config']}"
+                    + ("" if guarded else " (no deployment guardrails: multi-variant config)"))
+        self.sm.update_endpoint(EndpointName=state["endpoint_name"], EndpointConfigName=state["target_config"],
+                                **({"DeploymentConfig": state["deployment_config"]} if guarded else {}))
+        return ADVANCE
+
+    def _phase_wait_in_service(self, state):
+        endpoint = self._describe(state["endpoint_name"])
+        if endpoint is None:
+            return FAIL
+        status = endpoint["EndpointStatus"]
+        if status in BUSY_STATUSES:
+            return WAIT
+
+        # Settled: reconcile promotes the pending config or marks it rolled back
+        self.history.reconcile(state["endpoint_name"], endpoint.get("EndpointConfigName"), status)
+        if status == "InService" and endpoint.get("EndpointConfigName") == state["target_config"]:
+            return ADVANCE
+        if status == "InService":
+            logger.warning(f"Deployment of {state['target_config']} was rolled back by SageMaker")
+            state["rolled_back"] = True
+            return ADVANCE  # still clean up the config that never went live
+        logger.error(f"Endpoint ended in {status}: {endpoint.get('FailureReason')}")
+        return FAIL
+
+    def _phase_cleanup(self, state):
+        # Only resources this Lambda recorded for this endpoint; current and previous stay for rollback
+        endpoint_name = state["endpoint_name"]
+        latest = self.history.latest(endpoint_name)
+        endpoint = self._describe(endpoint_name) or {}
+        keep = {latest.get("current_config"), latest.get("previous_config"), latest.get("pending_config"),
+                endpoint.get("EndpointConfigName")} - {None}
+        # A shadow config serves its base model, which belongs to an older (possibly deletable) record
+        kept_records = [self.history.get(endpoint_name, c) or {} for c in keep]
+        keep_models = {r.get(k) for r in kept_records for k in ("model_name", "base_model")}
+
+        for item in self.history.uncleaned(endpoint_name):
+            config_name = item["config_name"]
+            if config_name in keep:
+                continue
+            self._delete_if_exists(self.sm.delete_endpoint_config, EndpointConfigName=config_name)
+            if item.get("model_name") in keep_models:
+                continue  # model still served; retried by a later cleanup
+            if item.get("model_name"):
+                self._delete_if_exists(self.sm.delete_model, ModelName=item["model_name"])
+            self.history.mark_cleaned(endpoint_name, config_name)
+            logger.info(f"🧹 Deleted orphaned {config_name} / {item.get('model_name')}")
+        return ADVANCE
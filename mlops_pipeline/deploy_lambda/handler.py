@@ -1,12 +1,21 @@
 import boto3
-import time
 import logging
 import os
 
+import autoscaling
+from deployment_history import DeploymentHistory
+from deployment_state import DeploymentStateMachine, BUSY_STATUSES, PRIMARY_VARIANT, new_state
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 sm = boto3.client("sagemaker")
+aas = boto3.client("application-autoscaling")
+s3 = boto3.client("s3")
+history = DeploymentHistory()
+
+# Evaluation metrics the pipeline passes along with the model package (JsonGet on evaluation.json)
+EVAL_METRIC_KEYS = ["rmse", "champion_rmse", "latency_p50_ms", "latency_p99_ms", "throughput_rows_per_sec"]
 
 
 def get_latest_approved_model_package(model_package_group_name):
@@ -29,10 +38,37 @@ def get_latest_approved_model_package(model_package_group_name):
         return None
 
 
+def serving_model(config_name):
+    config = sm.describe_endpoint_config(EndpointConfigName=config_name)
+    return next(v["ModelName"] for v in config["ProductionVariants"] if v["VariantName"] == PRIMARY_VARIANT)
+
+
+def resolve_shadow_decision(endpoint_name, current_config, decision):
+    # -> (action, model package, MLflow version). promote: the challenger's package serves all traffic and
+    # becomes Production; abort: the challenger's package is rejected and the base model's is redeployed
+    if decision not in ("promote", "abort"):
+        raise ValueError(f"Unknown shadow decision '{decision}'")
+    record = history.get(endpoint_name, current_config) or {}
+    if record.get("action") != "shadow":
+        raise ValueError(f"{current_config} is not a shadow deployment, nothing to {decision}")
+    if decision == "promote":
+        return "promote", record["model_package_arn"], record.get("mlflow_version")
+    base = history.get(endpoint_name, record.get("base_config")) or {}
+    if not base.get("model_package_arn"):
+        raise ValueError(f"Cannot abort shadow on {endpoint_name}: base config {record.get('base_config')} "
+                         f"has no recorded model package")
+    sm.update_model_package(ModelPackageArn=record["model_package_arn"], ModelApprovalStatus="Rejected")
+    logger.info(f"Rejected {record['model_package_arn']}")
+    return "deploy", base["model_package_arn"], None
+
+
 def lambda_handler(event, context):
     logger.info(f"Received event: {event}")
 
     passed_model_arn = event.get("model_package_arn")  # If present -  Deploy, if None - HealthCheck
+    deployment_mode = event.get("deployment_mode", "direct")  # "shadow" mirrors traffic to the challenger first
+    shadow_decision = event.get("shadow_decision")  # "promote" / "abort", sent by monitoring/shadow.py
+    mlflow_version = event.get("mlflow_model_version")  # registry version of the evaluated model
     endpoint_name = event.get("endpoint_name")
     role_arn = event.get("role_arn")
 
@@ -42,19 +78,46 @@ def lambda_handler(event, context):
     if not endpoint_name or not role_arn:
         raise ValueError("Missing endpoint_name or role_arn")
 
+    machine = DeploymentStateMachine(sm, aas, history, context)
+
+    # An unfinished deployment always goes first: this is how the every-minute health check
+    # drives long deployments to completion without any invocation blocking on SageMaker.
+    operation = history.get_operation(endpoint_name)
+    if operation and operation["phase"] not in ("DONE", "FAILED"):
+        if passed_model_arn and passed_model_arn != operation["model_package_arn"]:
+            raise RuntimeError(f"Deployment of {operation['model_package_arn']} to {endpoint_name} is still "
+                               f"in progress (phase {operation['phase']}); retry later")
+        return machine.resume(operation)
+
     current_status = "NotFound"
+    current_config = None
     try:
         resp = sm.describe_endpoint(EndpointName=endpoint_name)
         current_status = resp["EndpointStatus"]
+        current_config = resp.get("EndpointConfigName")
         logger.info(f"Current Endpoint Status: {current_status}")
     except sm.exceptions.ClientError:
         logger.info("Endpoint not found.")
 
+    if current_status == "InService":
+        history.reconcile(endpoint_name, current_config, current_status)
+
+    if shadow_decision:
+        if current_status != "InService":
+            return {"status": "busy", "action": "skipped"}
+        shadow_action, passed_model_arn, mlflow_version = resolve_shadow_decision(endpoint_name, current_config,
+                                                                                  shadow_decision)
+        logger.info(f"Shadow decision '{shadow_decision}': deploying {passed_model_arn} to all traffic")
+
     if not passed_model_arn and current_status == "InService":
+        # A manual rollback suspends autoscaling for its update; restore it once the endpoint settles
+        if not autoscaling.is_registered(aas, endpoint_name):
+            autoscaling.register(aas, endpoint_name, autoscaling.scaling_settings(s3))
+            return {"status": "healthy", "action": "autoscaling_restored"}
         logger.info("✅ HealthCheck: Endpoint is InService. No action needed.")
         return {"status": "healthy", "action": "none"}
 
-    if current_status in ["Creating", "Updating", "SystemUpdating", "RollingBack"]:
+    if current_status in BUSY_STATUSES:
         logger.info(f"⚠️ HealthCheck: Endpoint is busy ({current_status}). Skipping.")
         return {"status": "busy", "action": "skipped"}
 
@@ -66,28 +129,6 @@ def lambda_handler(event, context):
         if not target_model_arn:
             raise ValueError("Cannot repair endpoint: No approved model found in Registry.")
 
-    timestamp = int(time.time())
-    model_name = f"model-{timestamp}"
-    config_name = f"config-{timestamp}"
-
-    logger.info(f"Creating SageMaker Model: {model_name}")
-    sm.create_model(
-        ModelName=model_name,
-        PrimaryContainer={"ModelPackageName": target_model_arn},
-        ExecutionRoleArn=role_arn
-    )
-
-    logger.info(f"Creating Endpoint Config: {config_name}")
-    sm.create_endpoint_config(
-        EndpointConfigName=config_name,
-        ProductionVariants=[{
-            "VariantName": "AllTraffic",
-            "ModelName": model_name,
-            "InitialInstanceCount": 1,
-            "InstanceType": "ml.m5.large"
-        }]
-    )
-
     alarm_name = f"HighErrorRate-{project_name}"
     deployment_config = {
         "BlueGreenUpdatePolicy": {
@@ -103,23 +144,22 @@ def lambda_handler(event, context):
         }
     }
 
-    if current_status == "InService":
-        logger.info("🚀 Starting Deployment (Update)...")
-        sm.update_endpoint(
-            EndpointName=endpoint_name,
-            EndpointConfigName=config_name,
-            DeploymentConfig=deployment_config
-        )
-        return {"status": "updating", "action": "deploy"}
-
+    base_config = base_model = None
+    if current_status == "InService" and deployment_mode == "shadow" and not shadow_decision:
+        action = "shadow"
+        base_config, base_model = current_config, serving_model(current_config)
+    elif shadow_decision:
+        action = shadow_action
+    elif current_status == "InService":
+        action = "deploy"
     elif current_status in ["Failed", "OutOfService"]:
-        logger.warning("🚑 Repairing Broken Endpoint (Delete & Create)...")
-        sm.delete_endpoint(EndpointName=endpoint_name)
-        time.sleep(20)  # Чекаємо видалення
-        sm.create_endpoint(EndpointName=endpoint_name, EndpointConfigName=config_name)
-        return {"status": "recreating", "action": "repair"}
-
+        action = "repair"
     else:  # NotFound
-        logger.info("✨ Creating New Endpoint...")
-        sm.create_endpoint(EndpointName=endpoint_name, EndpointConfigName=config_name)
-        return {"status": "creating", "action": "create"}
\ No newline at end of file
+        action = "create"
+
+    metrics = {k: float(event[k]) for k in EVAL_METRIC_KEYS if event.get(k) is not None}
+    state = new_state(action, endpoint_name, target_model_arn, role_arn, autoscaling.scaling_settings(s3),
+                      deployment_config=deployment_config, metrics=metrics,
+                      pipeline_execution_arn=event.get("pipeline_execution_arn"),
+                      base_config=base_config, base_model=base_model, mlflow_version=mlflow_version)
+    return machine.start(state)
@@ -0,0 +1,24 @@
+import os
+import json
+import logging
+import urllib.request
+
+logger = logging.getLogger()
+
+MODEL_NAME = "RealEstateModel"
+
+
+def set_alias(model_name, alias, version, tracking_uri=None):
+    # Plain REST call to the tracking server, so the Lambda package needs no mlflow dependency
+    tracking_uri = tracking_uri or os.environ.get("MLFLOW_TRACKING_URI")
+    if not tracking_uri:
+        raise ValueError("MLFLOW_TRACKING_URI is not set")
+    request = urllib.request.Request(
+        f"{tracking_uri.rstrip('/')}/api/2.0/mlflow/registered-models/alias",
+        data=json.dumps({"name": model_name, "alias": alias, "version": str(version)}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+    logger.info(f"MLflow: {model_name} version {version} is now '{alias}'")
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tarfile
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from step_cache import StepCache, script_closure, step_cache_key
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts")
+MODEL_PACKAGE_GROUP = "RealEstateModelGroup-local"
+
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+def run_script(name, args, cwd, log_file, env):
+    with open(log_file, "w") as log:
+        result = subprocess.run([sys.executable, script(name), *args], cwd=cwd, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        with open(log_file) as log:
+            tail = log.readlines()[-20:]
+        raise RuntimeError(f"{name} failed with exit code {result.returncode}:\n{''.join(tail)}")
+
+
+def production_version(tracking_uri):
+    # Evaluate compares against the Production alias, so its version is part of the evaluate key
+    try:
+        from mlflow.tracking import MlflowClient
+        return MlflowClient(tracking_uri).get_model_version_by_alias("RealEstateModel", "Production").version
+    except Exception:
+        return None
+
+
+def cached(ctx, name, inputs, code, params, outputs, execute):
+    cache = StepCache(ctx["cache_dir"])
+    key = step_cache_key(name, inputs=inputs, code=code, params=params)
+
+    if ctx["use_cache"] and cache.lookup(name, key):
+        cache.restore(name, key, outputs)
+        return {"cache": "HIT", "key": key}
+
+    for path in outputs.values():
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+    execute()
+    cache.store(name, key, outputs)
+    return {"cache": "MISS", "key": key}
+
+
+# --- Steps: local directories stand in for /opt/ml/processing/* and the S3 step outputs ---
+
+def preprocess_step(ctx):
+    paths = ctx["paths"]
+    return cached(
+        ctx, "PreprocessData",
+        inputs=[paths["input"]],
+        code=script_closure(script("preprocess.py")),
+        params={"mode": ctx["preprocess_mode"]},
+        outputs={"train": paths["train"], "test": paths["test"]},
+        execute=lambda: run_script(
+            "preprocess.py",
+            ["--input-data", paths["input"], "--output-dir", os.path.dirname(paths["train"]),
+             "--mode", ctx["preprocess_mode"]],
+            cwd=ctx["work_dir"], log_file=os.path.join(paths["logs"], "preprocess.log"), env=ctx["env"]),
+    )
+
+
+def train_step(ctx):
+    paths = ctx["paths"]
+
+    def train():
+        raw_model_dir = os.path.join(ctx["work_dir"], "train", "raw")
+        if os.path.exists(raw_model_dir):
+            shutil.rmtree(raw_model_dir)
+        os.makedirs(raw_model_dir)
+        # train.py copies inference.py from its working directory, as in the SageMaker container
+        run_script("train.py", ["--train-data", paths["train"], "--model-dir", raw_model_dir,
+                                "--mode", ctx["train_mode"], "--model-type", ctx["model_type"]],
+                   cwd=SCRIPTS_DIR, log_file=os.path.join(paths["logs"], "train.log"), env=ctx["env"])
+        with tarfile.open(os.path.join(paths["model"], "model.tar.gz"), "w:gz") as tar:
+            for name in sorted(os.listdir(raw_model_dir)):
+                tar.add(os.path.join(raw_model_dir, name), arcname=name)
+
+    # Incremental mode folds into the stored statistics, so their current content is an input too
+    stats_uri = ctx["env"].get("SUFFICIENT_STATS_URI")
+    stats_input = [stats_uri] if ctx["train_mode"] == "incremental" and stats_uri else []
+
+    return cached(
+        ctx, "TrainModel",
+        inputs=[paths["train"]] + stats_input,
+        code=script_closure(script("train.py")) + script_closure(script("inference.py")),
+        params={"mode": ctx["train_mode"], "model_type": ctx["model_type"],
+                "stats_uri": stats_uri},
+        outputs={"model": paths["model"]},
+        execute=train,
+    )
+
+
+def evaluate_step(ctx):
+    paths = ctx["paths"]
+    eval_dir = os.path.join(ctx["work_dir"], "evaluate")
+    os.makedirs(eval_dir, exist_ok=True)
+    return cached(
+        ctx, "EvaluateModel",
+        inputs=[paths["model"], paths["test"]],
+        code=script_closure(script("evaluate.py")),
+        params={"max_latency_regression": ctx["max_latency_regression"],
+                "min_throughput_ratio": ctx["min_throughput_ratio"],
+                "production_version": production_version(ctx["env"]["MLFLOW_TRACKING_URI"])},
+        outputs={"evaluation": paths["evaluation"]},
+        execute=lambda: run_script(
+            "evaluate.py",
+            ["--test-data", paths["test"], "--model-path", paths["model"], "--output-dir", paths["evaluation"],
+             "--max-latency-regression", str(ctx["max_latency_regression"]),
+             "--min-throughput-ratio", str(ctx["min_throughput_ratio"])],
+            cwd=eval_dir, log_file=os.path.join(paths["logs"], "evaluate.log"), env=ctx["env"]),
+    )
+
+
+def register_step(ctx):
+    # Local stand-in for the SageMaker model package group: one numbered directory per version
+    paths = ctx["paths"]
+    group_dir = os.path.join(paths["registry"], MODEL_PACKAGE_GROUP)
+    os.makedirs(group_dir, exist_ok=True)
+    versions = [int(v) for v in os.listdir(group_dir) if v.isdigit()]
+    package_dir = os.path.join(group_dir, str(max(versions, default=0) + 1))
+    os.makedirs(package_dir)
+
+    model_tar = os.path.join(paths["model"], "model.tar.gz")
+    shutil.copy(model_tar, package_dir)
+    shutil.copy(os.path.join(paths["evaluation"], "evaluation.json"), package_dir)
+    with open(model_tar, "rb") as f:
+        model_sha256 = hashlib.sha256(f.read()).hexdigest()
+    with open(os.path.join(package_dir, "package.json"), "w") as f:
+        json.dump({"group": MODEL_PACKAGE_GROUP, "version": os.path.basename(package_dir),
+                   "approval_status": "Approved", "model_sha256": model_sha256,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+    return {"cache": "-", "package": package_dir}
+
+
+def promote_step(ctx):
+    run_script("promote.py", ["--evaluation", os.path.join(ctx["paths"]["evaluation"], "evaluation.json")],
+               cwd=ctx["work_dir"],
+               log_file=os.path.join(ctx["paths"]["logs"], "promote.log"), env=ctx["env"])
+    return {"cache": "-"}
+
+
+def evaluation_passed(ctx):
+    # Same gate as the CheckBetterThanProd ConditionStep
+    with open(os.path.join(ctx["paths"]["evaluation"], "evaluation.json")) as f:
+        metrics = json.load(f)["metrics"]
+    return metrics["is_better"]["value"] == 1.0 and metrics["perf_ok"]["value"] == 1.0
+
+
+# Edges are data dependencies. In pipeline.py PromoteModelInMLflow waits for RegisterModel only
+# because both sit behind the condition; locally they share nothing and run side by side.
+STEPS = {
+    "PreprocessData": {"run": preprocess_step, "depends_on": []},
+    "TrainModel": {"run": train_step, "depends_on": ["PreprocessData"]},
+    "EvaluateModel": {"run": evaluate_step, "depends_on": ["TrainModel", "PreprocessData"]},
+    "RegisterModel": {"run": register_step, "depends_on": ["EvaluateModel"], "condition": evaluation_passed},
+    "PromoteModelInMLflow": {"run": promote_step, "depends_on": ["EvaluateModel"], "condition": evaluation_passed},
+}
+
+
+def execute_step(name, ctx):
+    start = time.perf_counter()
+    result = STEPS[name]["run"](ctx)
+    return {"step": name, "status": "Succeeded", "seconds": round(time.perf_counter() - start, 2), **result}
+
+
+def run_dag(ctx, max_workers):
+    results, running = {}, {}
+    pending = list(STEPS)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [results.get(d, {}).get("status") for d in STEPS[name]["depends_on"]]
+                if any(status in ("Failed", "Skipped", "NotRun") for status in deps):
+                    results[name] = {"step": name, "status": "NotRun" if "Failed" in deps else "Skipped"}
+                    pending.remove(name)
+                elif all(status == "Succeeded" for status in deps):
+                    pending.remove(name)
+                    condition = STEPS[name].get("condition")
+                    if condition and not condition(ctx):
+                        results[name] = {"step": name, "status": "Skipped"}
+                        continue
+                    running[pool.submit(execute_step, name, ctx)] = name
+                    print(f"[{time.strftime('%H:%M:%S')}] started {name}")
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = {"step": name, "status": "Failed", "error": str(e)}
+                print(f"[{time.strftime('%H:%M:%S')}] {results[name]['status'].lower()} {name}")
+
+    return [results[name] for name in STEPS]
+
+
+def main(args):
+    work_dir = os.path.abspath(args.work_dir)
+    paths = {
+        "input": os.path.join(work_dir, "input"),
+        "train": os.path.join(work_dir, "processing", "train"),
+        "test": os.path.join(work_dir, "processing", "test"),
+        "model": os.path.join(work_dir, "train", "model"),
+        "evaluation": os.path.join(work_dir, "processing", "evaluation"),
+        "registry": os.path.join(work_dir, "registry"),
+        "logs": os.path.join(work_dir, "logs"),
+    }
+    for key in ("input", "logs"):
+        os.makedirs(paths[key], exist_ok=True)
+    shutil.copy(args.input_data, os.path.join(paths["input"], "real_estate.csv"))
+
+    env = dict(os.environ)
+    env.setdefault("MLFLOW_TRACKING_URI", f"file:{os.path.join(work_dir, 'mlruns')}")
+    env.setdefault("MLFLOW_EXPERIMENT_NAME", "RealEstate-Pipeline-local")
+
+    ctx = {
+        "work_dir": work_dir,
+        "paths": paths,
+        "env": env,
+        "cache_dir": os.path.abspath(args.cache_dir),
+        "use_cache": not args.no_cache,
+        "preprocess_mode": args.preprocess_mode,
+        "train_mode": args.train_mode,
+        "model_type": args.model_type,
+        "max_latency_regression": args.max_latency_regression,
+        "min_throughput_ratio": args.min_throughput_ratio,
+    }
+
+    start = time.perf_counter()
+    results = run_dag(ctx, args.workers)
+    wall_seconds = time.perf_counter() - start
+
+    print(f"\n{'step':<22} {'status':<10} {'cache':<5} {'time':>9}")
+    for r in results:
+        seconds = f"{r['seconds']:.2f}s" if "seconds" in r else "-"
+        print(f"{r['step']:<22} {r['status']:<10} {r.get('cache', '-'):<5} {seconds:>9}")
+    step_seconds = sum(r.get("seconds", 0) for r in results)
+    print(f"{'total':<22} {'':<10} {'':<5} {wall_seconds:>8.2f}s  (sum of steps {step_seconds:.2f}s)")
+
+    with open(os.path.join(work_dir, "run_report.json"), "w") as f:
+        json.dump({"wall_seconds": round(wall_seconds, 2), "steps": results}, f, indent=2)
+
+    for r in results:
+        if r["status"] == "Failed":
+            print(f"\n{r['step']} failed:\n{r['error']}")
+            sys.exit(1)
+
+    with open(os.path.join(paths["evaluation"], "evaluation.json")) as f:
+        metrics = json.load(f)["metrics"]
+    print(f"RMSE: {metrics['rmse']['value']:.4f}  is_better: {metrics['is_better']['value']}  "
+          f"perf_ok: {metrics['perf_ok']['value']}  -> {paths['evaluation']}/evaluation.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline DAG (preprocess -> train -> evaluate -> "
+                                                 "register / promote) locally with content-addressed step caching")
+    parser.add_argument("--input-data", type=str, default="data/real_estate.csv")
+    parser.add_argument("--work-dir", type=str, default=".pipeline_run")
+    parser.add_argument("--cache-dir", type=str, default=".pipeline_cache")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-cache", action="store_true", help="Run every step and refresh its cache entry")
+    parser.add_argument("--preprocess-mode", type=str, choices=["full", "streaming"], default="full")
+    parser.add_argument("--train-mode", type=str, choices=["full", "incremental", "search"], default="full")
+    parser.add_argument("--model-type", type=str, choices=["linear", "spatial_knn"], default="linear")
+    parser.add_argument("--max-latency-regression", type=float, default=1.5)
+    parser.add_argument("--min-throughput-ratio", type=float, default=0.67)
+    main(parser.parse_args())
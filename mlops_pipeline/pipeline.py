@@ -15,20 +15,22 @@ with redirect_stdout(f):
     import boto3
     import sagemaker
     from sagemaker.workflow.pipeline import Pipeline
-    from sagemaker.workflow.steps import ProcessingStep, TrainingStep
+    from sagemaker.workflow.steps import ProcessingStep, TrainingStep, CacheConfig
     from sagemaker.workflow.lambda_step import LambdaStep
     from sagemaker.workflow.condition_step import ConditionStep
     from sagemaker.workflow.conditions import ConditionEquals
     from sagemaker.workflow.parameters import ParameterString, ParameterFloat
     from sagemaker.processing import ScriptProcessor, ProcessingInput, ProcessingOutput
-    from sagemaker.sklearn.processing import SKLearnProcessor
     from sagemaker.estimator import Estimator
     from sagemaker.inputs import TrainingInput
     from sagemaker.lambda_helper import Lambda
     from sagemaker.workflow.properties import PropertyFile
     from sagemaker.workflow.functions import JsonGet
+    from sagemaker.workflow.execution_variables import ExecutionVariables
     from sagemaker.workflow.step_collections import RegisterModel
 
+    from step_cache import content_hash, script_closure
+
     try:
         role_arn = sys.argv[1]
         bucket_name = sys.argv[2]
@@ -45,30 +47,70 @@ with redirect_stdout(f):
     base_uri = f"s3://{bucket_name}"
     input_data = ParameterString(name="InputData", default_value=f"{base_uri}/datasets/real_estate/real_estate.csv")
     rmse_threshold = ParameterFloat(name="RmseThreshold", default_value=10.0)
+    train_mode = ParameterString(name="TrainMode", default_value="full")
+    # "linear" or "spatial_knn" (distance-weighted kNN over location), used by TrainMode=full
+    model_type = ParameterString(name="ModelType", default_value="linear")
+    preprocess_mode = ParameterString(name="PreprocessMode", default_value="full")
+    max_latency_regression = ParameterFloat(name="MaxLatencyRegression", default_value=1.5)
+    # Challenger throughput / Production throughput must stay above this. A slower but more accurate
+    # model (e.g. spatial_knn vs linear, 0.25-0.4x) needs it lowered for the run that introduces it.
+    min_throughput_ratio = ParameterFloat(name="MinThroughputRatio", default_value=0.67)
+    # S3 URIs are part of the cache key, but the object behind a fixed key can change: the trigger
+    # passes the uploaded object's ETag so a new CSV under the same key is a cache miss
+    input_data_hash = ParameterString(name="InputDataHash", default_value="none")
+    # Same for the incremental-mode statistics, which TrainModel reads from (and writes back to) a fixed key
+    stats_state_hash = ParameterString(name="StatsStateHash", default_value="none")
+    # "shadow": the challenger first gets mirrored traffic as a weight-0 variant (see monitoring/shadow.py)
+    deployment_mode = ParameterString(name="DeploymentMode", default_value="direct")
 
     boto_session = boto3.Session(region_name=region)
     sagemaker_session = sagemaker.Session(boto_session=boto_session, default_bucket=bucket_name)
     LOCAL_SCRIPT_PATH = "../mlops_pipeline/scripts"
 
+    # Step cache key = inputs + arguments + container settings. The scripts are baked into the image
+    # and source_dir lives at a fixed S3 key, so each step's code hash goes into its environment.
+    step_cache = CacheConfig(enable_caching=True, expire_after="P30D")
+    preprocess_code_hash = content_hash(script_closure(f"{LOCAL_SCRIPT_PATH}/preprocess.py"))
+    train_code_hash = content_hash(script_closure(f"{LOCAL_SCRIPT_PATH}/train.py")
+                                   + script_closure(f"{LOCAL_SCRIPT_PATH}/inference.py"))
+
+    # Shared by EvaluateModel and PromoteModel: both talk to MLflow, evaluation also uses the champion cache
+    script_processor = ScriptProcessor(
+        image_uri=training_image,
+        command=["python3"],
+        role=role_arn,
+        instance_type="ml.t3.medium",
+        instance_count=1,
+        sagemaker_session=sagemaker_session,
+        env={
+            "MLFLOW_TRACKING_URI": mlflow_uri,
+            "CHAMPION_CACHE_URI": f"{base_uri}/evaluation_cache"
+        }
+    )
+
     # --- 1. PREPROCESSING ---
-    sklearn_processor = SKLearnProcessor(
-        framework_version="1.2-1",
+    # Runs on the training image so it shares dataset_io.py (Parquet schema) with train/evaluate
+    script_preprocess = ScriptProcessor(
+        image_uri=training_image,
+        command=["python3"],
         role=role_arn,
         instance_type="ml.t3.medium",
         instance_count=1,
         sagemaker_session=sagemaker_session,
-        env={"MLFLOW_TRACKING_URI": mlflow_uri}
+        env={"CODE_HASH": preprocess_code_hash}
     )
 
     step_process = ProcessingStep(
         name="PreprocessData",
-        processor=sklearn_processor,
+        processor=script_preprocess,
         inputs=[ProcessingInput(source=input_data, destination="/opt/ml/processing/input")],
         outputs=[
             ProcessingOutput(output_name="train", source="/opt/ml/processing/train"),
             ProcessingOutput(output_name="test", source="/opt/ml/processing/test")
         ],
         code=f"{LOCAL_SCRIPT_PATH}/preprocess.py",
+        job_arguments=["--mode", preprocess_mode, "--input-hash", input_data_hash],
+        cache_config=step_cache,
     )
 
     # --- 2. TRAINING ---
@@ -83,7 +125,12 @@ with redirect_stdout(f):
         entry_point="train.py",
         environment={
             "MLFLOW_TRACKING_URI": mlflow_uri,
-            "MLFLOW_EXPERIMENT_NAME": f"RealEstate-Pipeline-{project_name}"
+            "MLFLOW_EXPERIMENT_NAME": f"RealEstate-Pipeline-{project_name}",
+            "TRAIN_MODE": train_mode,
+            "MODEL_TYPE": model_type,
+            "SUFFICIENT_STATS_URI": f"{base_uri}/training_state/linear_stats.json",
+            "STATS_STATE_HASH": stats_state_hash,
+            "CODE_HASH": train_code_hash
         }
     )
 
@@ -93,22 +140,15 @@ with redirect_stdout(f):
         inputs={
             "train": TrainingInput(
                 s3_data=step_process.properties.ProcessingOutputConfig.Outputs["train"].S3Output.S3Uri,
-                content_type="text/csv"
+                content_type="application/x-parquet"
             )
-        }
+        },
+        cache_config=step_cache,
     )
 
     # --- 3. EVALUATION ---
-    script_eval = ScriptProcessor(
-        image_uri=training_image,
-        command=["python3"],
-        role=role_arn,
-        instance_type="ml.t3.medium",
-        instance_count=1,
-        sagemaker_session=sagemaker_session,
-        env={"MLFLOW_TRACKING_URI": mlflow_uri}
-    )
-
+    # Not cached: the verdict also depends on the current Production model in MLflow, which is not
+    # part of SageMaker's cache key. Re-scoring the champion is already cached by CHAMPION_CACHE_URI.
     evaluation_report = PropertyFile(
         name="EvaluationReport",
         output_name="evaluation",
@@ -117,7 +157,7 @@ with redirect_stdout(f):
 
     step_eval = ProcessingStep(
         name="EvaluateModel",
-        processor=script_eval,
+        processor=script_processor,
         inputs=[
             ProcessingInput(
                 source=step_train.properties.ModelArtifacts.S3ModelArtifacts,
@@ -130,6 +170,8 @@ with redirect_stdout(f):
         ],
         outputs=[ProcessingOutput(output_name="evaluation", source="/opt/ml/processing/evaluation")],
         code=f"{LOCAL_SCRIPT_PATH}/evaluate.py",
+        job_arguments=["--max-latency-regression", max_latency_regression.to_string(),
+                       "--min-throughput-ratio", min_throughput_ratio.to_string()],
         property_files=[evaluation_report],
     )
 
@@ -143,7 +185,9 @@ with redirect_stdout(f):
         inference_instances=["ml.m5.large"],
         transform_instances=["ml.m5.large"],
         model_package_group_name=f"RealEstateModelGroup-{project_name}",
-        approval_status="Approved",
+        # The deploy Lambda approves the package once it serves all traffic (after the shadow decision
+        # in shadow mode), so the repair path only ever redeploys a model that went live
+        approval_status="PendingManualApproval",
 
         depends_on=[step_eval]
     )
@@ -151,8 +195,15 @@ with redirect_stdout(f):
     # --- 5. PROMOTION ---
     step_promote = ProcessingStep(
         name="PromoteModelInMLflow",
-        processor=script_eval,
+        processor=script_processor,
+        inputs=[
+            ProcessingInput(
+                source=step_eval.properties.ProcessingOutputConfig.Outputs["evaluation"].S3Output.S3Uri,
+                destination="/opt/ml/processing/evaluation"
+            )
+        ],
         code=f"{LOCAL_SCRIPT_PATH}/promote.py",
+        job_arguments=["--deployment-mode", deployment_mode],
         depends_on=[step_register]
     )
 
@@ -165,7 +216,18 @@ with redirect_stdout(f):
         inputs={
             "model_package_arn": step_register.properties.ModelPackageArn,
             "endpoint_name": f"real-estate-endpoint-{project_name}",
-            "role_arn": role_arn
+            "role_arn": role_arn,
+            "deployment_mode": deployment_mode,
+            "pipeline_execution_arn": ExecutionVariables.PIPELINE_EXECUTION_ARN,
+            # Recorded with the deployment in the history table (EVAL_METRIC_KEYS in deploy_lambda/handler.py)
+            **{key: JsonGet(step_name=step_eval.name, property_file=evaluation_report,
+                            json_path=f"metrics.{key}.value")
+               for key in ["rmse", "latency_p50_ms", "latency_p99_ms", "throughput_rows_per_sec"]},
+            "champion_rmse": JsonGet(step_name=step_eval.name, property_file=evaluation_report,
+                                     json_path="champion_rmse"),
+            # Made Production in MLflow by the deploy Lambda if a shadow deployment is promoted
+            "mlflow_model_version": JsonGet(step_name=step_eval.name, property_file=evaluation_report,
+                                            json_path="model.version")
         }
     )
 
@@ -179,9 +241,18 @@ with redirect_stdout(f):
         right=1.0
     )
 
+    cond_perf = ConditionEquals(
+        left=JsonGet(
+            step_name=step_eval.name,
+            property_file=evaluation_report,
+            json_path="metrics.perf_ok.value"
+        ),
+        right=1.0
+    )
+
     step_cond = ConditionStep(
         name="CheckBetterThanProd",
-        conditions=[cond_lte],
+        conditions=[cond_lte, cond_perf],
         if_steps=[step_register, step_deploy, step_promote],
         else_steps=[]
     )
@@ -189,7 +260,8 @@ with redirect_stdout(f):
     # --- PACKAGING ---
     pipeline = Pipeline(
         name=f"RealEstatePipeline-{project_name}",
-        parameters=[input_data, rmse_threshold],
+        parameters=[input_data, rmse_threshold, train_mode, model_type, preprocess_mode, max_latency_regression,
+                    min_throughput_ratio, input_data_hash, stats_state_hash, deployment_mode],
         steps=[step_process, step_train, step_eval, step_cond],
         sagemaker_session=sagemaker_session
     )
@@ -1,21 +1,18 @@
 import boto3
 import logging
 import os
-import json
-from datetime import date, datetime
+
+import autoscaling
+from deployment_history import DeploymentHistory
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def json_serial(obj):
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    raise TypeError("Type %s not serializable" % type(obj))
-
-
 REGION = os.environ.get("AWS_REGION", "eu-north-1")
 sm = boto3.client("sagemaker", region_name=REGION)
+aas = boto3.client("application-autoscaling", region_name=REGION)
+history = DeploymentHistory()
 
 
 def lambda_handler(event, context):
@@ -36,45 +33,22 @@ def lambda_handler(event, context):
         current_config_name = response["EndpointConfigName"]
         logger.info(f"📍 Current active config: {current_config_name}")
 
-        logger.info("Step 2: Listing endpoint configurations...")
-
-        history = sm.list_endpoint_configs(
-            SortBy="CreationTime",
-            SortOrder="Descending",
-            MaxResults=50
-        )
-
-        logger.info(f"AWS Raw Response keys: {history.keys()}")
-        configs = history.get("EndpointConfigs", [])
-        logger.info(f"📊 Found {len(configs)} configurations in account.")
-
-        if not configs:
-            logger.error(f"FULL AWS RESPONSE: {json.dumps(history, default=json_serial)}")
-            raise Exception(f"No endpoint configurations found in region {REGION}! Please check region settings.")
-
-        previous_config_name = None
-
-        for config in configs:
-            name = config["EndpointConfigName"]
-            if len(configs) > 0 and config == configs[0]:
-                logger.info(f"Latest candidate: {name}")
-
-            if name != current_config_name:
-                previous_config_name = name
-                logger.info(f"✅ Found previous candidate: {name}")
-                break
+        logger.info("Step 2: Looking up previous good config in deployment history...")
+        previous_config_name = history.rollback_target(endpoint_name, current_config_name)
 
-        if not previous_config_name:
-            all_names = [c["EndpointConfigName"] for c in configs]
-            logger.error(f"Available configs: {all_names}")
-            raise Exception(f"Could not find any previous configuration distinct from {current_config_name}")
+        if not previous_config_name or previous_config_name == current_config_name:
+            raise Exception(f"No previous good configuration recorded for {endpoint_name} "
+                            f"(current: {current_config_name})")
 
         logger.info(f"🔙 Rolling back to: {previous_config_name}")
 
+        # The deploy Lambda's health check registers autoscaling again once the endpoint is InService
+        autoscaling.deregister(aas, endpoint_name)
         sm.update_endpoint(
             EndpointName=endpoint_name,
             EndpointConfigName=previous_config_name
         )
+        history.record_rollback(endpoint_name, current_config_name, previous_config_name)
 
         return {
             "statusCode": 200,
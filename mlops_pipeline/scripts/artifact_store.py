@@ -0,0 +1,52 @@
+import os
+from urllib.parse import urlparse
+
+_s3 = None
+
+
+def _s3_client():
+    global _s3
+    if _s3 is None:
+        import boto3
+        _s3 = boto3.client("s3")
+    return _s3
+
+
+def _split(uri):
+    parsed = urlparse(uri)
+    return parsed.netloc, parsed.path.lstrip("/")
+
+
+def is_s3(uri: str) -> bool:
+    return uri.startswith("s3://")
+
+
+def read_bytes(uri: str):
+    # Returns None when the object does not exist yet
+    if is_s3(uri):
+        bucket, key = _split(uri)
+        client = _s3_client()
+        try:
+            return client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except client.exceptions.NoSuchKey:
+            return None
+
+    if not os.path.exists(uri):
+        return None
+    with open(uri, "rb") as f:
+        return f.read()
+
+
+def write_bytes(uri: str, data: bytes):
+    if is_s3(uri):
+        bucket, key = _split(uri)
+        _s3_client().put_object(Bucket=bucket, Key=key, Body=data)
+        return
+
+    parent = os.path.dirname(uri)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{uri}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, uri)
@@ -0,0 +1,76 @@
+import io
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import artifact_store
+
+# (column, bin edges, labels); np.digitize with right=False, so edges are lower bounds
+SEGMENTS = {
+    "mrt_distance": ("X3 distance to the nearest MRT station", [0, 300, 1000, 3000],
+                     ["<300m", "300-1000m", "1000-3000m", ">=3000m"]),
+    "convenience_stores": ("X4 number of convenience stores", [0, 3, 6],
+                           ["0-2", "3-5", "6+"]),
+    "house_age": ("X2 house age", [0, 10, 30],
+                  ["<10y", "10-30y", ">=30y"]),
+}
+
+
+def dataset_fingerprint(X: pd.DataFrame, y: pd.Series) -> str:
+    h = hashlib.sha256()
+    h.update(",".join(X.columns).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def cache_uri(prefix: str, model_version, fingerprint: str) -> str:
+    return f"{prefix.rstrip('/')}/champion_v{model_version}_{fingerprint[:32]}.npy"
+
+
+def cached_predictions(prefix, model_version, fingerprint, load_model, X):
+    # Returns (predictions, cache_hit). Without a prefix every call re-scores.
+    uri = cache_uri(prefix, model_version, fingerprint) if prefix else None
+
+    if uri:
+        data = artifact_store.read_bytes(uri)
+        if data is not None:
+            preds = np.load(io.BytesIO(data), allow_pickle=False)
+            if len(preds) == len(X):
+                return preds, True
+
+    preds = np.asarray(load_model().predict(X), dtype=np.float64)
+
+    if uri:
+        buffer = io.BytesIO()
+        np.save(buffer, preds, allow_pickle=False)
+        artifact_store.write_bytes(uri, buffer.getvalue())
+    return preds, False
+
+
+def rmse(y, preds) -> float:
+    return float(np.sqrt(np.mean((np.asarray(y, dtype=np.float64) - preds) ** 2)))
+
+
+def segment_rmse(X: pd.DataFrame, y, predictions: dict) -> dict:
+    # One bincount per model and segmentation instead of a groupby per segment
+    y = np.asarray(y, dtype=np.float64)
+    report = {}
+
+    for segment, (column, edges, labels) in SEGMENTS.items():
+        ids = np.clip(np.digitize(X[column].to_numpy(), edges[1:]), 0, len(labels) - 1)
+        counts = np.bincount(ids, minlength=len(labels))
+
+        per_model = {}
+        for name, preds in predictions.items():
+            sse = np.bincount(ids, weights=(y - preds) ** 2, minlength=len(labels))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                per_model[name] = np.sqrt(sse / counts)
+
+        report[segment] = {
+            label: {"n": int(counts[i]),
+                    **{f"{name}_rmse": (float(values[i]) if counts[i] else None) for name, values in per_model.items()}}
+            for i, label in enumerate(labels)
+        }
+    return report
@@ -0,0 +1,66 @@
+import json
+import math
+
+import numpy as np
+
+from feature_schema import DECODER, FEATURE_COLUMNS, VALID_RANGES
+
+# Wire format of the scoring entry points (inference.py, app.py). Most requests carry a handful of rows,
+# where numpy's per-call setup costs more than the conversion itself, so up to SMALL_BATCH rows are
+# parsed and range-checked in plain Python. Anything else, including every payload the fast path
+# rejects, goes through DECODER, which also produces the error message.
+SMALL_BATCH = 16
+BOUNDS = [VALID_RANGES[c] for c in FEATURE_COLUMNS]
+WIDTH = len(FEATURE_COLUMNS)
+
+
+def _small_rows(rows):
+    # -> float64 (n, WIDTH) array, or None when the rows need the general decoder
+    if not rows or len(rows) > SMALL_BATCH:
+        return None
+    parsed = []
+    for row in rows:
+        if not isinstance(row, (list, tuple)) or len(row) != WIDTH:
+            return None
+        try:
+            values = [float(v) for v in row]
+        except (TypeError, ValueError):
+            return None
+        for value, (low, high) in zip(values, BOUNDS):
+            if not low <= value <= high:  # also false for NaN
+                return None
+        parsed.append(values)
+    return np.array(parsed, dtype=np.float64)
+
+
+def decode_request(body, content_type):
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+
+    if content_type == "text/csv":
+        if body.count("\n") <= SMALL_BATCH:
+            X = _small_rows([line.split(",") for line in body.splitlines() if line.strip()])
+            if X is not None:
+                return X
+        return DECODER.decode_csv(body)
+
+    if content_type == "application/json":
+        payload = json.loads(body) if isinstance(body, str) else body
+        rows = payload.get("data", payload.get("instances")) if isinstance(payload, dict) else payload
+        if isinstance(rows, list) and rows and not isinstance(rows[0], (list, dict)):
+            rows = [rows]
+        X = _small_rows(rows) if isinstance(rows, list) else None
+        return X if X is not None else DECODER.decode_json(payload)
+
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def encode_predictions(prediction):
+    # The same text json.dumps({"predictions": ...}) produces: for finite numbers a list's repr is
+    # valid JSON, and building it skips the encoder's per-call setup
+    prediction = np.asarray(prediction)
+    values = prediction.tolist()
+    if prediction.ndim == 1 and prediction.dtype.kind in "iuf":
+        if prediction.dtype.kind != "f" or all(map(math.isfinite, values)):
+            return '{"predictions": ' + repr(values) + "}"
+    return json.dumps({"predictions": values})
@@ -0,0 +1,117 @@
+import os
+import glob
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from feature_schema import COLUMN_DTYPES, FEATURE_COLUMNS, TARGET
+
+SCHEMA_VERSION = 1
+SCHEMA_METADATA_KEY = b"real_estate.schema"
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({c: t for c, t in COLUMN_DTYPES.items() if c in df.columns})
+
+
+def write_dataset(df: pd.DataFrame, path_stem: str, fmt: str = "parquet") -> str:
+    if fmt == "csv":
+        path = f"{path_stem}.csv"
+        df.to_csv(path, index=False, header=False)
+        return path
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(to_typed(df), preserve_index=False)
+    schema = {
+        "version": SCHEMA_VERSION,
+        "feature_columns": FEATURE_COLUMNS,
+        "target": TARGET,
+        "dtypes": {c: COLUMN_DTYPES[c] for c in df.columns if c in COLUMN_DTYPES},
+    }
+    metadata = dict(table.schema.metadata or {})
+    metadata[SCHEMA_METADATA_KEY] = json.dumps(schema).encode("utf-8")
+
+    path = f"{path_stem}.parquet"
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+    return path
+
+
+def read_schema(path: str) -> dict:
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    if SCHEMA_METADATA_KEY not in metadata:
+        raise ValueError(f"{path} has no embedded dataset schema")
+    return json.loads(metadata[SCHEMA_METADATA_KEY])
+
+
+def _read_csv(path: str, columns=None) -> pd.DataFrame:
+    # Legacy headerless CSV: columns are only known by position
+    with open(path) as f:
+        n_cols = len(f.readline().split(","))
+
+    expected_cols = len(FEATURE_COLUMNS) + 1
+    names = FEATURE_COLUMNS + [TARGET]
+    if n_cols == expected_cols + 1:
+        names = ["__index__"] + names
+    elif n_cols != expected_cols:
+        raise ValueError(f"Bad columns in {path}: {n_cols}")
+
+    columns = columns or FEATURE_COLUMNS + [TARGET]
+    # Parse straight into the target dtypes instead of inferring float64 and casting
+    df = pd.read_csv(path, header=None, names=names, usecols=columns,
+                     dtype={c: COLUMN_DTYPES[c] for c in columns if c in COLUMN_DTYPES})
+    return df[columns]
+
+
+def read_dataset(path: str, columns=None) -> pd.DataFrame:
+    if not path.endswith(".parquet"):
+        return _read_csv(path, columns)
+
+    import pyarrow.parquet as pq
+
+    schema = read_schema(path)
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"{path} has schema version {schema.get('version')}, expected {SCHEMA_VERSION}")
+    if schema.get("feature_columns") != FEATURE_COLUMNS:
+        raise ValueError(f"{path} feature columns {schema.get('feature_columns')} do not match {FEATURE_COLUMNS}")
+
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def list_dataset_files(directory: str) -> list:
+    files = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+    if not files:
+        files = sorted(glob.glob(os.path.join(directory, "*.csv")))
+    return files
+
+
+def load_shards(files: list, columns=None, max_workers=None):
+    # Parquet and CSV parsing both release the GIL, so threads overlap I/O and decoding
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(files), os.cpu_count() or 1)) as executor:
+        frames = list(executor.map(lambda path: read_dataset(path, columns), files))
+
+    reference = frames[0].dtypes
+    for path, frame in zip(files, frames):
+        if list(frame.columns) != list(reference.index) or not frame.dtypes.equals(reference):
+            raise ValueError(f"Shard {path} schema {dict(frame.dtypes.astype(str))} does not match "
+                             f"{files[0]} schema {dict(reference.astype(str))}")
+
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    seconds = time.perf_counter() - start
+
+    bytes_read = sum(os.path.getsize(path) for path in files)
+    stats = {
+        "load_files": len(files),
+        "load_rows": len(df),
+        "load_seconds": seconds,
+        "load_rows_per_sec": len(df) / seconds if seconds else 0.0,
+        "load_mb_per_sec": bytes_read / 1e6 / seconds if seconds else 0.0,
+        "load_memory_mb": df.memory_usage(deep=True).sum() / 1e6,
+    }
+    return df, stats
@@ -15,9 +15,15 @@ import mlflow
 from mlflow.tracking import MlflowClient
 from sklearn.metrics import mean_squared_error
 
-FEATURE_COLUMNS = ["X1 transaction date", "X2 house age", "X3 distance to the nearest MRT station",
-                   "X4 number of convenience stores", "X5 latitude", "X6 longitude"]
-TARGET = "Y house price of unit area"
+# Processing jobs only receive the entry script; shared modules ship in the training image
+sys.path.append("/opt/ml/code")
+
+from dataset_io import list_dataset_files, read_dataset
+from feature_schema import FEATURE_COLUMNS, TARGET
+from model_perf import PERF_METRICS, benchmark_model, check_regressions
+from mlflow_batch import BatchLogger
+from champion import cached_predictions, dataset_fingerprint, rmse, segment_rmse
+
 
 if __name__ == "__main__":
     logger.info("--- Starting Evaluation Script ---")
@@ -25,6 +31,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--test-data", type=str, default="/opt/ml/processing/test")
     parser.add_argument("--model-path", type=str, default="/opt/ml/processing/model")
+    parser.add_argument("--output-dir", type=str, default="/opt/ml/processing/evaluation")
+    parser.add_argument("--champion-cache-uri", type=str, default=os.environ.get("CHAMPION_CACHE_URI"))
+    parser.add_argument("--max-latency-regression", type=float, default=1.5)
+    parser.add_argument("--latency-slack-ms", type=float, default=1.0)
+    parser.add_argument("--min-throughput-ratio", type=float, default=0.67)
+    parser.add_argument("--max-load-time-regression", type=float, default=2.0)
+    parser.add_argument("--max-artifact-regression", type=float, default=2.0)
     args = parser.parse_args()
 
     # 1. Setup MLflow
@@ -62,20 +75,27 @@ if __name__ == "__main__":
     else:
         logger.warning("run_id.txt not found! Metrics will not be attached to the training run.")
 
+    # The registry version this model was logged as. A cached TrainModel step hands over an earlier
+    # run's model, so PromoteModelInMLflow must promote this version rather than the newest one.
+    model_version = None
+    if parent_run_id:
+        try:
+            versions = client.search_model_versions(f"name='RealEstateModel' and run_id='{parent_run_id}'")
+            model_version = versions[0].version if versions else None
+        except Exception as e:
+            logger.warning(f"Could not look up the registered version of run {parent_run_id}: {e}")
+    logger.info(f"Challenger registry version: {model_version}")
+
     # 4. Load Data
-    test_file = os.path.join(args.test_data, "test.csv")
-    logger.info(f"Reading test data from {test_file}")
+    test_files = list_dataset_files(args.test_data)
+    logger.info(f"Reading test data from {test_files}")
 
     try:
-        df = pd.read_csv(test_file, header=None)
+        if not test_files:
+            raise FileNotFoundError(f"No Parquet or CSV files in {args.test_data}")
+        df = pd.concat([read_dataset(path, FEATURE_COLUMNS + [TARGET]) for path in test_files], ignore_index=True)
         logger.info(f"Data loaded. Shape: {df.shape}")
 
-        if df.shape[1] == len(FEATURE_COLUMNS) + 1:
-            df.columns = FEATURE_COLUMNS + [TARGET]
-        else:
-            logger.warning(f"Unexpected column count: {df.shape[1]}. Expected {len(FEATURE_COLUMNS) + 1}")
-            df.columns = FEATURE_COLUMNS + [TARGET]
-
         X_test = df[FEATURE_COLUMNS]
         y_test = df[TARGET]
     except Exception as e:
@@ -88,30 +108,54 @@ if __name__ == "__main__":
     test_rmse = mean_squared_error(y_test, preds, squared=False)
     logger.info(f"🆕 Challenger RMSE (Test): {test_rmse}")
 
-    # 6. Log to MLflow
+    logger.info("Benchmarking challenger inference performance...")
+    perf = benchmark_model("model.pkl", model_tar, X_test)
+    logger.info(f"⏱️ Challenger perf: {perf}")
+
+    # 6. Log to MLflow (queued; sent in the background while the champion is scored)
+    batch_logger = None
     if parent_run_id:
-        try:
-            logger.info(f"Logging 'test_rmse' to run {parent_run_id}...")
-            client.log_metric(parent_run_id, "test_rmse", test_rmse)
-            client.log_metric(parent_run_id, "rmse", test_rmse)
-            client.set_tag(parent_run_id, "evaluation_stage", "completed")
-            logger.info("Metrics logged successfully.")
-        except Exception as e:
-            logger.error(f"Error logging to MLflow: {e}")
+        logger.info(f"Queueing 'test_rmse' and perf metrics for run {parent_run_id}...")
+        batch_logger = BatchLogger(client, parent_run_id)
+        batch_logger.log_metrics({"test_rmse": test_rmse, "rmse": test_rmse})
+        batch_logger.log_metrics({f"perf_{name}": value for name, value in perf.items()})
+        batch_logger.set_tag("evaluation_stage", "completed")
 
-    # 7. Compare with Production
+    # 7. Compare with Production (re-scored on this exact test set)
     prod_rmse = float("inf")
+    prod_perf = {}
+    predictions = {"challenger": preds}
     try:
-        logger.info("Fetching Production model metrics...")
+        logger.info("Fetching Production model...")
         prod_model = client.get_model_version_by_alias("RealEstateModel", "Production")
         prod_run = client.get_run(prod_model.run_id)
 
-        prod_rmse = prod_run.data.metrics.get("test_rmse", prod_run.data.metrics.get("rmse", float("inf")))
-        logger.info(f"🏆 Champion (Prod) RMSE: {prod_rmse}")
+        prod_perf = {name: prod_run.data.metrics[f"perf_{name}"] for name in PERF_METRICS
+                     if f"perf_{name}" in prod_run.data.metrics}
+        logger.info(f"🏆 Champion (Prod) perf: {prod_perf or 'not recorded'}")
+
+        try:
+            fingerprint = dataset_fingerprint(X_test, y_test)
+            champion_preds, cache_hit = cached_predictions(
+                args.champion_cache_uri, prod_model.version, fingerprint,
+                lambda: mlflow.sklearn.load_model(f"models:/RealEstateModel/{prod_model.version}"),
+                X_test
+            )
+            predictions["champion"] = champion_preds
+            prod_rmse = rmse(y_test, champion_preds)
+            logger.info(f"🏆 Champion (Prod v{prod_model.version}) RMSE on this test set: {prod_rmse} "
+                        f"({'cached predictions' if cache_hit else 'scored now'}, test set {fingerprint[:12]})")
+        except Exception as e:
+            prod_rmse = prod_run.data.metrics.get("test_rmse", prod_run.data.metrics.get("rmse", float("inf")))
+            logger.warning(f"Could not re-score Production model ({e}). Falling back to its recorded RMSE: {prod_rmse}")
     except Exception as e:
         logger.warning(f"No production model found or error fetching metrics: {e}")
         logger.info("Assuming Challenger is better (First run).")
 
+    segments = segment_rmse(X_test, y_test, predictions)
+    for segment, rows in segments.items():
+        logger.info(f"📊 {segment}: {rows}")
+
     # Logic
     is_better = 1.0 if test_rmse < prod_rmse else 0.0
 
@@ -120,14 +164,51 @@ if __name__ == "__main__":
     else:
         logger.info("❌ DECISION: New model is WORSE. (Will skip deployment)")
 
-    # 8. Report for SageMaker ConditionStep
-    report = {"metrics": {"rmse": {"value": test_rmse}, "is_better": {"value": is_better}}}
+    perf_ok, perf_checks = check_regressions(
+        perf, prod_perf,
+        max_latency_ratio=args.max_latency_regression,
+        latency_slack_ms=args.latency_slack_ms,
+        min_throughput_ratio=args.min_throughput_ratio,
+        max_load_ratio=args.max_load_time_regression,
+        max_artifact_ratio=args.max_artifact_regression
+    )
+    perf_ok = 1.0 if perf_ok else 0.0
+
+    for name, check in perf_checks.items():
+        if not check["ok"]:
+            logger.info(f"🐢 Perf regression on {name}: {check['challenger']:.4f} vs Prod {check['production']:.4f} "
+                        f"(limit {check['limit']:.4f})")
+    if perf_ok:
+        logger.info("✅ PERF GATE: within regression thresholds.")
+    else:
+        logger.info("❌ PERF GATE: challenger is too slow/heavy. (Will skip deployment)")
 
-    output_dir = "/opt/ml/processing/evaluation"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "evaluation.json")
+    # 8. Report for SageMaker ConditionStep
+    report = {
+        "metrics": {
+            "rmse": {"value": test_rmse},
+            "is_better": {"value": is_better},
+            "perf_ok": {"value": perf_ok},
+            **{name: {"value": value} for name, value in perf.items()}
+        },
+        "performance": {"challenger": perf, "production": prod_perf, "checks": perf_checks},
+        "champion_rmse": prod_rmse if prod_rmse != float("inf") else None,
+        "model": {"run_id": parent_run_id, "version": model_version},
+        "segments": segments
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, "evaluation.json")
 
     with open(output_path, "w") as f:
         json.dump(report, f)
 
-    logger.info(f"Evaluation report saved to {output_path}")
\ No newline at end of file
+    logger.info(f"Evaluation report saved to {output_path}")
+
+    if batch_logger:
+        batch_logger.close()
+        if batch_logger.errors:
+            logger.error(f"Error logging to MLflow: {batch_logger.errors} batch request(s) failed")
+        else:
+            logger.info(f"Metrics logged successfully ({batch_logger.items_logged} items in "
+                        f"{batch_logger.requests_sent} request(s)).")
\ No newline at end of file
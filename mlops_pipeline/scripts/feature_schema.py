@@ -0,0 +1,123 @@
+import io
+import json
+
+import numpy as np
+
+# Single definition of the model's input: column order, storage dtypes and plausible ranges.
+# Shipped in the training/serving image (/opt/ml/code) and copied into the monitoring image.
+
+FEATURE_COLUMNS = ["X1 transaction date", "X2 house age", "X3 distance to the nearest MRT station",
+                   "X4 number of convenience stores", "X5 latitude", "X6 longitude"]
+TARGET = "Y house price of unit area"
+
+# float32 only where its ~7 significant digits cover the source precision;
+# latitude/longitude carry 5 decimals on values > 100 and stay float64.
+COLUMN_DTYPES = {
+    "X1 transaction date": "float64",
+    "X2 house age": "float32",
+    "X3 distance to the nearest MRT station": "float32",
+    "X4 number of convenience stores": "uint8",
+    "X5 latitude": "float64",
+    "X6 longitude": "float64",
+    TARGET: "float32",
+}
+
+# Physically plausible bounds, wide on purpose: requests outside them are malformed, not drifted
+VALID_RANGES = {
+    "X1 transaction date": (1900.0, 2100.0),
+    "X2 house age": (0.0, 500.0),
+    "X3 distance to the nearest MRT station": (0.0, 1e6),
+    "X4 number of convenience stores": (0.0, 255.0),
+    "X5 latitude": (-90.0, 90.0),
+    "X6 longitude": (-180.0, 180.0),
+}
+
+
+def first_row(payload):
+    # Payload shapes the API accepts -> the first feature row as logged: {"data": [[...]]}, [[...]], [...]
+    if isinstance(payload, dict) and "data" in payload:
+        payload = payload["data"]
+    if not isinstance(payload, list):
+        return None
+    if payload and isinstance(payload[0], list):
+        return payload[0]
+    return payload
+
+
+class FeatureDecoder:
+    # Built once per process with the bound vectors precomputed; every payload shape becomes a
+    # C-contiguous float64 (n, n_features) array in a single numpy conversion.
+
+    def __init__(self, columns, ranges):
+        self.columns = list(columns)
+        self.width = len(self.columns)
+        self.low = np.array([ranges[c][0] for c in self.columns], dtype=np.float64)
+        self.high = np.array([ranges[c][1] for c in self.columns], dtype=np.float64)
+
+    def decode(self, body, content_type):
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode("utf-8")
+        if content_type == "text/csv":
+            return self.decode_csv(body)
+        if content_type == "application/json":
+            return self.decode_json(json.loads(body) if isinstance(body, str) else body)
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    def decode_json(self, payload):
+        # {"data": rows}, {"instances": rows}, rows or a single row; rows are lists or {column: value} dicts
+        if isinstance(payload, dict):
+            if "data" in payload:
+                payload = payload["data"]
+            elif "instances" in payload:
+                payload = payload["instances"]
+            else:
+                payload = [payload]
+        if isinstance(payload, list) and payload and isinstance(payload[0], dict):
+            payload = [self._dict_row(row) for row in payload]
+        try:
+            X = np.array(payload, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Feature rows must be numeric and have {self.width} values each: {e}")
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return self._checked(X)
+
+    def decode_csv(self, text):
+        # numpy's C tokenizer: no intermediate DataFrame, and ragged or non-numeric rows raise ValueError
+        text = text.strip()
+        if not text:
+            raise ValueError("No feature rows in payload")
+        header = not self._numeric(text.split(",", 1)[0])
+        try:
+            X = np.loadtxt(io.StringIO(text), delimiter=",", dtype=np.float64, ndmin=2, skiprows=int(header))
+        except ValueError as e:
+            raise ValueError(f"Every CSV row must have {self.width} numeric values: {e}")
+        return self._checked(X)
+
+    def _dict_row(self, row):
+        missing = [c for c in self.columns if c not in row]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        return [row[c] for c in self.columns]
+
+    @staticmethod
+    def _numeric(value):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+
+    def _checked(self, X):
+        if X.ndim != 2 or X.shape[1] != self.width:
+            raise ValueError(f"Expected rows of {self.width} features, got shape {X.shape}")
+        if not X.shape[0]:
+            raise ValueError("No feature rows in payload")
+        bad = ~((X >= self.low) & (X <= self.high))  # also catches NaN
+        if bad.any():
+            columns = [self.columns[i] for i in np.flatnonzero(bad.any(axis=0))]
+            raise ValueError(f"Features outside their valid range (or NaN): {columns}")
+        return X
+
+
+DECODER = FeatureDecoder(FEATURE_COLUMNS, VALID_RANGES)
@@ -1,15 +1,14 @@
 import os
-import json
 import logging
-from io import StringIO
 import joblib
 import pandas as pd
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+from codec import decode_request, encode_predictions
+from feature_schema import FEATURE_COLUMNS
 
-FEATURE_COLUMNS = ["X1 transaction date", "X2 house age", "X3 distance to the nearest MRT station",
-                   "X4 number of convenience stores", "X5 latitude", "X6 longitude"]
+logger = logging.getLogger(__name__)
+# Per-request lines are DEBUG; LOG_LEVEL=DEBUG brings them back
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
 
 def model_fn(model_dir: str):
@@ -25,30 +24,21 @@ def model_fn(model_dir: str):
 
 
 def input_fn(request_body, request_content_type):
-    logger.info(f"Received content type: {request_content_type}")
-
-    if request_content_type == "text/csv":
-        df = pd.read_csv(StringIO(request_body), header=None)
-        df.columns = FEATURE_COLUMNS
-        return df
-
-    elif request_content_type == "application/json":
-        data = json.loads(request_body)
-        if isinstance(data, dict) and "data" in data:
-            data = data["data"]
-
-        df = pd.DataFrame(data, columns=FEATURE_COLUMNS)
-        return df
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Received content type: {request_content_type}")
 
-    else:
-        raise ValueError(f"Unsupported content type: {request_content_type}")
+    # CSV and every JSON shape decode straight into one float array; out-of-range values raise ValueError
+    return pd.DataFrame(decode_request(request_body, request_content_type), columns=FEATURE_COLUMNS)
 
 
 def predict_fn(input_data, model):
-    logger.info(f"Making prediction for shape: {input_data.shape}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Making prediction for shape: {input_data.shape}")
     return model.predict(input_data)
 
 
 def output_fn(prediction, response_content_type):
-    logger.info(f"Formatting prediction: {prediction}")
-    return json.dumps({"predictions": prediction.tolist()})
\ No newline at end of file
+    # Formatting the whole array for the log cost more than scoring it, so it only happens at DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Formatting prediction: {prediction}")
+    return encode_predictions(prediction)
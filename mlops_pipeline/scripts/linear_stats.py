@@ -0,0 +1,151 @@
+import json
+import hashlib
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+
+class SufficientStats:
+    # Centered normal-equation statistics for ordinary least squares with intercept.
+    # Batches are combined with the pairwise (Chan et al.) update, so a fold-in costs
+    # O(new rows) and the solve only touches a d x d system.
+
+    def __init__(self, n, mean_x, mean_y, sxx, sxy, syy):
+        self.n = int(n)
+        self.mean_x = np.asarray(mean_x, dtype=np.float64)
+        self.mean_y = float(mean_y)
+        self.sxx = np.asarray(sxx, dtype=np.float64)
+        self.sxy = np.asarray(sxy, dtype=np.float64)
+        self.syy = float(syy)
+
+    @classmethod
+    def empty(cls, n_features):
+        return cls(0, np.zeros(n_features), 0.0, np.zeros((n_features, n_features)), np.zeros(n_features), 0.0)
+
+    @classmethod
+    def from_data(cls, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(X) == 0:
+            return cls.empty(X.shape[1])
+
+        mean_x = X.mean(axis=0)
+        mean_y = y.mean()
+        Xc = X - mean_x
+        yc = y - mean_y
+        return cls(len(X), mean_x, mean_y, Xc.T @ Xc, Xc.T @ yc, yc @ yc)
+
+    def merge(self, other):
+        if other.n == 0:
+            return SufficientStats(self.n, self.mean_x, self.mean_y, self.sxx, self.sxy, self.syy)
+        if self.n == 0:
+            return SufficientStats(other.n, other.mean_x, other.mean_y, other.sxx, other.sxy, other.syy)
+
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        w = self.n * other.n / n
+
+        return SufficientStats(
+            n,
+            self.mean_x + dx * other.n / n,
+            self.mean_y + dy * other.n / n,
+            self.sxx + other.sxx + w * np.outer(dx, dx),
+            self.sxy + other.sxy + w * dx * dy,
+            self.syy + other.syy + w * dy * dy,
+        )
+
+    def solve(self):
+        if self.n == 0:
+            raise ValueError("Cannot solve with no observations")
+        coef = np.linalg.lstsq(self.sxx, self.sxy, rcond=None)[0]
+        intercept = self.mean_y - self.mean_x @ coef
+        return coef, intercept
+
+    def training_metrics(self, coef):
+        # Residual sum of squares straight from the statistics, no pass over the data
+        sse = max(self.syy - 2 * coef @ self.sxy + coef @ self.sxx @ coef, 0.0)
+        rmse = float(np.sqrt(sse / self.n))
+        r2 = float(1 - sse / self.syy) if self.syy > 0 else 0.0
+        return rmse, r2
+
+    def to_model(self, feature_columns):
+        coef, intercept = self.solve()
+        model = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = float(intercept)
+        model.n_features_in_ = len(feature_columns)
+        model.feature_names_in_ = np.asarray(feature_columns, dtype=object)
+        return model
+
+    def to_dict(self):
+        return {
+            "n": self.n,
+            "mean_x": self.mean_x.tolist(),
+            "mean_y": self.mean_y,
+            "sxx": self.sxx.tolist(),
+            "sxy": self.sxy.tolist(),
+            "syy": self.syy,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["n"], d["mean_x"], d["mean_y"], d["sxx"], d["sxy"], d["syy"])
+
+
+class ShardedStats:
+    # Per-shard statistics keyed by shard name. A shard whose content digest is
+    # unchanged is reused as-is; a rewritten shard replaces its old contribution.
+
+    def __init__(self, feature_columns, shards=None):
+        self.feature_columns = list(feature_columns)
+        self.shards = shards or {}
+
+    def is_current(self, name, digest):
+        entry = self.shards.get(name)
+        return entry is not None and entry["digest"] == digest
+
+    def put(self, name, digest, stats):
+        self.shards[name] = {"digest": digest, "stats": stats}
+
+    def retain(self, names):
+        # Shards that left the channel (deleted or renamed data) must stop counting in the fit
+        dropped = sorted(set(self.shards) - set(names))
+        for name in dropped:
+            del self.shards[name]
+        return dropped
+
+    def total(self):
+        total = SufficientStats.empty(len(self.feature_columns))
+        for name in sorted(self.shards):
+            total = total.merge(self.shards[name]["stats"])
+        return total
+
+    def dumps(self):
+        return json.dumps({
+            "feature_columns": self.feature_columns,
+            "shards": {
+                name: {"digest": entry["digest"], "stats": entry["stats"].to_dict()}
+                for name, entry in self.shards.items()
+            }
+        }).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data, feature_columns):
+        payload = json.loads(data)
+        if payload["feature_columns"] != list(feature_columns):
+            raise ValueError(f"Stored statistics are for columns {payload['feature_columns']}, "
+                             f"expected {list(feature_columns)}")
+        shards = {
+            name: {"digest": entry["digest"], "stats": SufficientStats.from_dict(entry["stats"])}
+            for name, entry in payload["shards"].items()
+        }
+        return cls(feature_columns, shards)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,117 @@
+import time
+import logging
+import threading
+
+from mlflow.entities import Metric, Param, RunTag
+
+logger = logging.getLogger(__name__)
+
+# Server-side limits for a single log_batch request
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+# ...and for metrics + params + tags together
+MAX_ENTITIES_PER_BATCH = 1000
+
+
+class BatchLogger:
+    # Queues metrics, params and tags and ships them with log_batch from a background thread,
+    # so a script pays one round-trip per batch instead of one per call.
+
+    def __init__(self, client, run_id, flush_interval=2.0):
+        self.client = client
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+
+        self.requests_sent = 0
+        self.items_logged = 0
+        self.errors = 0
+
+        self._metrics, self._params, self._tags = [], [], []
+        self._lock = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="mlflow-batch-logger", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def log_metric(self, key, value, step=0):
+        self._put(self._metrics, Metric(key, float(value), int(time.time() * 1000), step))
+
+    def log_metrics(self, metrics: dict, step=0):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step)
+
+    def log_param(self, key, value):
+        self._put(self._params, Param(key, str(value)))
+
+    def log_params(self, params: dict):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def set_tag(self, key, value):
+        self._put(self._tags, RunTag(key, str(value)))
+
+    def _put(self, queue, item):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchLogger is closed")
+            queue.append(item)
+            if len(self._metrics) + len(self._params) + len(self._tags) >= MAX_ENTITIES_PER_BATCH \
+                    or len(self._params) >= MAX_PARAMS_PER_BATCH or len(self._tags) >= MAX_TAGS_PER_BATCH:
+                self._lock.notify_all()
+
+    def _take_batch(self):
+        params = self._params[:MAX_PARAMS_PER_BATCH]
+        tags = self._tags[:MAX_TAGS_PER_BATCH]
+        metrics = self._metrics[:min(MAX_METRICS_PER_BATCH, MAX_ENTITIES_PER_BATCH - len(params) - len(tags))]
+        del self._metrics[:len(metrics)], self._params[:len(params)], self._tags[:len(tags)]
+        return metrics, params, tags
+
+    def _has_items(self):
+        return bool(self._metrics or self._params or self._tags)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._has_items() and not self._closed:
+                    self._lock.wait(self.flush_interval)
+                if not self._has_items():
+                    if self._closed:
+                        return
+                    continue
+                metrics, params, tags = self._take_batch()
+                self._in_flight += 1
+
+            try:
+                self.client.log_batch(self.run_id, metrics=metrics, params=params, tags=tags)
+                self.requests_sent += 1
+                self.items_logged += len(metrics) + len(params) + len(tags)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to send MLflow batch ({len(metrics)} metrics, {len(params)} params, "
+                             f"{len(tags)} tags): {e}")
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._lock.notify_all()
+
+    def flush(self):
+        with self._lock:
+            self._lock.notify_all()
+            while self._has_items() or self._in_flight:
+                self._lock.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._thread.join()
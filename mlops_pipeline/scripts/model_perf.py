@@ -0,0 +1,74 @@
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+PERF_METRICS = ["latency_p50_ms", "latency_p90_ms", "latency_p99_ms", "throughput_rows_per_sec",
+                "load_time_ms", "artifact_mb"]
+
+
+def _best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_model(model_file, artifact_file, X: pd.DataFrame, single_row_iters=500, warmup=50,
+                    batch_size=1000, batch_repeat=5):
+    # Mirrors the serving path: one-row DataFrames for latency, a large frame for throughput
+    load_seconds = _best_of(lambda: joblib.load(model_file), 3)
+    model = joblib.load(model_file)
+
+    rows = [X.iloc[[i % len(X)]] for i in range(single_row_iters + warmup)]
+    for row in rows[:warmup]:
+        model.predict(row)
+
+    latencies = np.empty(single_row_iters)
+    for i, row in enumerate(rows[warmup:]):
+        start = time.perf_counter()
+        model.predict(row)
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1000
+
+    batch = X.iloc[np.arange(batch_size) % len(X)]
+    batch_seconds = _best_of(lambda: model.predict(batch), batch_repeat)
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "latency_p50_ms": float(p50),
+        "latency_p90_ms": float(p90),
+        "latency_p99_ms": float(p99),
+        "throughput_rows_per_sec": batch_size / batch_seconds,
+        "load_time_ms": load_seconds * 1000,
+        "artifact_mb": os.path.getsize(artifact_file) / 1e6,
+    }
+
+
+def check_regressions(challenger, production, max_latency_ratio=1.5, latency_slack_ms=1.0,
+                      min_throughput_ratio=0.67, max_load_ratio=2.0, max_artifact_ratio=2.0):
+    # A check passes when there is no Production baseline for that metric. Latency gets an absolute
+    # slack so sub-millisecond models are not failed by timer noise.
+    checks = {}
+
+    def ratio_check(name, limit, higher_is_worse=True, slack=0.0):
+        base = production.get(name)
+        value = challenger[name]
+        if base is None or base <= 0:
+            checks[name] = {"ok": True, "challenger": value, "production": base, "limit": None}
+            return
+        limit_value = max(base * limit, base + slack) if higher_is_worse else base * limit
+        ok = value <= limit_value if higher_is_worse else value >= limit_value
+        checks[name] = {"ok": bool(ok), "challenger": value, "production": base, "limit": limit_value}
+
+    ratio_check("latency_p50_ms", max_latency_ratio, slack=latency_slack_ms)
+    ratio_check("latency_p99_ms", max_latency_ratio, slack=latency_slack_ms)
+    ratio_check("throughput_rows_per_sec", min_throughput_ratio, higher_is_worse=False)
+    ratio_check("load_time_ms", max_load_ratio, slack=100.0)
+    ratio_check("artifact_mb", max_artifact_ratio, slack=1.0)
+
+    return all(c["ok"] for c in checks.values()), checks
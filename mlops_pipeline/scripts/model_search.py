@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import itertools
+import importlib
+from multiprocessing import Pool
+
+import numpy as np
+from sklearn.model_selection import KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# family -> estimator class, whether it needs scaled inputs, and its hyperparameter grid
+SEARCH_SPACE = {
+    "linear": {"estimator": "sklearn.linear_model.LinearRegression", "scale": False, "grid": {}},
+    "ridge": {"estimator": "sklearn.linear_model.Ridge", "scale": True,
+              "grid": {"alpha": [0.1, 1.0, 10.0, 100.0]}},
+    "lasso": {"estimator": "sklearn.linear_model.Lasso", "scale": True,
+              "grid": {"alpha": [0.01, 0.1, 1.0]}},
+    "knn": {"estimator": "sklearn.neighbors.KNeighborsRegressor", "scale": True,
+            "grid": {"n_neighbors": [5, 10, 20], "weights": ["distance"]}},
+    "spatial_knn": {"estimator": "spatial_knn.SpatialKNNRegressor", "scale": False,
+                    "grid": {"n_neighbors": [5, 10, 20], "mrt_weight": [0.5, 1.0, 2.0]}},
+    "random_forest": {"estimator": "sklearn.ensemble.RandomForestRegressor", "scale": False,
+                      "grid": {"n_estimators": [200], "max_depth": [None, 8], "min_samples_leaf": [1, 3],
+                               "random_state": [42]}},
+    "hist_gradient_boosting": {"estimator": "sklearn.ensemble.HistGradientBoostingRegressor", "scale": False,
+                               "grid": {"learning_rate": [0.05, 0.1], "max_leaf_nodes": [15, 31],
+                                        "random_state": [42]}},
+}
+
+_X = None
+_y = None
+
+
+def _init_worker(X, y):
+    # Each worker receives the training split once instead of with every task
+    global _X, _y
+    _X, _y = X, y
+
+
+def build_estimator(spec, params):
+    module_name, class_name = spec["estimator"].rsplit(".", 1)
+    estimator = getattr(importlib.import_module(module_name), class_name)(**params)
+    return make_pipeline(StandardScaler(), estimator) if spec.get("scale") else estimator
+
+
+def expand_candidates(search_space):
+    candidates = []
+    for family, spec in search_space.items():
+        keys = sorted(spec.get("grid", {}))
+        for values in itertools.product(*(spec["grid"][k] for k in keys)):
+            params = dict(zip(keys, values))
+            candidates.append({"id": len(candidates), "family": family, "spec": spec, "params": params})
+    return candidates
+
+
+def _fit_fold(spec, params, train_idx, test_idx):
+    model = build_estimator(spec, params)
+    start = time.perf_counter()
+    model.fit(_X[train_idx], _y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    preds = model.predict(_X[test_idx])
+    rmse = float(np.sqrt(np.mean((_y[test_idx] - preds) ** 2)))
+    return rmse, fit_seconds
+
+
+def run_search(X, y, search_space=None, cv_folds=5, time_budget=600.0, n_jobs=None, prune_margin=0.5, prune_after=2):
+    # Folds are evaluated stage by stage for every surviving candidate in parallel. After each
+    # stage (from fold prune_after on), candidates whose running CV RMSE is more than prune_margin
+    # worse than the leader are dropped. When the wall-clock budget runs out, the unfinished stage is discarded so that all
+    # survivors are still compared on the same folds.
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    candidates = expand_candidates(search_space or SEARCH_SPACE)
+    folds = list(KFold(n_splits=cv_folds, shuffle=True, random_state=42).split(X))
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    for c in candidates:
+        c.update(fold_rmse=[], fit_seconds=0.0, status="running")
+
+    deadline = time.monotonic() + time_budget
+    pool = Pool(processes=n_jobs, initializer=_init_worker, initargs=(X, y))
+    try:
+        for stage, (train_idx, test_idx) in enumerate(folds):
+            alive = [c for c in candidates if c["status"] == "running"]
+            pending = [(pool.apply_async(_fit_fold, (c["spec"], c["params"], train_idx, test_idx)), c) for c in alive]
+
+            for result, c in pending:
+                result.wait(max(deadline - time.monotonic(), 0))
+            if not all(result.ready() for result, c in pending):
+                for c in alive:
+                    c["status"] = "timeout"
+                print(f"Search budget of {time_budget:.0f}s exhausted during fold {stage + 1}/{cv_folds}")
+                break
+
+            for result, c in pending:
+                if not result.successful():
+                    c["status"] = "failed"
+                    try:
+                        result.get()
+                    except Exception as e:
+                        c["error"] = repr(e)
+                    continue
+                rmse, fit_seconds = result.get()
+                c["fold_rmse"].append(rmse)
+                c["fit_seconds"] += fit_seconds
+
+            running = [c for c in candidates if c["status"] == "running"]
+            if not running:
+                break
+            leader = min(np.mean(c["fold_rmse"]) for c in running)
+            for c in running:
+                if stage + 1 >= prune_after and np.mean(c["fold_rmse"]) > leader * (1 + prune_margin):
+                    c["status"] = "pruned"
+            print(f"Fold {stage + 1}/{cv_folds}: leader CV RMSE {leader:.4f}, "
+                  f"{sum(c['status'] == 'running' for c in candidates)} candidates left")
+        else:
+            for c in candidates:
+                if c["status"] == "running":
+                    c["status"] = "completed"
+    finally:
+        # terminate() also stops fits still running past the deadline
+        pool.terminate()
+        pool.join()
+
+    for c in candidates:
+        c["cv_rmse"] = float(np.mean(c["fold_rmse"])) if c["fold_rmse"] else None
+
+    # Survivors (completed, or cut off by the budget) share the same number of folds
+    finalists = [c for c in candidates if c["status"] in ("completed", "timeout") and c["fold_rmse"]]
+    if not finalists:
+        finalists = [c for c in candidates if c["fold_rmse"]]
+    if not finalists:
+        # Nothing to compare, but the training step still has to produce a model
+        print(f"Warning: no candidate finished a single fold within {time_budget:.0f}s, "
+              f"falling back to the default LinearRegression")
+        return fallback_candidate(len(candidates)), candidates
+
+    best = min(finalists, key=lambda c: c["cv_rmse"])
+    return best, candidates
+
+
+def fallback_candidate(candidate_id):
+    return {"id": candidate_id, "family": "linear", "spec": SEARCH_SPACE["linear"], "params": {},
+            "fold_rmse": [], "fit_seconds": 0.0, "status": "fallback", "cv_rmse": None}
+
+
+def load_search_space(path):
+    if not path:
+        return SEARCH_SPACE
+    with open(path) as f:
+        return json.load(f)
+
+
+def candidate_label(c):
+    return f"{c['id']:02d}_{c['family']}"
+
+
+def log_search_to_mlflow(batch_logger, best, candidates):
+    for c in candidates:
+        label = candidate_label(c)
+        batch_logger.log_param(f"search/{label}", json.dumps(c["params"], sort_keys=True))
+        batch_logger.set_tag(f"search/{label}/status", c["status"])
+        batch_logger.log_metric(f"search/{label}/fit_seconds", c["fit_seconds"])
+        batch_logger.log_metric(f"search/{label}/folds", len(c["fold_rmse"]))
+        if c["cv_rmse"] is not None:
+            batch_logger.log_metric(f"search/{label}/cv_rmse", c["cv_rmse"])
+        for step, rmse in enumerate(c["fold_rmse"]):
+            batch_logger.log_metric(f"search/{label}/fold_rmse", rmse, step)
+
+    if best["cv_rmse"] is not None:
+        batch_logger.log_metric("search/best_cv_rmse", best["cv_rmse"])
+    batch_logger.set_tag("search/best", candidate_label(best))
+    batch_logger.set_tag("search/best_status", best["status"])
+    batch_logger.set_tag("search/best_family", best["family"])
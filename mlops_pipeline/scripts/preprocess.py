@@ -1,27 +1,86 @@
 import argparse
 import os
+import sys
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
+# Processing jobs only receive the entry script; shared modules ship in the training image
+sys.path.append("/opt/ml/code")
+
+from dataset_io import write_dataset
+
+# Fixed key so a row's bucket never changes between runs or pandas versions
+SPLIT_HASH_KEY = "real-estate-spl1"
+HASH_BUCKETS = 10000
+
+
+def split_by_key(chunk, key_column, test_size):
+    if key_column in chunk.columns:
+        keys = chunk[key_column]
+    else:
+        keys = chunk  # no stable id column, fall back to hashing the whole row
+
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=SPLIT_HASH_KEY)
+    is_test = (hashes.to_numpy() % HASH_BUCKETS) < int(test_size * HASH_BUCKETS)
+    return chunk[~is_test], chunk[is_test]
+
+
+def run_streaming(input_file, output_dir, chunk_size, key_column, test_size, fmt):
+    n_train, n_test, n_shards = 0, 0, 0
+
+    for i, chunk in enumerate(pd.read_csv(input_file, chunksize=chunk_size)):
+        train, test = split_by_key(chunk, key_column, test_size)
+
+        if "No" in chunk.columns:
+            train = train.drop(columns=["No"])
+            test = test.drop(columns=["No"])
+
+        # One shard per chunk and split; nothing is carried over between chunks
+        if len(train):
+            write_dataset(train, os.path.join(output_dir, "train", f"part-{i:05d}"), fmt)
+        if len(test):
+            write_dataset(test, os.path.join(output_dir, "test", f"part-{i:05d}"), fmt)
+
+        n_train += len(train)
+        n_test += len(test)
+        n_shards += 1
+
+    print(f"Wrote {n_shards} shards: {n_train} train rows, {n_test} test rows")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--input-data", type=str, default="/opt/ml/processing/input")
+    parser.add_argument("--output-dir", type=str, default="/opt/ml/processing")
+    parser.add_argument("--input-hash", type=str, default="", help="Content hash of the input (cache key only)")
+    parser.add_argument("--mode", type=str, choices=["full", "streaming"],
+                        default=os.environ.get("PREPROCESS_MODE", "full"))
+    parser.add_argument("--chunk-size", type=int, default=int(os.environ.get("PREPROCESS_CHUNK_SIZE", 100000)))
+    parser.add_argument("--key-column", type=str, default="No")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--format", type=str, choices=["parquet", "csv"],
+                        default=os.environ.get("DATASET_FORMAT", "parquet"))
     args = parser.parse_args()
 
     input_file = os.path.join(args.input_data, "real_estate.csv")
-    print(f"Reading data from {input_file}")
-    df = pd.read_csv(input_file)
+    print(f"Reading data from {input_file} (content hash: {args.input_hash or 'n/a'})")
+
+    os.makedirs(os.path.join(args.output_dir, "train"), exist_ok=True)
+    os.makedirs(os.path.join(args.output_dir, "test"), exist_ok=True)
 
-    if "No" in df.columns:
-        print("Dropping 'No' column")
-        df = df.drop(columns=["No"])
+    if args.mode == "streaming":
+        print(f"Streaming in chunks of {args.chunk_size} rows, hash split on '{args.key_column}'")
+        run_streaming(input_file, args.output_dir, args.chunk_size, args.key_column, args.test_size, args.format)
+    else:
+        df = pd.read_csv(input_file)
 
-    train, test = train_test_split(df, test_size=0.2, random_state=42)
+        if "No" in df.columns:
+            print("Dropping 'No' column")
+            df = df.drop(columns=["No"])
 
-    os.makedirs("/opt/ml/processing/train", exist_ok=True)
-    os.makedirs("/opt/ml/processing/test", exist_ok=True)
+        train, test = train_test_split(df, test_size=args.test_size, random_state=42)
 
-    train.to_csv("/opt/ml/processing/train/train.csv", index=False, header=False)
-    test.to_csv("/opt/ml/processing/test/test.csv", index=False, header=False)
+        write_dataset(train, os.path.join(args.output_dir, "train", "train"), args.format)
+        write_dataset(test, os.path.join(args.output_dir, "test", "test"), args.format)
 
-    print("Preprocessing completed.")
\ No newline at end of file
+    print("Preprocessing completed.")
@@ -14,9 +14,15 @@ except ImportError:
     import mlflow
 
 import os
+import json
 import argparse
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--evaluation", type=str, default="/opt/ml/processing/evaluation/evaluation.json")
+    parser.add_argument("--deployment-mode", type=str, default="direct")
+    args = parser.parse_args()
+
     mlflow_uri = os.environ.get("MLFLOW_TRACKING_URI")
     model_name = "RealEstateModel"
     alias = "Production"
@@ -25,16 +31,22 @@ if __name__ == "__main__":
     mlflow.set_tracking_uri(mlflow_uri)
     client = mlflow.MlflowClient()
 
-    print(f"Promoting latest version of '{model_name}' to '{alias}'...")
+    # The version that was evaluated, not the newest one: a cached TrainModel step registers nothing new,
+    # so the newest version can belong to another run
+    with open(args.evaluation) as f:
+        evaluated = json.load(f).get("model", {})
 
-    versions = client.search_model_versions(f"name='{model_name}'")
+    if not evaluated.get("version"):
+        print(f"❌ Evaluated run {evaluated.get('run_id')} has no registered version of '{model_name}'!")
+        exit(1)
 
-    if not versions:
-        print("❌ No model versions found in MLflow Registry!")
+    if args.deployment_mode == "shadow":
+        # The deploy Lambda moves the alias if the shadow comparison promotes the challenger
+        print(f"Shadow deployment: version {evaluated['version']} stays out of '{alias}' until it is promoted")
         exit(0)
 
-    latest_version = sorted(versions, key=lambda x: int(x.version), reverse=True)[0]
+    print(f"Promoting version {evaluated['version']} (run {evaluated['run_id']}) of '{model_name}' to '{alias}'...")
 
-    client.set_registered_model_alias(model_name, alias, latest_version.version)
+    client.set_registered_model_alias(model_name, alias, evaluated["version"])
 
-    print(f"✅ Successfully promoted version {latest_version.version} to {alias}")
\ No newline at end of file
+    print(f"✅ Successfully promoted version {evaluated['version']} to {alias}")
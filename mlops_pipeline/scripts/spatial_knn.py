@@ -0,0 +1,65 @@
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.neighbors import BallTree, KDTree
+from sklearn.utils.validation import check_is_fitted
+
+from feature_schema import FEATURE_COLUMNS
+
+LATITUDE = FEATURE_COLUMNS.index("X5 latitude")
+LONGITUDE = FEATURE_COLUMNS.index("X6 longitude")
+MRT_DISTANCE = FEATURE_COLUMNS.index("X3 distance to the nearest MRT station")
+KM_PER_DEGREE = 111.32
+
+TREES = {"kd_tree": KDTree, "ball_tree": BallTree}
+
+
+class SpatialKNNRegressor(RegressorMixin, BaseEstimator):
+    # Location price index: distance-weighted mean price of the k nearest sales. Neighbours are found in
+    # (north km, east km, MRT distance km * mrt_weight), with latitude/longitude projected around the
+    # training centroid, so one tree query answers a whole batch. Only the tree (3 float64 coordinates
+    # per sale) and float32 prices are pickled, not the training frame.
+
+    def __init__(self, n_neighbors=10, mrt_weight=1.0, tree="kd_tree", leaf_size=40):
+        self.n_neighbors = n_neighbors
+        self.mrt_weight = mrt_weight
+        self.tree = tree
+        self.leaf_size = leaf_size
+
+    def _features(self, X):
+        # DataFrames are matched by column name, arrays are taken in FEATURE_COLUMNS order
+        if hasattr(X, "columns"):
+            X = X[FEATURE_COLUMNS]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected rows of {len(FEATURE_COLUMNS)} features, got shape {X.shape}")
+        return X
+
+    def _project(self, X):
+        points = np.empty((len(X), 3))
+        points[:, 0] = (X[:, LATITUDE] - self.origin_[0]) * KM_PER_DEGREE
+        points[:, 1] = (X[:, LONGITUDE] - self.origin_[1]) * KM_PER_DEGREE * self.lon_scale_
+        points[:, 2] = X[:, MRT_DISTANCE] / 1000 * self.mrt_weight
+        return points
+
+    def fit(self, X, y):
+        if self.tree not in TREES:
+            raise ValueError(f"Unknown tree '{self.tree}', expected one of {sorted(TREES)}")
+        X = self._features(X)
+        y = np.asarray(y, dtype=np.float32)
+        if len(X) != len(y) or not len(X):
+            raise ValueError(f"Need the same non-zero number of rows in X and y, got {len(X)} and {len(y)}")
+
+        self.origin_ = (float(X[:, LATITUDE].mean()), float(X[:, LONGITUDE].mean()))
+        self.lon_scale_ = float(np.cos(np.radians(self.origin_[0])))
+        self.tree_ = TREES[self.tree](self._project(X), leaf_size=self.leaf_size)
+        self.targets_ = y
+        self.k_ = min(self.n_neighbors, len(y))
+        self.n_features_in_ = len(FEATURE_COLUMNS)
+        return self
+
+    def predict(self, X):
+        check_is_fitted(self, "tree_")
+        dist, ind = self.tree_.query(self._project(self._features(X)), k=self.k_)
+        # An exact location match dominates instead of dividing by zero
+        weights = 1.0 / np.maximum(dist, 1e-6)
+        return (weights * self.targets_[ind]).sum(axis=1) / weights.sum(axis=1)
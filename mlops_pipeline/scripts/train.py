@@ -1,18 +1,49 @@
 import sys
 import os
-import glob
+import time
 import argparse
 import joblib
 import shutil
 
-import pandas as pd
 import mlflow
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
-FEATURE_COLUMNS = ["X1 transaction date", "X2 house age", "X3 distance to the nearest MRT station",
-                   "X4 number of convenience stores", "X5 latitude", "X6 longitude"]
-TARGET = "Y house price of unit area"
+import artifact_store
+from dataset_io import list_dataset_files, load_shards, read_dataset
+from feature_schema import FEATURE_COLUMNS, TARGET
+from linear_stats import ShardedStats, SufficientStats, file_digest
+from mlflow_batch import BatchLogger
+from model_search import build_estimator, load_search_space, log_search_to_mlflow, run_search
+from spatial_knn import SpatialKNNRegressor
+
+
+def fold_in_shards(input_files, stats_uri):
+    state = ShardedStats(FEATURE_COLUMNS)
+    stored = artifact_store.read_bytes(stats_uri) if stats_uri else None
+    if stored:
+        state = ShardedStats.loads(stored, FEATURE_COLUMNS)
+        print(f"Loaded sufficient statistics for {len(state.shards)} shards from {stats_uri}")
+
+    dropped = state.retain(os.path.basename(path) for path in input_files)
+    for name in dropped:
+        print(f"Dropped shard {name}: no longer in the training channel")
+
+    folded, reused = 0, 0
+    for path in sorted(input_files):
+        name = os.path.basename(path)
+        digest = file_digest(path)
+        if state.is_current(name, digest):
+            reused += 1
+            continue
+
+        df = read_dataset(path, FEATURE_COLUMNS + [TARGET])
+        state.put(name, digest, SufficientStats.from_data(df[FEATURE_COLUMNS], df[TARGET]))
+        folded += 1
+        print(f"Folded in shard {name}: {len(df)} rows")
+
+    return state, folded, reused, len(dropped)
+
 
 if __name__ == "__main__":
     print(f"Training script started. Python: {sys.version}")
@@ -20,7 +51,20 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--train-data", type=str, default=os.environ.get("SM_CHANNEL_TRAIN"))
     parser.add_argument("--model-dir", type=str, default=os.environ.get("SM_MODEL_DIR"))
+    parser.add_argument("--mode", type=str, choices=["full", "incremental", "search"],
+                        default=os.environ.get("TRAIN_MODE", "full"))
+    # Model for --mode full; incremental mode always produces the linear model from sufficient statistics
+    parser.add_argument("--model-type", type=str, choices=["linear", "spatial_knn"],
+                        default=os.environ.get("MODEL_TYPE", "linear"))
+    parser.add_argument("--knn-neighbors", type=int, default=int(os.environ.get("KNN_NEIGHBORS", 10)))
+    parser.add_argument("--stats-uri", type=str, default=os.environ.get("SUFFICIENT_STATS_URI"))
+    parser.add_argument("--search-config", type=str, default=os.environ.get("SEARCH_CONFIG"))
+    parser.add_argument("--search-time-budget", type=float, default=float(os.environ.get("SEARCH_TIME_BUDGET", 600)))
+    parser.add_argument("--search-cv-folds", type=int, default=int(os.environ.get("SEARCH_CV_FOLDS", 5)))
+    parser.add_argument("--search-n-jobs", type=int, default=int(os.environ.get("SEARCH_N_JOBS", 0)) or None)
     args = parser.parse_args()
+    if args.mode == "incremental" and args.model_type != "linear":
+        parser.error("--mode incremental only supports --model-type linear")
 
     # Setup MLflow
     mlflow_uri = os.environ.get("MLFLOW_TRACKING_URI")
@@ -32,23 +76,22 @@ if __name__ == "__main__":
         mlflow.set_experiment(experiment_name)
 
     # Load Data
-    input_files = glob.glob(os.path.join(args.train_data, "*.csv"))
-    if not input_files: raise ValueError("No CSV files")
-
-    df = pd.read_csv(input_files[0], header=None)
-
-    # Fix Columns
-    expected_cols = len(FEATURE_COLUMNS) + 1
-    if df.shape[1] == expected_cols:
-        df.columns = FEATURE_COLUMNS + [TARGET]
-    elif df.shape[1] == expected_cols + 1:
-        df = df.iloc[:, 1:]
-        df.columns = FEATURE_COLUMNS + [TARGET]
+    input_files = list_dataset_files(args.train_data)
+    if not input_files: raise ValueError("No Parquet or CSV files")
+
+    if args.mode == "incremental":
+        state, shards_folded, shards_reused, shards_dropped = fold_in_shards(input_files, args.stats_uri)
+        stats = state.total()
+        print(f"Sufficient statistics cover {stats.n} rows ({shards_folded} shards folded, {shards_reused} reused, "
+              f"{shards_dropped} dropped)")
     else:
-        raise ValueError(f"Bad columns: {df.shape[1]}")
+        df, load_stats = load_shards(input_files, FEATURE_COLUMNS + [TARGET])
+        print(f"Loaded {load_stats['load_rows']} rows from {load_stats['load_files']} shard(s) in "
+              f"{load_stats['load_seconds']:.2f}s ({load_stats['load_rows_per_sec']:.0f} rows/s, "
+              f"{load_stats['load_mb_per_sec']:.1f} MB/s), {load_stats['load_memory_mb']:.2f} MB in memory")
 
-    X_train = df[FEATURE_COLUMNS]
-    y_train = df[TARGET]
+        X_train = df[FEATURE_COLUMNS]
+        y_train = df[TARGET]
 
     # Train
     with mlflow.start_run() as run:
@@ -58,17 +101,64 @@ if __name__ == "__main__":
         with open(os.path.join(args.model_dir, "run_id.txt"), "w") as f:
             f.write(run.info.run_id)
 
-        model = LinearRegression()
-        model.fit(X_train, y_train)
-
-        preds = model.predict(X_train)
-        rmse = mean_squared_error(y_train, preds, squared=False)
-        mae = mean_absolute_error(y_train, preds)
-        r2 = r2_score(y_train, preds)
-
-        mlflow.log_metric("train_rmse", rmse)
-        mlflow.log_metric("train_mae", mae)
-        mlflow.log_metric("train_r2", r2)
+        batch_logger = BatchLogger(mlflow.tracking.MlflowClient(), run.info.run_id)
+        batch_logger.log_param("train_mode", args.mode)
+        batch_logger.log_param("model_type", args.model_type)
+
+        if args.mode == "incremental":
+            model = stats.to_model(FEATURE_COLUMNS)
+            rmse, r2 = stats.training_metrics(model.coef_)
+
+            batch_logger.log_metrics({
+                "train_rmse": rmse,
+                "train_r2": r2,
+                "train_rows": stats.n,
+                "shards_folded": shards_folded,
+                "shards_reused": shards_reused,
+                "shards_dropped": shards_dropped
+            })
+
+            stats_blob = state.dumps()
+            if args.stats_uri:
+                artifact_store.write_bytes(args.stats_uri, stats_blob)
+                print(f"Saved sufficient statistics to {args.stats_uri}")
+            artifact_store.write_bytes(os.path.join(args.model_dir, "linear_stats.json"), stats_blob)
+        else:
+            batch_logger.log_metrics(load_stats)
+
+            if args.mode == "search":
+                search_start = time.perf_counter()
+                best, candidates = run_search(
+                    X_train.to_numpy(), y_train.to_numpy(),
+                    search_space=load_search_space(args.search_config),
+                    cv_folds=args.search_cv_folds,
+                    time_budget=args.search_time_budget,
+                    n_jobs=args.search_n_jobs
+                )
+                search_seconds = time.perf_counter() - search_start
+                print(f"Search finished in {search_seconds:.1f}s. Best: {best['family']} {best['params']} "
+                      f"(CV RMSE {best['cv_rmse']}, {best['status']})")
+                for c in sorted(candidates, key=lambda c: (c["cv_rmse"] is None, c["cv_rmse"] or 0)):
+                    print(f"  {c['family']:<24} {str(c['params']):<60} {c['status']:<10} "
+                          f"cv_rmse={c['cv_rmse']} fit_s={c['fit_seconds']:.2f}")
+
+                log_search_to_mlflow(batch_logger, best, candidates)
+                batch_logger.log_metric("search_seconds", search_seconds)
+
+                model = build_estimator(best["spec"], best["params"])
+            elif args.model_type == "spatial_knn":
+                model = SpatialKNNRegressor(n_neighbors=args.knn_neighbors)
+                batch_logger.log_param("knn_neighbors", args.knn_neighbors)
+            else:
+                model = LinearRegression()
+            model.fit(X_train, y_train)
+
+            preds = model.predict(X_train)
+            rmse = mean_squared_error(y_train, preds, squared=False)
+            mae = mean_absolute_error(y_train, preds)
+            r2 = r2_score(y_train, preds)
+
+            batch_logger.log_metrics({"train_rmse": rmse, "train_mae": mae, "train_r2": r2})
 
         # Save Model
         joblib.dump(model, os.path.join(args.model_dir, "model.pkl"))
@@ -76,11 +166,16 @@ if __name__ == "__main__":
         code_dir = os.path.join(args.model_dir, "code")
         os.makedirs(code_dir, exist_ok=True)
 
-        shutil.copy("inference.py", os.path.join(code_dir, "inference.py"))
-        print("Copied inference.py to model artifact")
+        # inference.py and the modules it (or unpickling a spatial_knn model) imports ship with the model
+        for name in ("inference.py", "codec.py", "feature_schema.py", "spatial_knn.py"):
+            shutil.copy(name, os.path.join(code_dir, name))
+        print("Copied inference.py and its modules to model artifact")
         print(f"Model and code saved to {args.model_dir}")
 
         # Log Model to MLflow
         mlflow.sklearn.log_model(model, "model", registered_model_name="RealEstateModel")
 
+        batch_logger.close()
+        print(f"MLflow logging: {batch_logger.items_logged} items in {batch_logger.requests_sent} batch request(s)")
+
         print("Training finished.")
\ No newline at end of file
@@ -0,0 +1,110 @@
+import os
+import ast
+import json
+import shutil
+import hashlib
+import tempfile
+
+SKIP_NAMES = {"__pycache__", ".DS_Store"}
+
+
+def _update_with_path(h, path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_NAMES)
+            for name in sorted(files):
+                if name in SKIP_NAMES or name.endswith(".pyc"):
+                    continue
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode("utf-8") + b"\0")
+                _update_with_file(h, full)
+    elif os.path.exists(path):
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        _update_with_file(h, path)
+    else:
+        h.update(b"<missing>" + path.encode("utf-8"))
+
+
+def _update_with_file(h, path, chunk_size=1 << 20):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    h.update(b"\0")
+
+
+def content_hash(paths) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        _update_with_path(h, path)
+    return h.hexdigest()
+
+
+def script_closure(script_path) -> list:
+    # The entry script plus every sibling module it imports, transitively, so a change to a
+    # shared helper (dataset_io.py, ...) invalidates exactly the steps that use it.
+    scripts_dir = os.path.dirname(os.path.abspath(script_path))
+    seen, stack = set(), [os.path.abspath(script_path)]
+
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(scripts_dir, name.split(".")[0] + ".py")
+                if os.path.exists(candidate):
+                    stack.append(candidate)
+
+    return sorted(seen)
+
+
+def step_cache_key(step_name, inputs=(), code=(), params=None) -> str:
+    h = hashlib.sha256()
+    h.update(step_name.encode("utf-8") + b"\0")
+    h.update(content_hash(sorted(inputs)).encode("utf-8"))
+    h.update(content_hash(sorted(code)).encode("utf-8"))
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class StepCache:
+    def __init__(self, root):
+        self.root = root
+
+    def _entry(self, step_name, key):
+        return os.path.join(self.root, step_name, key)
+
+    def lookup(self, step_name, key):
+        entry = self._entry(step_name, key)
+        return entry if os.path.exists(os.path.join(entry, "_SUCCESS")) else None
+
+    def store(self, step_name, key, outputs: dict):
+        # Written to a temp dir and renamed, so a crashed step never leaves a half entry behind
+        entry = self._entry(step_name, key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=f".{key[:12]}-")
+        for name, src in outputs.items():
+            shutil.copytree(src, os.path.join(tmp, name))
+        open(os.path.join(tmp, "_SUCCESS"), "w").close()
+
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        return entry
+
+    def restore(self, step_name, key, outputs: dict):
+        entry = self._entry(step_name, key)
+        for name, dest in outputs.items():
+            if os.path.exists(dest):
+                shutil.rmtree(dest)
+            shutil.copytree(os.path.join(entry, name), dest)
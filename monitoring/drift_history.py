@@ -0,0 +1,190 @@
+import sys
+import math
+import sqlite3
+import argparse
+from datetime import date, timedelta
+
+import pandas as pd
+
+DATASET_FEATURE = "__dataset__"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS drift_history (
+        feature   TEXT NOT NULL,
+        statistic TEXT NOT NULL,
+        date      TEXT NOT NULL,
+        value     REAL,
+        PRIMARY KEY (feature, statistic, date)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_drift_history_date ON drift_history (date)",
+    "CREATE INDEX IF NOT EXISTS idx_drift_history_stat_value ON drift_history (statistic, value)",
+]
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def rows_from_report(report: dict, current=None, features=None) -> list:
+    # One (feature, statistic, value) row per number worth trending; the rest of the
+    # Evidently dict stays in the raw JSON blob.
+    rows = []
+
+    for metric in report.get("metrics", []):
+        result = metric.get("result", {})
+
+        if "drift_by_columns" in result:
+            for column, stats in result["drift_by_columns"].items():
+                for statistic in ("drift_score", "drift_detected", "stattest_threshold"):
+                    if statistic in stats:
+                        rows.append((column, statistic, _to_float(stats[statistic])))
+        elif "dataset_drift" in result:
+            for statistic in ("share_of_drifted_columns", "number_of_drifted_columns",
+                              "number_of_columns", "dataset_drift"):
+                if statistic in result:
+                    rows.append((DATASET_FEATURE, statistic, _to_float(result[statistic])))
+
+    if current is not None and not current.empty:
+        rows.append((DATASET_FEATURE, "row_count", float(len(current))))
+
+        columns = [c for c in (features or current.columns) if c in current.columns]
+        described = current[columns].apply(pd.to_numeric, errors="coerce").describe()
+        for column in described.columns:
+            for statistic, key in (("current_mean", "mean"), ("current_std", "std"),
+                                   ("current_median", "50%"), ("current_min", "min"),
+                                   ("current_max", "max")):
+                rows.append((column, statistic, _to_float(described.at[key, column])))
+
+    return rows
+
+
+class DriftHistory:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def append(self, target_date, rows) -> int:
+        day = str(target_date)
+        # Re-running the job for the same day replaces all of that day's rows, including features or
+        # statistics the rerun no longer produces
+        with self.conn:
+            self.conn.execute("DELETE FROM drift_history WHERE date = ?", (day,))
+            cur = self.conn.executemany(
+                "INSERT INTO drift_history (feature, statistic, date, value) VALUES (?, ?, ?, ?)",
+                [(feature, statistic, day, value) for feature, statistic, value in rows]
+            )
+        return cur.rowcount
+
+    def latest_date(self):
+        row = self.conn.execute("SELECT MAX(date) FROM drift_history").fetchone()
+        return row[0]
+
+    def _window(self, days, end):
+        end = str(end) if end else self.latest_date()
+        if end is None:
+            return None, None
+        start = (date.fromisoformat(end) - timedelta(days=days - 1)).isoformat() if days else "0000-00-00"
+        return start, end
+
+    def features(self) -> list:
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT feature FROM drift_history ORDER BY feature")]
+
+    def statistics(self, feature=None) -> list:
+        if feature:
+            query = "SELECT DISTINCT statistic FROM drift_history WHERE feature = ? ORDER BY statistic"
+            return [r[0] for r in self.conn.execute(query, (feature,))]
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT statistic FROM drift_history ORDER BY statistic")]
+
+    def trend(self, feature: str, statistic: str = "drift_score", days: int = None, end=None) -> list:
+        start, end = self._window(days, end)
+        if start is None:
+            return []
+        return self.conn.execute(
+            "SELECT date, value FROM drift_history "
+            "WHERE feature = ? AND statistic = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (feature, statistic, start, end)
+        ).fetchall()
+
+    def summary(self, feature: str, statistic: str = "drift_score", days: int = None, end=None) -> dict:
+        start, end = self._window(days, end)
+        if start is None:
+            return {"count": 0, "min": None, "max": None, "mean": None, "first": None, "last": None}
+        count, lo, hi, mean = self.conn.execute(
+            "SELECT COUNT(value), MIN(value), MAX(value), AVG(value) FROM drift_history "
+            "WHERE feature = ? AND statistic = ? AND date BETWEEN ? AND ?",
+            (feature, statistic, start, end)
+        ).fetchone()
+        points = self.trend(feature, statistic, days, end)
+        return {
+            "count": count,
+            "min": lo,
+            "max": hi,
+            "mean": mean,
+            "first": points[0][1] if points else None,
+            "last": points[-1][1] if points else None,
+        }
+
+    def exceedances(self, statistic: str, threshold: float, feature: str = None, days: int = None, end=None) -> list:
+        start, end = self._window(days, end)
+        if start is None:
+            return []
+        query = ("SELECT date, feature, value FROM drift_history "
+                 "WHERE statistic = ? AND value > ? AND date BETWEEN ? AND ?")
+        params = [statistic, threshold, start, end]
+        if feature:
+            query += " AND feature = ?"
+            params.append(feature)
+        return self.conn.execute(query + " ORDER BY date, feature", params).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the drift history store")
+    parser.add_argument("db", help="Path to drift_history.sqlite (download it from the report prefix)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_trend = sub.add_parser("trend")
+    p_trend.add_argument("feature")
+    p_trend.add_argument("--statistic", default="drift_score")
+    p_trend.add_argument("--days", type=int, default=90)
+
+    p_exceed = sub.add_parser("exceed")
+    p_exceed.add_argument("--statistic", default="drift_score")
+    p_exceed.add_argument("--threshold", type=float, required=True)
+    p_exceed.add_argument("--feature", default=None)
+    p_exceed.add_argument("--days", type=int, default=90)
+
+    sub.add_parser("list")
+
+    args = parser.parse_args()
+
+    with DriftHistory(args.db) as history:
+        if args.command == "trend":
+            for day, value in history.trend(args.feature, args.statistic, args.days):
+                print(f"{day}\t{value}")
+            print(history.summary(args.feature, args.statistic, args.days), file=sys.stderr)
+        elif args.command == "exceed":
+            for day, feature, value in history.exceedances(args.statistic, args.threshold, args.feature, args.days):
+                print(f"{day}\t{feature}\t{value}")
+        else:
+            for feature in history.features():
+                print(f"{feature}: {', '.join(history.statistics(feature))}")
@@ -10,6 +10,11 @@ from evidently.report import Report
 from evidently.metric_preset import DataDriftPreset
 from evidently.pipeline.column_mapping import ColumnMapping
 
+from drift_history import DriftHistory, rows_from_report
+from feature_schema import FEATURE_COLUMNS, TARGET as TARGET_COLUMN
+from records import records_to_frame
+from profiling import Profiler
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -19,18 +24,13 @@ BUCKET = os.environ["MONITORING_BUCKET"]
 REF_KEY = os.environ.get("REFERENCE_KEY", "monitoring/reference/reference_data.csv")
 PREDICTIONS_PREFIX = os.environ.get("MONITORING_PREFIX", "monitoring/predictions/")
 REPORT_PREFIX = os.environ.get("REPORT_PREFIX", "monitoring/reports/")
+HISTORY_KEY = os.environ.get("DRIFT_HISTORY_KEY", f"{REPORT_PREFIX}drift_history.sqlite")
+HISTORY_LOCAL_PATH = "/tmp/drift_history.sqlite"
 
 ENDPOINT_NAME = os.environ.get("ENDPOINT_NAME", "real-estate-endpoint")
 
-FEATURE_COLUMNS = [
-    "X1 transaction date",
-    "X2 house age",
-    "X3 distance to the nearest MRT station",
-    "X4 number of convenience stores",
-    "X5 latitude",
-    "X6 longitude"
-]
-TARGET_COLUMN = "Y house price of unit area"
+profiler = Profiler.from_env("monitoring")
+
 PREDICTION_COLUMN = "prediction"
 
 
@@ -67,52 +67,27 @@ def read_current_df(target_date: date) -> pd.DataFrame:
     if not records:
         return pd.DataFrame()
 
-    rows = []
-    for rec in records:
-
-        feats_raw = rec.get("features", [])
-
-        if isinstance(feats_raw, dict) and "data" in feats_raw:
-            feats_raw = feats_raw["data"]
-
-        final_features = []
-        if isinstance(feats_raw, list):
-            if len(feats_raw) > 0 and isinstance(feats_raw[0], list):
-                final_features = feats_raw[0]  # Розпаковуємо вкладений список
-            else:
-                final_features = feats_raw
-        else:
-            logger.warning(f"Unexpected features format: {feats_raw}")
-            continue
-
-        row = {f"temp_{i}": v for i, v in enumerate(final_features)}
+    return records_to_frame(records, FEATURE_COLUMNS, PREDICTION_COLUMN)
 
-        pred = rec.get("prediction")
-        if isinstance(pred, list):
-            if len(pred) > 0:
-                val = pred[0]
-                if isinstance(val, list) and len(val) > 0:
-                    pred = val[0]
-                else:
-                    pred = val
 
-        row[PREDICTION_COLUMN] = pred
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
-
-    temp_cols = sorted([c for c in df.columns if c.startswith("temp_")])
-
-    rename_map = {}
-    for i, col_name in enumerate(temp_cols):
-        if i < len(FEATURE_COLUMNS):
-            rename_map[col_name] = FEATURE_COLUMNS[i]
+def update_drift_history(target_date: date, json_result: dict, current: pd.DataFrame) -> int:
+    try:
+        s3.download_file(BUCKET, HISTORY_KEY, HISTORY_LOCAL_PATH)
+    except s3.exceptions.ClientError:
+        logger.info(f"No drift history at {HISTORY_KEY} yet, starting a new one")
+        if os.path.exists(HISTORY_LOCAL_PATH):
+            os.remove(HISTORY_LOCAL_PATH)
 
-    df.rename(columns=rename_map, inplace=True)
+    rows = rows_from_report(json_result, current, FEATURE_COLUMNS)
+    with DriftHistory(HISTORY_LOCAL_PATH) as history:
+        written = history.append(target_date.isoformat(), rows)
 
-    return df
+    s3.upload_file(HISTORY_LOCAL_PATH, BUCKET, HISTORY_KEY)
+    logger.info(f"Appended {written} rows to drift history s3://{BUCKET}/{HISTORY_KEY}")
+    return written
 
 
+@profiler.profiled_call(flush=True)  # a whole run; flushed before the Lambda freezes
 def lambda_handler(event, context):
     logger.info("--- STARTING MONITORING (WITH CLOUDWATCH METRICS) ---")
 
@@ -193,6 +168,11 @@ def lambda_handler(event, context):
         ContentType="application/json"
     )
 
+    try:
+        update_drift_history(target_date, json_result, current)
+    except Exception as e:
+        logger.error(f"Failed to update drift history: {e}")
+
     try:
         logger.info(f"Pushing metrics to CloudWatch: DriftDetected={dataset_drift}, DriftScore={drift_score}")
 
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+import atexit
+import logging
+import threading
+import functools
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger()
+
+# Opt-in profiling for the serving container (terraform/app.py) and the monitoring Lambda, driven by env:
+#   PROFILE_EVERY_N        profile every Nth request / invocation (0 or unset = off)
+#   PROFILE_MODE           "cpu" (stack sampling), "alloc" (tracemalloc) or "cpu,alloc"
+#   PROFILE_INTERVAL_MS    sampling interval, default 5 ms
+#   PROFILE_OUTPUT         local directory or s3://bucket/prefix, default /tmp/profiles
+#   PROFILE_FLUSH_SECONDS  how often aggregated stacks are written out, default 60
+# Output is collapsed stacks ("frame;frame;frame count"), readable by flamegraph.pl and speedscope.
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frames):
+    # frames are outermost first
+    return ";".join(frame_label(code) for code in frames)
+
+
+class StackSampler:
+    # One daemon thread samples the current stack of every registered thread each `interval` seconds.
+    # Nothing runs between profiled requests: the thread waits until a target is registered.
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.targets = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def add(self, thread_id):
+        with self._cond:
+            self.targets.add(thread_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def remove(self, thread_id):
+        with self._cond:
+            self.targets.discard(thread_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.targets:
+                    self._cond.wait()
+                targets = set(self.targets)
+
+            frames = sys._current_frames()
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if stack:
+                    with self._cond:
+                        self.stacks[collapse(reversed(stack))] += 1
+                        self.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    def drain(self):
+        with self._cond:
+            stacks, self.stacks, self.samples = self.stacks, Counter(), 0
+        return stacks
+
+
+class AllocationTracker:
+    # tracemalloc is only on while at least one profiled request is in flight; each request's
+    # allocations still alive at its end are attributed to their allocating stacks, in bytes
+    def __init__(self, depth=25):
+        self.depth = depth
+        self.active = 0
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if not self.active and not tracemalloc.is_tracing():
+                tracemalloc.start(self.depth)
+            self.active += 1
+
+    def stop(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+        with self._lock:
+            self.active -= 1
+            if not self.active:
+                tracemalloc.stop()
+            for stat in snapshot.statistics("traceback"):
+                label = ";".join(f"{os.path.basename(f.filename)}:{f.lineno}" for f in stat.traceback)
+                self.stacks[label] += stat.size
+
+    def drain(self):
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+        return stacks
+
+
+class Profiler:
+    def __init__(self, name, every_n=0, modes=("cpu",), interval=0.005, output="/tmp/profiles", flush_seconds=60):
+        self.name = name
+        self.every_n = every_n
+        self.modes = set(modes)
+        self.output = output
+        self.flush_seconds = flush_seconds
+        self.sampler = StackSampler(interval) if "cpu" in self.modes else None
+        self.allocations = AllocationTracker() if "alloc" in self.modes else None
+        self.requests = 0
+        self.profiled = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name):
+        profiler = cls(
+            name,
+            every_n=int(os.environ.get("PROFILE_EVERY_N", 0) or 0),
+            modes=[m.strip() for m in os.environ.get("PROFILE_MODE", "cpu").split(",") if m.strip()],
+            interval=float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000,
+            output=os.environ.get("PROFILE_OUTPUT", "/tmp/profiles"),
+            flush_seconds=float(os.environ.get("PROFILE_FLUSH_SECONDS", 60)),
+        )
+        if profiler.enabled:
+            logger.info(f"Profiling {name}: every {profiler.every_n} request(s), modes {sorted(profiler.modes)}, "
+                        f"output {profiler.output}")
+            atexit.register(profiler.flush)
+        return profiler
+
+    @property
+    def enabled(self):
+        return self.every_n > 0 and bool(self.sampler or self.allocations)
+
+    def _take_turn(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests % self.every_n == 0
+
+    @contextmanager
+    def profile(self, flush=False):
+        if not self.enabled or not self._take_turn():
+            yield
+            return
+
+        thread_id = threading.get_ident()
+        if self.allocations:
+            self.allocations.start()
+        if self.sampler:
+            self.sampler.add(thread_id)
+        try:
+            yield
+        finally:
+            if self.sampler:
+                self.sampler.remove(thread_id)
+            if self.allocations:
+                self.allocations.stop()
+            with self._lock:
+                self.profiled += 1
+            if flush or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+
+    def profiled_call(self, flush=False):
+        # Decorator form: @profiler.profiled_call() on a Flask view, (flush=True) on a Lambda handler
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.profile(flush=flush):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        outputs = []
+        if self.sampler:
+            outputs.append(("cpu", self.sampler.drain()))
+        if self.allocations:
+            outputs.append(("alloc", self.allocations.drain()))
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        for mode, stacks in outputs:
+            if not stacks:
+                continue
+            body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            name = f"{self.name}/{stamp}-{os.getpid()}.{mode}.collapsed"
+            try:
+                self._write(name, body)
+                logger.info(f"Wrote {len(stacks)} {mode} stacks ({self.profiled} profiled requests) to {name}")
+            except Exception as e:
+                logger.error(f"Failed to write profile {name}: {e}")
+
+    def _write(self, name, body):
+        if self.output.startswith("s3://"):
+            import boto3
+
+            bucket, _, prefix = self.output.replace("s3://", "", 1).partition("/")
+            key = f"{prefix.rstrip('/')}/{name}" if prefix else name
+            boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"), ContentType="text/plain")
+        else:
+            path = os.path.join(self.output, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(body)
@@ -0,0 +1,39 @@
+import logging
+
+import pandas as pd
+
+from feature_schema import first_row
+
+logger = logging.getLogger()
+
+
+def unwrap_prediction(prediction):
+    # [[v]] / [v] -> v; anything else is kept as logged
+    if isinstance(prediction, list) and prediction:
+        prediction = prediction[0]
+        if isinstance(prediction, list) and prediction:
+            prediction = prediction[0]
+    return prediction
+
+
+def records_to_frame(records, feature_columns, prediction_column) -> pd.DataFrame:
+    # Pure part of the monitoring job: logged prediction records -> one row per request.
+    # Rows are collected as plain lists and the frame is built once, column-wise.
+    features, predictions = [], []
+    for rec in records:
+        # The wrapper logs the request payload as-is: {"data": [[...]]}, [[...]] or [...]
+        row = first_row(rec.get("features", []))
+        if row is None:
+            logger.warning(f"Unexpected features format: {rec.get('features')}")
+            continue
+        features.append(row)
+        predictions.append(unwrap_prediction(rec.get("prediction")))
+
+    if not features:
+        return pd.DataFrame()
+
+    width = max(map(len, features))
+    columns = [feature_columns[i] if i < len(feature_columns) else f"temp_{i}" for i in range(width)]
+    df = pd.DataFrame(features, columns=columns)
+    df[prediction_column] = predictions
+    return df
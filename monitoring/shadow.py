@@ -0,0 +1,153 @@
+import os
+import json
+import logging
+from datetime import date, timedelta
+
+import boto3
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+BUCKET = os.environ.get("MONITORING_BUCKET")
+SHADOW_PREFIX = os.environ.get("SHADOW_PREFIX", "monitoring/shadow/")
+REPORT_PREFIX = os.environ.get("REPORT_PREFIX", "monitoring/reports/")
+ENDPOINT_NAME = os.environ.get("ENDPOINT_NAME", "real-estate-endpoint")
+SHADOW_VARIANT = os.environ.get("SHADOW_VARIANT", "Shadow")
+DEPLOY_LAMBDA_ARN = os.environ.get("DEPLOY_LAMBDA_ARN")
+DEPLOY_ROLE_ARN = os.environ.get("DEPLOY_ROLE_ARN")
+
+THRESHOLDS = {
+    "min_samples": int(os.environ.get("SHADOW_MIN_SAMPLES", 500)),
+    "lookback_days": int(os.environ.get("SHADOW_LOOKBACK_DAYS", 7)),
+    "max_error_rate": float(os.environ.get("SHADOW_MAX_ERROR_RATE", 0.01)),
+    "max_p50_ratio": float(os.environ.get("SHADOW_MAX_P50_RATIO", 1.2)),
+    "max_p99_ratio": float(os.environ.get("SHADOW_MAX_P99_RATIO", 1.5)),
+    "max_mean_rel_delta": float(os.environ.get("SHADOW_MAX_MEAN_REL_DELTA", 0.25)),
+}
+
+
+def first_value(prediction):
+    # The endpoint answers [[v]], [v] or v depending on the payload shape
+    while isinstance(prediction, list):
+        if not prediction:
+            return None
+        prediction = prediction[0]
+    try:
+        return float(prediction)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_records(s3, bucket, prefix, days, today=None):
+    today = today or date.today()
+    paginator = s3.get_paginator("list_objects_v2")
+    records = []
+    for offset in range(days):
+        day_prefix = f"{prefix}{today - timedelta(days=offset)}/"
+        for page in paginator.paginate(Bucket=bucket, Prefix=day_prefix):
+            for obj in page.get("Contents", []):
+                try:
+                    records.append(json.loads(s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()))
+                except Exception as e:
+                    logger.error(f"Error reading {obj['Key']}: {e}")
+    return records
+
+
+def latency_summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {"p50": None, "p90": None, "p99": None, "mean": None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99), "mean": float(values.mean())}
+
+
+def compare(records, thresholds=THRESHOLDS):
+    n = len(records)
+    errors = sum(1 for r in records if r.get("shadow_error"))
+    ok = [r for r in records if not r.get("shadow_error") and r.get("shadow_latency_ms") is not None]
+
+    primary = latency_summary([r["primary_latency_ms"] for r in ok])
+    shadow = latency_summary([r["shadow_latency_ms"] for r in ok])
+
+    pairs = np.array([(first_value(r["primary_prediction"]), first_value(r["shadow_prediction"])) for r in ok],
+                     dtype=np.float64).reshape(-1, 2)
+    pairs = pairs[~np.isnan(pairs).any(axis=1)]
+    deltas = pairs[:, 1] - pairs[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.abs(deltas) / np.maximum(np.abs(pairs[:, 0]), 1e-9)
+
+    report = {
+        "samples": n,
+        "shadow_errors": errors,
+        "error_rate": errors / n if n else 0.0,
+        "latency_ms": {"primary": primary, "shadow": shadow},
+        "p50_ratio": shadow["p50"] / primary["p50"] if ok and primary["p50"] else None,
+        "p99_ratio": shadow["p99"] / primary["p99"] if ok and primary["p99"] else None,
+        "prediction_delta": {
+            "mean": float(deltas.mean()) if len(deltas) else None,
+            "mean_abs": float(np.abs(deltas).mean()) if len(deltas) else None,
+            "p95_abs": float(np.percentile(np.abs(deltas), 95)) if len(deltas) else None,
+            "mean_rel": float(rel.mean()) if len(rel) else None,
+        },
+        "thresholds": thresholds,
+    }
+
+    reasons = []
+    if errors > thresholds["max_error_rate"] * max(n, thresholds["min_samples"]):
+        reasons.append(f"shadow error rate {report['error_rate']:.3f} > {thresholds['max_error_rate']}")
+    if n >= thresholds["min_samples"] and ok:
+        if report["p50_ratio"] and report["p50_ratio"] > thresholds["max_p50_ratio"]:
+            reasons.append(f"p50 latency ratio {report['p50_ratio']:.2f} > {thresholds['max_p50_ratio']}")
+        if report["p99_ratio"] and report["p99_ratio"] > thresholds["max_p99_ratio"]:
+            reasons.append(f"p99 latency ratio {report['p99_ratio']:.2f} > {thresholds['max_p99_ratio']}")
+        mean_rel = report["prediction_delta"]["mean_rel"]
+        if mean_rel is not None and mean_rel > thresholds["max_mean_rel_delta"]:
+            reasons.append(f"mean relative prediction delta {mean_rel:.3f} > {thresholds['max_mean_rel_delta']}")
+
+    if reasons:
+        report["decision"] = "abort"
+    elif n < thresholds["min_samples"]:
+        report["decision"] = "continue"
+        reasons.append(f"{n}/{thresholds['min_samples']} mirrored samples so far")
+    else:
+        report["decision"] = "promote"
+    report["reasons"] = reasons
+    return report
+
+
+def lambda_handler(event, context):
+    sm = boto3.client("sagemaker")
+    s3 = boto3.client("s3")
+
+    endpoint = sm.describe_endpoint(EndpointName=ENDPOINT_NAME)
+    config_name = endpoint["EndpointConfigName"]
+    if endpoint["EndpointStatus"] != "InService" or \
+            SHADOW_VARIANT not in [v["VariantName"] for v in endpoint.get("ProductionVariants", [])]:
+        logger.info(f"No active shadow variant on {ENDPOINT_NAME} ({endpoint['EndpointStatus']})")
+        return {"statusCode": 200, "body": json.dumps({"message": "No shadow deployment"})}
+
+    records = [r for r in load_records(s3, BUCKET, SHADOW_PREFIX, THRESHOLDS["lookback_days"])
+               if r.get("config_name") == config_name]
+    report = compare(records)
+    report.update(endpoint_name=ENDPOINT_NAME, config_name=config_name)
+    logger.info(f"Shadow comparison for {config_name}: {report['decision']} ({'; '.join(report['reasons'])})")
+
+    report_key = f"{REPORT_PREFIX}shadow_report_{config_name}.json"
+    s3.put_object(Bucket=BUCKET, Key=report_key, Body=json.dumps(report).encode("utf-8"),
+                  ContentType="application/json")
+
+    decided = report["decision"] in ("promote", "abort") and not event.get("dry_run")
+    if decided and DEPLOY_LAMBDA_ARN:
+        boto3.client("lambda").invoke(
+            FunctionName=DEPLOY_LAMBDA_ARN,
+            InvocationType="Event",
+            Payload=json.dumps({"endpoint_name": ENDPOINT_NAME, "role_arn": DEPLOY_ROLE_ARN,
+                                "shadow_decision": report["decision"]}),
+        )
+        logger.info(f"Sent '{report['decision']}' to {DEPLOY_LAMBDA_ARN}")
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"decision": report["decision"], "reasons": report["reasons"], "report": report_key})
+    }
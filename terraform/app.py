@@ -1,18 +1,40 @@
 import os
 import json
+import time
 import logging
 import joblib
 import pandas as pd
 from flask import Flask, request, Response
 
+from profiling import Profiler
+from codec import decode_request, encode_predictions
+from feature_schema import FEATURE_COLUMNS
+from model_cache import ModelCache, ModelWatcher, UnknownModelVersion, file_version
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+profiler = Profiler.from_env("serving")
+
+DEFAULT_VERSION = "default"
+
+# Extra model versions next to the default one (MODEL_VERSIONS_ROOT=<dir or s3://...>/<version>/model.pkl)
+models = ModelCache.from_env()
+models.track(DEFAULT_VERSION)
 
 model = None
 
 
+def swap_model(new_model, version):
+    # A single global rebinding: in-flight requests finish on the model they already hold
+    global model
+    model = new_model
+
+
+watcher = ModelWatcher.from_env(swap_model)
+
+
 def load_model():
     global model
     if model is None:
@@ -31,6 +53,7 @@ def load_model():
         try:
             model = joblib.load(model_path)
             logger.info("Model loaded successfully")
+            watcher.start(model_path, file_version(model_path))
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
     return model
@@ -40,42 +63,62 @@ def load_model():
 def ping():
     m = load_model()
     if m:
-        return Response(response="\n", status=200)
+        return Response(response=json.dumps(watcher.status()), status=200, mimetype="application/json")
     else:
         return Response(response="Model not loaded", status=500)
 
 
-@app.route("/invocations", methods=["POST"])
-def predict():
-    m = load_model()
-    if not m:
-        return Response(response="Model not loaded", status=500)
-
-    if request.content_type == "application/json":
-        data = request.get_json()
-        if isinstance(data, dict) and "data" in data:
-            data = data["data"]
+def requested_version():
+    # InvokeEndpoint only forwards CustomAttributes ("model-version=v3"); local callers can use the header
+    version = request.headers.get("X-Model-Version")
+    for attribute in request.headers.get("X-Amzn-SageMaker-Custom-Attributes", "").split(","):
+        key, _, value = attribute.strip().partition("=")
+        if key == "model-version" and value:
+            version = value
+    return version
 
-        try:
-            df = pd.DataFrame(data)
 
-            prediction = m.predict(df)
-            return json.dumps({"predictions": prediction.tolist()})
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(response=json.dumps(models.metrics()), status=200, mimetype="application/json")
 
-        except Exception as e:
-            logger.error(f"Prediction error: {e}")
-            return Response(response=str(e), status=400)
 
-    elif request.content_type == "text/csv":
+@app.route("/invocations", methods=["POST"])
+@app.route("/models/<version>/invocations", methods=["POST"])
+@profiler.profiled_call()
+def predict(version=None):
+    version = version or requested_version() or DEFAULT_VERSION
+    start = time.perf_counter()
+    response = score(version)
+    ok = not isinstance(response, Response) or response.status_code < 400
+    models.observe(version, (time.perf_counter() - start) * 1000, ok)
+    return response
+
+
+def score(version):
+    if version == DEFAULT_VERSION:
+        m = load_model()
+    else:
         try:
-            df = pd.read_csv(request.files['body'] if 'body' in request.files else request.stream, header=None)
-            prediction = m.predict(df)
-            return json.dumps({"predictions": prediction.tolist()})
-        except Exception as e:
-            return Response(response=str(e), status=400)
+            m = models.get(version)
+        except UnknownModelVersion:
+            return Response(response=f"Unknown model version: {version}", status=404)
+    if not m:
+        return Response(response="Model not loaded", status=500)
 
-    else:
+    if request.content_type not in ("application/json", "text/csv"):
         return Response(response="Unsupported content type", status=415)
 
+    try:
+        body = request.files["body"].read() if "body" in request.files else request.get_data()
+        df = pd.DataFrame(decode_request(body, request.content_type), columns=FEATURE_COLUMNS)
+        prediction = m.predict(df)
+        return Response(response=encode_predictions(prediction), status=200, mimetype="application/json")
+
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        return Response(response=str(e), status=400)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
@@ -0,0 +1,58 @@
+# --- Deployment history: one partition per endpoint, rollback target is a single GetItem ---
+resource "aws_dynamodb_table" "deployment_history" {
+  name         = "DeploymentHistory-${var.project_name}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "endpoint_name"
+  range_key    = "config_name"
+
+  attribute {
+    name = "endpoint_name"
+    type = "S"
+  }
+
+  attribute {
+    name = "config_name"
+    type = "S"
+  }
+
+  attribute {
+    name = "deployed_at"
+    type = "N"
+  }
+
+  local_secondary_index {
+    name            = "by_deployed_at"
+    range_key       = "deployed_at"
+    projection_type = "ALL"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+}
+
+resource "aws_iam_policy" "deployment_history_access" {
+  name        = "DeploymentHistoryAccess-${var.project_name}"
+  description = "Allows deploy and rollback Lambdas to read and write the deployment history"
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect = "Allow",
+      Action = [
+        "dynamodb:GetItem",
+        "dynamodb:PutItem",
+        "dynamodb:UpdateItem",
+        "dynamodb:Query"
+      ],
+      Resource = [
+        aws_dynamodb_table.deployment_history.arn,
+        "${aws_dynamodb_table.deployment_history.arn}/index/*"
+      ]
+    }]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "deployment_history_attach" {
+  role       = aws_iam_role.lambda_deployment_role.name
+  policy_arn = aws_iam_policy.deployment_history_access.arn
+}
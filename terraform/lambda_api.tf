@@ -21,14 +21,14 @@ resource "aws_iam_role" "lambda_api_role" {
 
 resource "aws_iam_policy" "lambda_api_policy" {
   name        = "LambdaApiWrapperPolicy-${var.project_name}"
-  description = "Access to SageMaker invoke and S3 logging"
+  description = "Access to SageMaker invoke, S3 logging and asynchronous shadow mirroring"
 
   policy = jsonencode({
     Version = "2012-10-17",
     Statement = [
       {
         Effect = "Allow",
-        Action = ["sagemaker:InvokeEndpoint"],
+        Action = ["sagemaker:InvokeEndpoint", "sagemaker:DescribeEndpoint"],
         Resource = [
             "arn:aws:sagemaker:${var.aws_region}:${var.account_id}:endpoint/real-estate-endpoint-${var.project_name}",
             "arn:aws:sagemaker:${var.aws_region}:${var.account_id}:endpoint/*"
@@ -42,6 +42,12 @@ resource "aws_iam_policy" "lambda_api_policy" {
         ],
         Resource = "${aws_s3_bucket.target_bucket.arn}/monitoring/*"
       },
+      {
+        # Shadow mirroring re-invokes this function asynchronously
+        Effect = "Allow",
+        Action = "lambda:InvokeFunction",
+        Resource = "arn:aws:lambda:${var.aws_region}:${var.account_id}:function:ApiWrapperLambda-${var.project_name}"
+      },
       {
         Effect = "Allow",
         Action = [
@@ -76,6 +82,10 @@ resource "aws_lambda_function" "api_wrapper_lambda" {
 
       MONITORING_BUCKET = aws_s3_bucket.target_bucket.id
       MONITORING_PREFIX = "monitoring/predictions/"
+
+      SHADOW_VARIANT         = "Shadow"
+      SHADOW_SAMPLE_RATE     = "0.1"
+      SHADOW_PREFIX          = "monitoring/shadow/"
     }
   }
 }
@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tarfile
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+LATENCY_WINDOW = 1024
+
+
+class UnknownModelVersion(KeyError):
+    pass
+
+
+def s3_client(client=None):
+    if client is None:
+        import boto3
+
+        client = boto3.client("s3")
+    return client
+
+
+def split_s3_uri(uri):
+    bucket, _, key = uri.replace("s3://", "", 1).partition("/")
+    return bucket, key
+
+
+def extract_model(archive, extract_dir):
+    # model.tar.gz as written by the training job -> path of the model.pkl inside it
+    with tarfile.open(archive) as tar:
+        tar.extract("model.pkl", extract_dir)
+    return os.path.join(extract_dir, "model.pkl")
+
+
+_measure_lock = threading.Lock()
+
+
+def load_measured(path):
+    # joblib.load plus the memory the unpickled model holds (traced bytes still allocated afterwards).
+    # The pickle's file size is a poor stand-in: compressed or shared arrays can be several times larger in
+    # memory. Loads are serialised so concurrent ones don't count each other's allocations.
+    with _measure_lock:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            model = joblib.load(path)
+            # The profiler's allocation tracking may have switched tracing off meanwhile
+            size = tracemalloc.get_traced_memory()[0] - before if tracemalloc.is_tracing() else 0
+        finally:
+            if started:
+                tracemalloc.stop()
+    return model, size if size > 0 else os.path.getsize(path)
+
+
+def file_version(path):
+    # Content hash, so re-copying an identical artifact is not a new version
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class VersionStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self):
+        latencies = sorted(self.latencies_ms)
+
+        def pct(q):
+            return round(latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))], 3) if latencies else None
+        return {"requests": self.requests, "errors": self.errors, "hits": self.hits, "loads": self.loads,
+                "evictions": self.evictions, "load_seconds": round(self.load_seconds, 3),
+                "latency_ms": {"p50": pct(50), "p90": pct(90), "p99": pct(99), "window": len(latencies)}}
+
+
+class ModelCache:
+    # Lazily loaded model versions, <root>/<version>/model.pkl (or model.tar.gz as produced by training),
+    # where root is a local directory or an s3:// prefix. Versions are kept in LRU order and evicted once
+    # the loaded models take more than max_bytes of memory; the most recently used version always stays.
+
+    def __init__(self, root, max_bytes, download_dir="/tmp/model_versions", s3=None):
+        self.root = root.rstrip("/") if root else None
+        self.max_bytes = max_bytes
+        self.download_dir = download_dir
+        self._s3 = s3
+        self.entries = OrderedDict()  # version -> (model, bytes in memory)
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._loading = {}  # version -> lock, so concurrent misses load a version once
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("MODEL_VERSIONS_ROOT"),
+                   int(float(os.environ.get("MODEL_CACHE_MAX_MB", 1024)) * 1024 * 1024))
+
+    @property
+    def used_bytes(self):
+        return sum(size for _, size in self.entries.values())
+
+    def track(self, version):
+        with self._lock:
+            self.stats.setdefault(version, VersionStats())
+
+    def get(self, version):
+        if not self.root or not VERSION_PATTERN.match(version):
+            raise UnknownModelVersion(version)
+
+        with self._lock:
+            if version in self.entries:
+                self.entries.move_to_end(version)
+                self.stats[version].hits += 1
+                return self.entries[version][0]
+            loading = self._loading.setdefault(version, threading.Lock())
+
+        with loading:
+            with self._lock:
+                if version in self.entries:  # loaded by a concurrent request while we waited
+                    self.stats[version].hits += 1
+                    return self.entries[version][0]
+
+            start = time.perf_counter()
+            try:
+                model, size = load_measured(self._artifact(version))
+            except Exception:
+                # Unknown or unreadable: the next miss tries again with a fresh lock
+                with self._lock:
+                    self._loading.pop(version, None)
+                raise
+
+            with self._lock:
+                stats = self.stats.setdefault(version, VersionStats())
+                stats.loads += 1
+                stats.load_seconds += time.perf_counter() - start
+                self.entries[version] = (model, size)
+                self._loading.pop(version, None)
+                self._evict()
+            logger.info(f"Loaded model version {version} ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s; "
+                        f"cache holds {list(self.entries)} ({self.used_bytes / 1e6:.1f} MB)")
+            return model
+
+    def _evict(self):
+        while len(self.entries) > 1 and self.used_bytes > self.max_bytes:
+            version, _ = self.entries.popitem(last=False)
+            self.stats[version].evictions += 1
+            logger.info(f"Evicted model version {version} from the cache")
+
+    def _artifact(self, version):
+        if self.root.startswith("s3://"):
+            local_dir = os.path.join(self.download_dir, version)
+            if not os.path.exists(os.path.join(local_dir, "model.pkl")):
+                self._download(version, local_dir)
+        else:
+            local_dir = os.path.join(self.root, version)
+
+        path = os.path.join(local_dir, "model.pkl")
+        if os.path.exists(path):
+            return path
+        archive = os.path.join(local_dir, "model.tar.gz")
+        if os.path.exists(archive):
+            return extract_model(archive, os.path.join(self.download_dir, version))
+        raise UnknownModelVersion(version)
+
+    def _download(self, version, local_dir):
+        self._s3 = s3_client(self._s3)
+        bucket, prefix = split_s3_uri(self.root)
+        os.makedirs(local_dir, exist_ok=True)
+        for name in ("model.pkl", "model.tar.gz"):
+            key = f"{prefix}/{version}/{name}" if prefix else f"{version}/{name}"
+            try:
+                self._s3.download_file(bucket, key, os.path.join(local_dir, name))
+                return
+            except Exception as e:
+                logger.debug(f"No s3://{bucket}/{key}: {e}")
+        shutil.rmtree(local_dir, ignore_errors=True)
+        raise UnknownModelVersion(version)
+
+    def observe(self, version, latency_ms, ok):
+        # Only versions that exist get stats, so arbitrary header values can't grow this dict
+        with self._lock:
+            stats = self.stats.get(version)
+            if stats is None:
+                return
+            stats.requests += 1
+            stats.errors += 0 if ok else 1
+            stats.latencies_ms.append(latency_ms)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "cache": {"versions": list(self.entries), "used_bytes": self.used_bytes, "max_bytes": self.max_bytes},
+                "versions": {version: stats.as_dict() for version, stats in self.stats.items()},
+            }
+
+
+class ModelWatcher:
+    # Polls the default model's location and hands a freshly loaded model to `on_reload(model, version)`.
+    # Without a manifest the model.pkl file is watched (mtime/size, then content hash); with
+    # MODEL_MANIFEST_URI a JSON manifest {"version": ..., "model_uri": <path or s3:// .pkl/.tar.gz>} is polled.
+    # Loading happens on this thread; requests keep using the previous model until the swap.
+
+    def __init__(self, interval, on_reload, manifest_uri=None, download_dir="/tmp/model_reload", s3=None):
+        self.interval = interval
+        self.on_reload = on_reload
+        self.manifest_uri = manifest_uri
+        self.download_dir = download_dir
+        self._s3 = s3
+        self.model_path = None
+        self.version = None
+        self.reloads = 0
+        self.last_error = None
+        self._fingerprint = None
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, on_reload):
+        return cls(float(os.environ.get("MODEL_RELOAD_SECONDS", 30)), on_reload,
+                   manifest_uri=os.environ.get("MODEL_MANIFEST_URI"))
+
+    def start(self, model_path, version):
+        # The model baked into the container is the manifest's current version; its content hash would
+        # never match the manifest and the first poll would reload the same model
+        if self.manifest_uri:
+            try:
+                version = self._read_manifest()["version"]
+            except Exception as e:
+                logger.warning(f"Could not read {self.manifest_uri}, the first poll will reload: {e}")
+        self.model_path, self.version = model_path, version
+        self._fingerprint = self._stat(model_path)
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+            logger.info(f"Watching {self.manifest_uri or model_path} every {self.interval:g}s for new models")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                # e.g. an artifact caught half-written: keep serving the current model, retry next poll
+                self.last_error = str(e)
+                logger.error(f"Model reload failed, keeping version {self.version}: {e}")
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self):
+        if self.manifest_uri:
+            manifest = self._read_manifest()
+            if manifest["version"] == self.version:
+                return False
+            path = self._fetch(manifest["model_uri"], manifest["version"])
+            version = manifest["version"]
+        else:
+            fingerprint = self._stat(self.model_path)
+            if fingerprint is None or fingerprint == self._fingerprint:
+                return False
+            path = self.model_path
+            version = file_version(path)
+            self._fingerprint = fingerprint
+            if version == self.version:
+                return False
+
+        start = time.perf_counter()
+        model = joblib.load(path)
+        self.on_reload(model, version)
+        previous, self.version = self.version, version
+        self.reloads += 1
+        logger.info(f"Reloaded model {previous} -> {version} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def _read_manifest(self):
+        if self.manifest_uri.startswith("s3://"):
+            self._s3 = s3_client(self._s3)
+            bucket, key = split_s3_uri(self.manifest_uri)
+            return json.loads(self._s3.get_object(Bucket=bucket, Key=key)["Body"].read())
+        with open(self.manifest_uri) as f:
+            return json.load(f)
+
+    def _fetch(self, uri, version):
+        local_dir = os.path.join(self.download_dir, version)
+        if uri.startswith("s3://"):
+            os.makedirs(local_dir, exist_ok=True)
+            local = os.path.join(local_dir, os.path.basename(uri))
+            self._s3 = s3_client(self._s3)
+            self._s3.download_file(*split_s3_uri(uri), local)
+            uri = local
+        return extract_model(uri, local_dir) if uri.endswith(".tar.gz") else uri
+
+    def status(self):
+        return {"version": self.version, "reloads": self.reloads, "last_error": self.last_error,
+                "source": self.manifest_uri or self.model_path}
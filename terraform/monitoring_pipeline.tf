@@ -114,4 +114,78 @@ resource "aws_lambda_permission" "allow_eventbridge_invoke_monitoring" {
   function_name = aws_lambda_function.monitoring_evidently_lambda.arn
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.monitoring_evidently_daily.arn
-}
\ No newline at end of file
+}
+# --- Shadow comparison: same image, decides promote/abort for a challenger running as the Shadow variant ---
+resource "aws_iam_policy" "shadow_analysis_policy" {
+  name = "LambdaShadowAnalysisPolicy-${var.project_name}"
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow",
+        Action   = ["sagemaker:DescribeEndpoint"],
+        Resource = "arn:aws:sagemaker:${var.aws_region}:${var.account_id}:endpoint/real-estate-endpoint-${var.project_name}"
+      },
+      {
+        Effect   = "Allow",
+        Action   = ["lambda:InvokeFunction"],
+        Resource = aws_lambda_function.pipeline_deploy_helper.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "shadow_analysis_attach" {
+  role       = aws_iam_role.lambda_monitoring_role.name
+  policy_arn = aws_iam_policy.shadow_analysis_policy.arn
+}
+
+resource "aws_lambda_function" "shadow_analysis_lambda" {
+  function_name = "ShadowAnalysisLambda-${var.project_name}"
+  role          = aws_iam_role.lambda_monitoring_role.arn
+
+  timeout      = 300
+  memory_size  = 1024
+  package_type = "Image"
+  image_uri    = "${aws_ecr_repository.monitoring_repo.repository_url}:${var.image_tag}"
+
+  image_config {
+    command = ["shadow.lambda_handler"]
+  }
+
+  environment {
+    variables = {
+      MONITORING_BUCKET  = aws_s3_bucket.target_bucket.id
+      SHADOW_PREFIX      = "monitoring/shadow/"
+      REPORT_PREFIX      = "monitoring/reports/"
+      ENDPOINT_NAME      = "real-estate-endpoint-${var.project_name}"
+      SHADOW_VARIANT     = "Shadow"
+      DEPLOY_LAMBDA_ARN  = aws_lambda_function.pipeline_deploy_helper.arn
+      DEPLOY_ROLE_ARN    = aws_iam_role.sagemaker_execution_role.arn
+      SHADOW_MIN_SAMPLES = "500"
+    }
+  }
+
+  depends_on = [
+    time_sleep.wait_for_iam
+  ]
+}
+
+resource "aws_cloudwatch_event_rule" "shadow_analysis_hourly" {
+  name                = "ShadowAnalysisHourly-${var.project_name}"
+  schedule_expression = "rate(1 hour)"
+}
+
+resource "aws_cloudwatch_event_target" "shadow_analysis_target" {
+  rule      = aws_cloudwatch_event_rule.shadow_analysis_hourly.name
+  target_id = "ShadowAnalysisLambdaTarget"
+  arn       = aws_lambda_function.shadow_analysis_lambda.arn
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_invoke_shadow_analysis" {
+  statement_id  = "AllowEventBridgeInvokeShadowAnalysis"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.shadow_analysis_lambda.arn
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.shadow_analysis_hourly.arn
+}
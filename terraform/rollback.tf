@@ -1,7 +1,22 @@
 data "archive_file" "rollback_lambda_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/../mlops_pipeline/rollback_lambda"
   output_path = "${path.module}/rollback_lambda.zip"
+
+  source {
+    content  = file("${path.module}/../mlops_pipeline/rollback_lambda/handler.py")
+    filename = "handler.py"
+  }
+
+  # Shared with the deploy Lambda, which writes the history this one reads
+  source {
+    content  = file("${path.module}/../mlops_pipeline/deploy_lambda/deployment_history.py")
+    filename = "deployment_history.py"
+  }
+
+  source {
+    content  = file("${path.module}/../mlops_pipeline/deploy_lambda/autoscaling.py")
+    filename = "autoscaling.py"
+  }
 }
 
 resource "aws_lambda_function" "rollback_lambda" {
@@ -15,7 +30,8 @@ resource "aws_lambda_function" "rollback_lambda" {
 
   environment {
     variables = {
-      ENDPOINT_NAME = "real-estate-endpoint-${var.project_name}"
+      ENDPOINT_NAME            = "real-estate-endpoint-${var.project_name}"
+      DEPLOYMENT_HISTORY_TABLE = aws_dynamodb_table.deployment_history.name
     }
   }
 }
@@ -38,6 +38,40 @@ resource "aws_iam_role_policy_attachment" "deployment_logs_access" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Shared by the deploy, rollback and trigger Lambdas, so reads are limited to the objects they need
+resource "aws_iam_policy" "lambda_deployment_s3_read" {
+  name        = "LambdaDeploymentS3Read-${var.project_name}"
+  description = "Dataset and training-state ETags for the step cache key, and the measured endpoint capacity"
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        # HeadObject on the weekly retrain's dataset (S3 upload events already carry the ETag)
+        Effect   = "Allow",
+        Action   = "s3:GetObject",
+        Resource = "${aws_s3_bucket.source_bucket.arn}/seed/real_estate.csv"
+      },
+      {
+        # HeadObject on the incremental-mode statistics, see StatsStateHash in pipeline.py
+        Effect   = "Allow",
+        Action   = "s3:GetObject",
+        Resource = "${aws_s3_bucket.target_bucket.arn}/training_state/linear_stats.json"
+      },
+      {
+        # The deploy Lambda sizes endpoint autoscaling from the measured capacity (CAPACITY_URI)
+        Effect   = "Allow",
+        Action   = "s3:GetObject",
+        Resource = "${aws_s3_bucket.target_bucket.arn}/capacity/endpoint_capacity.json"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "deployment_s3_read" {
+  role       = aws_iam_role.lambda_deployment_role.name
+  policy_arn = aws_iam_policy.lambda_deployment_s3_read.arn
+}
+
 resource "aws_iam_policy" "lambda_registry_access" {
   name = "LambdaModelRegistryAccess-${var.project_name}"
   description = "Allows Lambda to list and describe models in Registry"
@@ -87,16 +121,67 @@ resource "aws_lambda_function" "pipeline_deploy_helper" {
   role             = aws_iam_role.lambda_deployment_role.arn
   filename         = data.archive_file.deploy_lambda_zip.output_path
   source_code_hash = data.archive_file.deploy_lambda_zip.output_base64sha256
-  timeout          = 60
+  timeout          = 300 # runs phases until one has to wait on SageMaker, then the health check resumes
 
   environment {
     variables = {
       PROJECT_NAME             = var.project_name
       MODEL_PACKAGE_GROUP_NAME = aws_sagemaker_model_package_group.model_group.model_package_group_name
+      DEPLOYMENT_HISTORY_TABLE = aws_dynamodb_table.deployment_history.name
+
+      # Production alias for a promoted shadow deployment
+      MLFLOW_TRACKING_URI = "http://${aws_lb.mlflow_lb.dns_name}"
+
+      INSTANCE_TYPE                  = "ml.m5.large"
+      CAPACITY_URI                   = "s3://${aws_s3_bucket.target_bucket.id}/capacity/endpoint_capacity.json"
+      FALLBACK_RPS_PER_INSTANCE      = "5"
+      AUTOSCALING_MIN_CAPACITY       = tostring(var.endpoint_min_instances)
+      AUTOSCALING_MAX_CAPACITY       = tostring(var.endpoint_max_instances)
+      AUTOSCALING_TARGET_UTILIZATION = tostring(var.endpoint_target_utilization)
+      AUTOSCALING_SCALE_IN_COOLDOWN  = "300"
+      AUTOSCALING_SCALE_OUT_COOLDOWN = "60"
     }
   }
 }
 
+# --- Endpoint autoscaling (target tracking registered by the deploy Lambda) ---
+resource "aws_iam_policy" "lambda_autoscaling_access" {
+  name        = "LambdaEndpointAutoscaling-${var.project_name}"
+  description = "Allows deploy and rollback Lambdas to manage endpoint autoscaling"
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "application-autoscaling:RegisterScalableTarget",
+          "application-autoscaling:DeregisterScalableTarget",
+          "application-autoscaling:DescribeScalableTargets",
+          "application-autoscaling:PutScalingPolicy",
+          "application-autoscaling:DescribeScalingPolicies",
+          "cloudwatch:PutMetricAlarm",
+          "cloudwatch:DescribeAlarms",
+          "cloudwatch:DeleteAlarms"
+        ],
+        Resource = "*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = "iam:CreateServiceLinkedRole",
+        Resource = "arn:aws:iam::*:role/aws-service-role/sagemaker.application-autoscaling.amazonaws.com/*",
+        Condition = {
+          StringLike = { "iam:AWSServiceName" = "sagemaker.application-autoscaling.amazonaws.com" }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "autoscaling_access_attach" {
+  role       = aws_iam_role.lambda_deployment_role.name
+  policy_arn = aws_iam_policy.lambda_autoscaling_access.arn
+}
+
 # ==========================================
 # 4. OTHER RESOURCES
 # ==========================================
@@ -181,16 +266,31 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 sm = boto3.client("sagemaker")
+s3 = boto3.client("s3")
 PIPELINE_NAME = os.environ["PIPELINE_NAME"]
+STATS_BUCKET = os.environ["STATS_BUCKET"]
+STATS_KEY = os.environ["STATS_KEY"]
+def stats_state_hash():
+    try:
+        return s3.head_object(Bucket=STATS_BUCKET, Key=STATS_KEY)["ETag"].strip('"')
+    except Exception:
+        return "none"
 def lambda_handler(event, context):
     logger.info(f"Event: {event}")
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = event['Records'][0]['s3']['object']['key']
     input_data_uri = f"s3://{bucket}/{key}"
+    etag = event['Records'][0]['s3']['object'].get('eTag')
+    if not etag:
+        etag = s3.head_object(Bucket=bucket, Key=key)["ETag"]
     response = sm.start_pipeline_execution(
         PipelineName=PIPELINE_NAME,
         PipelineExecutionDisplayName=f"Triggered-by-S3-Upload",
-        PipelineParameters=[{'Name': 'InputData', 'Value': input_data_uri}]
+        PipelineParameters=[
+            {'Name': 'InputData', 'Value': input_data_uri},
+            {'Name': 'InputDataHash', 'Value': etag.strip('"')},
+            {'Name': 'StatsStateHash', 'Value': stats_state_hash()}
+        ]
     )
     return {"status": "started", "arn": response["PipelineExecutionArn"]}
 EOF
@@ -227,6 +327,8 @@ resource "aws_lambda_function" "pipeline_trigger" {
   environment {
     variables = {
       PIPELINE_NAME = aws_sagemaker_pipeline.mlops_pipeline.pipeline_name
+      STATS_BUCKET  = aws_s3_bucket.target_bucket.id
+      STATS_KEY     = "training_state/linear_stats.json"
     }
   }
 }
@@ -20,4 +20,22 @@ variable "image_tag" {
   description = "Тег для Docker образів (Git SHA)"
   type        = string
   default     = "latest"
-}
\ No newline at end of file
+}
+
+variable "endpoint_min_instances" {
+  description = "Мінімальна кількість інстансів ендпоінта (autoscaling)"
+  type        = number
+  default     = 1
+}
+
+variable "endpoint_max_instances" {
+  description = "Максимальна кількість інстансів ендпоінта (autoscaling)"
+  type        = number
+  default     = 4
+}
+
+variable "endpoint_target_utilization" {
+  description = "Частка виміряної стійкої пропускної здатності інстанса, на яку цілиться autoscaling"
+  type        = number
+  default     = 0.7
+}
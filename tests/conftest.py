@@ -0,0 +1,209 @@
+import os
+import sys
+import importlib.util
+
+import boto3
+import botocore.exceptions
+import pytest
+from botocore.exceptions import ClientError, ParamValidationError
+from botocore.validate import ParamValidator
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Scripts and Lambdas import their sibling modules by name, as they do inside their containers
+for path in (("mlops_pipeline", "scripts"), ("mlops_pipeline", "deploy_lambda"), ("terraform",), ("monitoring",),
+             ("benchmarks",)):
+    sys.path.insert(0, os.path.join(ROOT, *path))
+
+HISTORY_TABLE = "DeploymentHistory-test"
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    # moto stand-in for terraform/deployment_history.tf
+    from moto import mock_aws
+
+    for name, value in {"AWS_DEFAULT_REGION": "eu-north-1", "AWS_REGION": "eu-north-1",
+                        "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                        "DEPLOYMENT_HISTORY_TABLE": HISTORY_TABLE}.items():
+        monkeypatch.setenv(name, value)
+
+    with mock_aws():
+        resource = boto3.resource("dynamodb")
+        resource.create_table(
+            TableName=HISTORY_TABLE,
+            BillingMode="PAY_PER_REQUEST",
+            KeySchema=[{"AttributeName": "endpoint_name", "KeyType": "HASH"},
+                       {"AttributeName": "config_name", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "endpoint_name", "AttributeType": "S"},
+                                  {"AttributeName": "config_name", "AttributeType": "S"},
+                                  {"AttributeName": "deployed_at", "AttributeType": "N"}],
+            LocalSecondaryIndexes=[{
+                "IndexName": "by_deployed_at",
+                "KeySchema": [{"AttributeName": "endpoint_name", "KeyType": "HASH"},
+                              {"AttributeName": "deployed_at", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+        )
+        yield resource
+
+
+@pytest.fixture
+def load_lambda(dynamodb):
+    # Every Lambda entry point is a handler.py, so each is loaded under its own module name
+    def load(directory):
+        name = f"{directory}_handler"
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "mlops_pipeline", directory,
+                                                                         "handler.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+
+def _client_error(operation, code, message):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+class FakeService:
+    # Requests are checked against the real botocore model, so a value AWS would reject
+    # (e.g. a Decimal read back from DynamoDB) fails here too
+    exceptions = botocore.exceptions
+
+    def __init__(self, service_name):
+        self.service = boto3.client(service_name).meta.service_model
+        self.calls = []
+
+    def _call(self, operation, params):
+        report = ParamValidator().validate(params, self.service.operation_model(operation).input_shape)
+        if report.has_errors():
+            raise ParamValidationError(report=report.generate_report())
+        self.calls.append((operation, params))
+
+    def called(self, operation):
+        return [params for name, params in self.calls if name == operation]
+
+
+class FakeSageMaker(FakeService):
+    # Endpoints stay Creating/Updating until settle(), like a real deployment between two invocations
+
+    def __init__(self):
+        super().__init__("sagemaker")
+        self.models, self.configs, self.endpoints = {}, {}, {}
+        self.packages = {}  # model package ARN -> approval status
+
+    def create_model(self, **params):
+        self._call("CreateModel", params)
+        if params["ModelName"] in self.models:
+            raise _client_error("CreateModel", "ValidationException", "Model already exists")
+        self.models[params["ModelName"]] = params
+
+    def create_endpoint_config(self, **params):
+        self._call("CreateEndpointConfig", params)
+        if params["EndpointConfigName"] in self.configs:
+            raise _client_error("CreateEndpointConfig", "ValidationException", "Endpoint config already exists")
+        self.configs[params["EndpointConfigName"]] = params
+
+    def describe_endpoint_config(self, **params):
+        self._call("DescribeEndpointConfig", params)
+        if params["EndpointConfigName"] not in self.configs:
+            raise _client_error("DescribeEndpointConfig", "ValidationException", "Could not find endpoint config")
+        return self.configs[params["EndpointConfigName"]]
+
+    def delete_endpoint_config(self, **params):
+        self._call("DeleteEndpointConfig", params)
+        if self.configs.pop(params["EndpointConfigName"], None) is None:
+            raise _client_error("DeleteEndpointConfig", "ValidationException", "Could not find endpoint config")
+
+    def delete_model(self, **params):
+        self._call("DeleteModel", params)
+        if self.models.pop(params["ModelName"], None) is None:
+            raise _client_error("DeleteModel", "ValidationException", "Could not find model")
+
+    def describe_endpoint(self, **params):
+        self._call("DescribeEndpoint", params)
+        if params["EndpointName"] not in self.endpoints:
+            raise _client_error("DescribeEndpoint", "ValidationException", "Could not find endpoint")
+        return dict(self.endpoints[params["EndpointName"]])
+
+    def create_endpoint(self, **params):
+        self._call("CreateEndpoint", params)
+        self.endpoints[params["EndpointName"]] = {"EndpointName": params["EndpointName"],
+                                                  "EndpointConfigName": None, "EndpointStatus": "Creating",
+                                                  "pending": params["EndpointConfigName"]}
+
+    def update_endpoint(self, **params):
+        self._call("UpdateEndpoint", params)
+        endpoint = self.endpoints[params["EndpointName"]]
+        configs = (endpoint["EndpointConfigName"], params["EndpointConfigName"])
+        if "DeploymentConfig" in params and any(len(self.configs[c]["ProductionVariants"]) > 1 for c in configs):
+            raise _client_error("UpdateEndpoint", "ValidationException",
+                                "Deployment guardrails are not supported for endpoints with multiple variants")
+        endpoint.update(EndpointStatus="Updating", pending=params["EndpointConfigName"])
+
+    def delete_endpoint(self, **params):
+        self._call("DeleteEndpoint", params)
+        del self.endpoints[params["EndpointName"]]
+
+    def list_model_packages(self, **params):
+        self._call("ListModelPackages", params)
+        status = params.get("ModelApprovalStatus")
+        arns = [arn for arn, s in self.packages.items() if status is None or s == status]
+        return {"ModelPackageSummaryList": [{"ModelPackageArn": arn} for arn in reversed(arns)]}
+
+    def update_model_package(self, **params):
+        self._call("UpdateModelPackage", params)
+        self.packages[params["ModelPackageArn"]] = params["ModelApprovalStatus"]
+
+    # --- test controls ---
+
+    def serve(self, endpoint_name, config_name, status="InService"):
+        # An endpoint created outside the test gets a single-variant config
+        self.configs.setdefault(config_name, {"EndpointConfigName": config_name, "ProductionVariants": [
+            {"VariantName": "AllTraffic", "ModelName": f"model-{config_name}", "InitialInstanceCount": 1,
+             "InstanceType": "ml.m5.large"}]})
+        self.endpoints[endpoint_name] = {"EndpointName": endpoint_name, "EndpointConfigName": config_name,
+                                         "EndpointStatus": status}
+
+    def settle(self, endpoint_name, rolled_back=False):
+        # Finishes a pending create/update; a rolled-back update keeps serving the old config
+        endpoint = self.endpoints[endpoint_name]
+        pending = endpoint.pop("pending", None)
+        if pending and not rolled_back:
+            endpoint["EndpointConfigName"] = pending
+        endpoint["EndpointStatus"] = "InService"
+
+
+class FakeAutoscaling(FakeService):
+    def __init__(self):
+        super().__init__("application-autoscaling")
+        self.targets, self.policies = {}, {}
+
+    def register_scalable_target(self, **params):
+        self._call("RegisterScalableTarget", params)
+        self.targets[params["ResourceId"]] = params
+
+    def put_scaling_policy(self, **params):
+        self._call("PutScalingPolicy", params)
+        self.policies[params["ResourceId"]] = params
+
+    def describe_scalable_targets(self, **params):
+        self._call("DescribeScalableTargets", params)
+        return {"ScalableTargets": [self.targets[r] for r in params.get("ResourceIds", []) if r in self.targets]}
+
+    def deregister_scalable_target(self, **params):
+        self._call("DeregisterScalableTarget", params)
+        if self.targets.pop(params["ResourceId"], None) is None:
+            raise _client_error("DeregisterScalableTarget", "ObjectNotFoundException", "No scalable target found")
+        # Deleting the target also deletes its scaling policies
+        self.policies.pop(params["ResourceId"], None)
+
+
+@pytest.fixture
+def sagemaker(dynamodb):
+    return FakeSageMaker()
+
+
+@pytest.fixture
+def application_autoscaling(dynamodb):
+    return FakeAutoscaling()
@@ -0,0 +1,222 @@
+import csv
+import json
+import random
+import asyncio
+import argparse
+import logging
+from io import StringIO
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from load_test import LatencyHistogram, PERCENTILES
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+logger = logging.getLogger()
+
+# Same feature row as tests/load_test.py, jittered so batches aren't identical rows
+BASE_ROW = [2013.5, 42.0, 55.0, 10, 24.98, 121.54]
+
+
+def make_rows(n, seed=0):
+    rng = random.Random(seed)
+    return [[round(v * rng.uniform(0.9, 1.1), 4) if i != 3 else rng.randint(0, 10)
+             for i, v in enumerate(BASE_ROW)] for _ in range(n)]
+
+
+def build_payload(mix, batch_size):
+    # -> (content_type, body bytes, rows per request)
+    if mix == "single":
+        return "application/json", json.dumps({"data": make_rows(1)}).encode(), 1
+    if mix == "batch":
+        return "application/json", json.dumps({"data": make_rows(batch_size)}).encode(), batch_size
+    if mix == "csv":
+        buf = StringIO()
+        csv.writer(buf).writerows(make_rows(batch_size))
+        return "text/csv", buf.getvalue().encode(), batch_size
+    raise ValueError(f"Unknown payload mix: {mix}")
+
+
+class HttpConnection:
+    # Minimal HTTP/1.1 keep-alive client on asyncio streams. Reconnects when the server closes the
+    # connection (gunicorn's sync workers answer every request with Connection: close).
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+        self.connects = 0
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.connects += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def post(self, path, body, content_type):
+        reused = self.writer is not None
+        if not reused:
+            await self._connect()
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            if reused:  # an idle keep-alive connection was dropped by the server; retry once on a fresh one
+                return await self.post(path, body, content_type)
+            raise ConnectionError("Connection closed before the response")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            payload = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            payload = b"".join(chunks)
+        else:
+            payload = await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close" or status_line.startswith(b"HTTP/1.0"):
+            self.close()
+        return status, payload
+
+
+async def run_mix(url, mix, batch_size, connections, duration, warmup, rate=None):
+    # Closed loop (each connection sends back-to-back) measures peak throughput; with --rate the
+    # connections serve a fixed arrival schedule and latency counts from the intended start.
+    parts = urlsplit(url)
+    path = parts.path or "/invocations"
+    content_type, body, rows = build_payload(mix, batch_size)
+    hist = {"warmup": (LatencyHistogram(), LatencyHistogram()), "steady": (LatencyHistogram(), LatencyHistogram())}
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    steady_start = start + warmup
+    end = steady_start + duration
+    conns = [HttpConnection(parts.hostname, parts.port or 80) for _ in range(connections)]
+
+    async def send(conn, intended):
+        try:
+            status, _ = await conn.post(path, body, content_type)
+            ok = status == 200
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            logger.debug(f"Request failed: {e}")
+            conn.close()
+            ok = False
+        hist["steady" if intended >= steady_start else "warmup"][0 if ok else 1].record(
+            (loop.time() - intended) * 1000)
+
+    async def closed_worker(conn):
+        while loop.time() < end:
+            await send(conn, loop.time())
+
+    async def open_worker(conn, queue):
+        while True:
+            intended = await queue.get()
+            if intended is None:
+                return
+            await send(conn, intended)
+
+    if rate is None:
+        await asyncio.gather(*(closed_worker(c) for c in conns))
+    else:
+        queue = asyncio.Queue()
+        workers = [asyncio.create_task(open_worker(c, queue)) for c in conns]
+        intended = start
+        while intended < end:
+            await asyncio.sleep(max(0.0, intended - loop.time()))
+            queue.put_nowait(intended)
+            intended += 1 / rate
+        for _ in conns:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+    elapsed = loop.time() - steady_start
+
+    for conn in conns:
+        conn.close()
+
+    ok, errors = hist["steady"]
+    completed = ok.total + errors.total
+    return {
+        "mix": mix,
+        "content_type": content_type,
+        "rows_per_request": rows,
+        "payload_bytes": len(body),
+        "connections": connections,
+        "mode": "closed" if rate is None else "open",
+        "target_rate": rate,
+        "requests": completed,
+        "errors": errors.total,
+        "error_rate": errors.total / completed if completed else 0.0,
+        "throughput_rps": ok.total / elapsed if elapsed > 0 else 0.0,
+        "throughput_rows_per_sec": ok.total * rows / elapsed if elapsed > 0 else 0.0,
+        "tcp_connects": sum(c.connects for c in conns),
+        "latency": ok.summary(),
+    }, ok
+
+
+def log_table(results):
+    header = f"{'mix':<8}{'conns':>6}{'req/s':>10}{'rows/s':>11}{'err%':>7}" + \
+             "".join(f"{f'p{q:g}':>9}" for q in PERCENTILES)
+    logger.info(header)
+    for r in results:
+        latency = r["latency"]
+        logger.info(f"{r['mix']:<8}{r['connections']:>6}{r['throughput_rps']:>10.1f}"
+                    f"{r['throughput_rows_per_sec']:>11.1f}{r['error_rate'] * 100:>7.2f}" +
+                    "".join(f"{latency[f'p{q:g}_ms'] or 0:>9.1f}" for q in PERCENTILES))
+
+
+async def main(args):
+    results = []
+    for mix in args.mix:
+        for connections in args.connections:
+            logger.info(f"{mix} x {connections} connection(s) against {args.url}: "
+                        f"warm-up {args.warmup:g}s, steady {args.duration:g}s")
+            result, _ = await run_mix(args.url, mix, args.batch_size, connections, args.duration, args.warmup,
+                                      args.rate)
+            results.append(result)
+    log_table(results)
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"url": args.url, "timestamp": datetime.utcnow().isoformat(), "runs": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP load test against a serving container's /invocations")
+    parser.add_argument("--url", default="http://localhost:8080/invocations")
+    parser.add_argument("--mix", type=lambda s: s.split(","), default=["single", "batch", "csv"],
+                        help="Comma-separated payload mixes: single, batch, csv")
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows per request for batch and csv")
+    parser.add_argument("--connections", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8],
+                        help="Comma-separated concurrent connection counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Steady-state seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Warm-up seconds (not reported)")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate (req/s); closed loop when omitted")
+    parser.add_argument("--output-json", type=str)
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if any(r["requests"] and r["error_rate"] == 1.0 for r in results):
+        logger.error("Every request failed for at least one mix.")
+        exit(1)
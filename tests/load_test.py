@@ -1,72 +1,262 @@
 import boto3
+import csv
 import json
+import math
 import time
+import random
 import argparse
 import logging
+import threading
+from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger()
 
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+class LatencyHistogram:
+    # HDR-style log-linear histogram over integer microseconds: each power-of-two range is split into
+    # `half` linear sub-buckets, so every recorded value keeps ~3 significant digits at constant memory.
+
+    def __init__(self, sub_bucket_bits=11):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.counts = {}
+        self.total = 0
+        self.min_us = None
+        self.max_us = 0
+        self.sum_us = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value_us):
+        bucket = max(0, value_us.bit_length() - self.sub_bucket_bits)
+        return bucket * self.half + (value_us >> bucket)
+
+    def _highest_equivalent(self, index):
+        bucket = max(0, index // self.half - 1)
+        sub = index - bucket * self.half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, latency_ms):
+        value_us = max(0, int(latency_ms * 1000))
+        index = self._index(value_us)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.total += 1
+            self.sum_us += value_us
+            self.max_us = max(self.max_us, value_us)
+            self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, q):
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(q / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "min_ms": self.min_us / 1000 if self.min_us is not None else None,
+            "mean_ms": self.sum_us / self.total / 1000 if self.total else None,
+            "max_ms": self.max_us / 1000 if self.total else None,
+            **{f"p{q:g}_ms": self.percentile(q) for q in PERCENTILES},
+        }
+
+    def distribution(self):
+        # (percentile, latency_ms, cumulative count) rows, like HdrHistogram's percentile output
+        rows, seen = [], 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            rows.append((100 * seen / self.total, min(self._highest_equivalent(index), self.max_us) / 1000, seen))
+        return rows
+
 
 def invoke_lambda(client, func_name, payload):
-    try:
-        start = time.time()
-        response = client.invoke(
-            FunctionName=func_name,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-        latency = (time.time() - start) * 1000
-        status = response['StatusCode']
+    response = client.invoke(
+        FunctionName=func_name,
+        InvocationType='RequestResponse',
+        Payload=json.dumps(payload)
+    )
+    payload_resp = json.loads(response['Payload'].read())
+    return response['StatusCode'] == 200 and "errorMessage" not in payload_resp
 
-        payload_resp = json.loads(response['Payload'].read())
-        if "errorMessage" in payload_resp:
-            status = 500
 
-        return status, latency
-    except Exception as e:
-        logger.error(f"Error: {e}")
-        return 500, 0
+def run_open_loop(send, rate, duration, warmup, max_in_flight, arrival="constant"):
+    # Requests are issued on a fixed schedule whatever the response times are. Latency is measured from
+    # each request's intended start, so time spent queued behind slow calls counts (no coordinated omission).
+    phases = {"warmup": (LatencyHistogram(), LatencyHistogram()), "steady": (LatencyHistogram(), LatencyHistogram())}
+    rng = random.Random(0)
 
+    def fire(intended, phase):
+        try:
+            ok = send()
+        except Exception as e:
+            logger.debug(f"Request failed: {e}")
+            ok = False
+        latency = (time.perf_counter() - intended) * 1000
+        phases[phase][0 if ok else 1].record(latency)
 
-def run_load_test(func_name, total_requests=100, concurrency=10):
-    logger.info(f"Starting load test on {func_name}. Requests: {total_requests}, Concurrency: {concurrency}")
+    start = time.perf_counter()
+    steady_start = start + warmup
+    end = steady_start + duration
+    intended = start
+    issued = 0
 
-    client = boto3.client("lambda", region_name="eu-north-1")
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        while intended < end:
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, intended, "steady" if intended >= steady_start else "warmup")
+            issued += 1
+            intended += rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+        lag_ms = max(0.0, (time.perf_counter() - end) * 1000)
+    elapsed = time.perf_counter() - steady_start
 
-    payload = {"data": [[2013.5, 42.0, 55.0, 10, 24.98, 121.54]]}
+    ok, errors = phases["steady"]
+    completed = ok.total + errors.total
+    return {
+        "target_rate": rate,
+        "achieved_rate": completed / elapsed if elapsed > 0 else 0.0,
+        "goodput_rate": ok.total / elapsed if elapsed > 0 else 0.0,
+        "arrival": arrival,
+        "warmup_seconds": warmup,
+        "steady_seconds": duration,
+        "issued": issued,
+        "warmup_requests": phases["warmup"][0].total + phases["warmup"][1].total,
+        "requests": completed,
+        "errors": errors.total,
+        "error_rate": errors.total / completed if completed else 0.0,
+        "scheduler_lag_ms": lag_ms,
+        "latency": ok.summary(),
+        "error_latency": errors.summary(),
+    }, ok
 
-    success_count = 0
-    error_count = 0
-    latencies = []
 
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        futures = [executor.submit(invoke_lambda, client, func_name, payload) for _ in range(total_requests)]
+def evaluate_thresholds(result, args):
+    failures = []
+    latency = result["latency"]
+    for name, limit in (("p50_ms", args.max_p50_ms), ("p99_ms", args.max_p99_ms), ("p99.9_ms", args.max_p999_ms)):
+        if limit is not None and (latency[name] is None or latency[name] > limit):
+            failures.append(f"{name} {latency[name]} > {limit}")
+    if result["error_rate"] > args.max_error_rate:
+        failures.append(f"error_rate {result['error_rate']:.4f} > {args.max_error_rate}")
+    if result["achieved_rate"] < args.min_rate_ratio * result["target_rate"]:
+        failures.append(f"achieved {result['achieved_rate']:.1f} rps < {args.min_rate_ratio:g} x target")
+    return failures
 
-        for future in futures:
-            status, latency = future.result()
-            latencies.append(latency)
-            if status == 200:
-                success_count += 1
-            else:
-                error_count += 1
 
-    avg_latency = sum(latencies) / len(latencies) if latencies else 0
-    max_latency = max(latencies) if latencies else 0
+def write_csv(path, results, histograms):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["target_rate", "percentile", "latency_ms", "cumulative_count"])
+        for result, histogram in zip(results, histograms):
+            for percentile, latency_ms, count in histogram.distribution():
+                writer.writerow([result["target_rate"], f"{percentile:.4f}", f"{latency_ms:.3f}", count])
 
-    logger.info(f"Test finished.")
-    logger.info(f"Success: {success_count}, Errors: {error_count}")
-    logger.info(f"Avg Latency: {avg_latency:.2f}ms, Max Latency: {max_latency:.2f}ms")
 
-    if error_count > 0:
-        logger.error("Load test failed due to errors.")
-        exit(1)
+def log_result(result, failures):
+    latency = result["latency"]
+    logger.info(f"Rate {result['target_rate']:g} rps -> achieved {result['achieved_rate']:.1f} rps, "
+                f"{result['requests']} requests, errors {result['errors']} ({result['error_rate']:.2%})")
+    if latency["count"]:
+        logger.info("Latency ms: " + ", ".join(f"p{q:g}={latency[f'p{q:g}_ms']:.1f}" for q in PERCENTILES)
+                    + f", max={latency['max_ms']:.1f}")
+    logger.info("PASS" if not failures else f"FAIL: {'; '.join(failures)}")
+
+
+def run_rates(send, args, target):
+    # Each rate is a separate warm-up + steady run; stepping stops at the first failing rate
+    results, histograms = [], []
+    for rate in args.rate:
+        logger.info(f"Open-loop load on {target}: {rate:g} rps, {args.arrival} arrivals, "
+                    f"warm-up {args.warmup:g}s, steady {args.duration:g}s")
+        result, histogram = run_open_loop(send, rate, args.duration, args.warmup, args.max_in_flight, args.arrival)
+        result["failures"] = evaluate_thresholds(result, args)
+        result["passed"] = not result["failures"]
+        log_result(result, result["failures"])
+        results.append(result)
+        histograms.append(histogram)
+        if not result["passed"]:
+            break
+    return results, histograms
+
+
+def write_outputs(results, histograms, args, target):
+    report = {"target": target, "timestamp": datetime.utcnow().isoformat(), "runs": results}
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.output_csv:
+        write_csv(args.output_csv, results, histograms)
+
+    passing = [r for r in results if r["passed"]]
+    if args.capacity_output and passing:
+        # Consumed by deploy_lambda/autoscaling.py to derive the target-tracking value
+        best = max(passing, key=lambda r: r["goodput_rate"])
+        with open(args.capacity_output, "w") as f:
+            json.dump({
+                "instance_type": args.instance_type,
+                "instances": args.instances,
+                "sustainable_rps_per_instance": best["goodput_rate"] / args.instances,
+                "p99_ms": best["latency"]["p99_ms"],
+                "error_rate": best["error_rate"],
+                "measured_at": report["timestamp"],
+            }, f, indent=2)
+        logger.info(f"Sustainable rate {best['goodput_rate']:.1f} rps written to {args.capacity_output}")
+
+    # A stepped run is expected to end on a failing rate; it only fails when no rate held
+    return bool(passing) if len(args.rate) > 1 else results[0]["passed"]
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--rate", type=lambda s: [float(r) for r in s.split(",")], default=[10.0],
+                        help="Target arrival rate(s) in requests/sec; comma-separated to step up until one fails")
+    parser.add_argument("--duration", type=float, default=30.0, help="Steady-state seconds per rate")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Warm-up seconds (not reported)")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="constant")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--max-p50-ms", type=float)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-p999-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--min-rate-ratio", type=float, default=0.95,
+                        help="Fail when the achieved rate is below this share of the target")
+    parser.add_argument("--output-json", type=str)
+    parser.add_argument("--output-csv", type=str)
+    parser.add_argument("--capacity-output", type=str,
+                        help="Write the highest passing rate as a capacity measurement for endpoint autoscaling")
+    parser.add_argument("--instance-type", type=str, default="ml.m5.large")
+    parser.add_argument("--instances", type=int, default=1, help="Instances behind the target during the test")
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(description="Open-loop load test against the inference Lambda")
     parser.add_argument("--function-name", required=True)
+    add_common_arguments(parser)
     args = parser.parse_args()
 
-    run_load_test(args.function_name)
\ No newline at end of file
+    client = boto3.client("lambda", region_name="eu-north-1")
+    payload = {"data": [[2013.5, 42.0, 55.0, 10, 24.98, 121.54]]}
+
+    results, histograms = run_rates(lambda: invoke_lambda(client, args.function_name, payload), args,
+                                    args.function_name)
+    if not write_outputs(results, histograms, args, args.function_name):
+        logger.error("Load test failed thresholds.")
+        exit(1)
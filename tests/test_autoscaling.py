@@ -0,0 +1,82 @@
+import json
+
+import boto3
+import pytest
+
+import autoscaling
+
+ENDPOINT = "real-estate-endpoint-test"
+RESOURCE_ID = f"endpoint/{ENDPOINT}/variant/AllTraffic"
+CAPACITY_URI = "s3://target-bucket-test/capacity/endpoint_capacity.json"
+
+
+@pytest.fixture
+def s3(dynamodb, monkeypatch):
+    client = boto3.client("s3")
+    client.create_bucket(Bucket="target-bucket-test", CreateBucketConfiguration={"LocationConstraint": "eu-north-1"})
+    for name, value in {"CAPACITY_URI": CAPACITY_URI, "INSTANCE_TYPE": "ml.m5.large",
+                        "AUTOSCALING_TARGET_UTILIZATION": "0.5", "AUTOSCALING_MIN_CAPACITY": "2",
+                        "AUTOSCALING_MAX_CAPACITY": "1"}.items():
+        monkeypatch.setenv(name, value)
+    return client
+
+
+def put_capacity(s3, **capacity):
+    s3.put_object(Bucket="target-bucket-test", Key="capacity/endpoint_capacity.json", Body=json.dumps(capacity))
+
+
+def test_scaling_settings_use_the_measured_capacity(s3):
+    put_capacity(s3, instance_type="ml.m5.large", sustainable_rps_per_instance=40.0, measured_at="2026-10-01")
+    settings = autoscaling.scaling_settings(s3)
+    # 40 RPS at 50% utilization, as invocations per minute
+    assert (settings["target_value"], settings["source"]) == (1200.0, "measured 2026-10-01")
+    assert (settings["min_capacity"], settings["max_capacity"]) == (2, 2)
+
+
+def test_scaling_settings_fall_back_without_a_usable_measurement(s3):
+    assert autoscaling.scaling_settings(s3)["source"] == "fallback"  # nothing measured yet
+
+    put_capacity(s3, instance_type="ml.c5.xlarge", sustainable_rps_per_instance=40.0)
+    settings = autoscaling.scaling_settings(s3)
+    assert (settings["rps_per_instance"], settings["target_value"]) == (5.0, 150.0)
+
+
+def test_register_and_deregister(application_autoscaling):
+    settings = {"min_capacity": 1, "max_capacity": 4, "target_value": 150.0, "scale_in_cooldown": 300,
+                "scale_out_cooldown": 60, "source": "fallback"}
+    assert not autoscaling.is_registered(application_autoscaling, ENDPOINT)
+
+    autoscaling.register(application_autoscaling, ENDPOINT, settings)
+    assert autoscaling.is_registered(application_autoscaling, ENDPOINT)
+    policy = application_autoscaling.policies[RESOURCE_ID]["TargetTrackingScalingPolicyConfiguration"]
+    assert policy["TargetValue"] == 150.0
+
+    autoscaling.deregister(application_autoscaling, ENDPOINT)
+    assert not autoscaling.is_registered(application_autoscaling, ENDPOINT)
+    assert RESOURCE_ID not in application_autoscaling.policies
+    # Already gone (e.g. suspended by an earlier, interrupted update) is not an error
+    autoscaling.deregister(application_autoscaling, ENDPOINT)
+
+
+def test_deployment_suspends_autoscaling_around_the_update(load_lambda, sagemaker, application_autoscaling):
+    deploy_lambda = load_lambda("deploy_lambda")
+    deploy_lambda.sm, deploy_lambda.aas = sagemaker, application_autoscaling
+    sagemaker.serve(ENDPOINT, "config-old")
+    event = {"endpoint_name": ENDPOINT, "role_arn": "arn:aws:iam::123456789012:role/SageMakerExecutionRole-test"}
+
+    # Health check on an endpoint without a scalable target (e.g. after a manual rollback)
+    assert deploy_lambda.lambda_handler(event, None)["action"] == "autoscaling_restored"
+    assert autoscaling.is_registered(application_autoscaling, ENDPOINT)
+
+    # UpdateEndpoint is rejected while the variant is a scalable target
+    update_endpoint = sagemaker.update_endpoint
+    registered_during_update = []
+    sagemaker.update_endpoint = lambda **params: (
+        registered_during_update.append(autoscaling.is_registered(application_autoscaling, ENDPOINT)),
+        update_endpoint(**params))
+    deploy_lambda.lambda_handler(dict(event, model_package_arn="arn:package/2"), None)
+    assert registered_during_update == [False]
+
+    sagemaker.settle(ENDPOINT)
+    assert deploy_lambda.lambda_handler(event, None)["status"] == "deployed"
+    assert autoscaling.is_registered(application_autoscaling, ENDPOINT)
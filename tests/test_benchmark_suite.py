@@ -0,0 +1,36 @@
+import pytest
+
+from suite import Context, build_cases, compare, measure, parse_overrides
+
+BASELINE = {"results": {"fast": {"median_s": 1.0}, "slow": {"median_s": 1.0}, "same": {"median_s": 1.0},
+                        "gone": {"median_s": 1.0}}}
+
+
+def test_compare_flags_cases_beyond_their_tolerance():
+    results = {"fast": {"median_s": 0.5}, "slow": {"median_s": 1.3}, "same": {"median_s": 1.1},
+               "added": {"median_s": 1.0}}
+    rows = {name: status for name, _, status in compare(results, BASELINE, 0.15, {})}
+    assert rows == {"fast": "faster", "slow": "REGRESSION", "same": "ok", "added": "new", "gone": "missing"}
+
+    rows = compare(results, BASELINE, 0.15, parse_overrides(["slow=0.5"]), report_missing=False)
+    assert {name: status for name, _, status in rows}["slow"] == "ok"
+    assert "gone" not in [name for name, _, _ in rows]
+
+
+def test_measure_loops_fast_calls_up_to_the_minimum_time():
+    calls = []
+    samples, loops = measure(lambda: calls.append(1), repeat=3, min_time=0.01)
+    assert len(samples) == 3
+    assert loops > 1
+    # Every sample is one batch of `loops` calls, timed per call
+    assert len(calls) > 3 * loops
+    assert all(0 < sample < 0.01 for sample in samples)
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_every_case_runs_on_a_small_context():
+    cases = build_cases(Context(seed=0, batch_rows=20, record_sizes=[100]))
+    assert {group for group, _, _ in cases.values()} >= {"serving", "scoring", "parsing", "monitoring", "drift"}
+    for name, (_, items, setup) in cases.items():
+        assert items > 0, name
+        setup()()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from champion import SEGMENTS, cached_predictions, dataset_fingerprint, rmse, segment_rmse
+from feature_schema import FEATURE_COLUMNS
+
+
+class CountingModel:
+    def __init__(self):
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self
+
+    def predict(self, X):
+        return X["X2 house age"].to_numpy() * 2
+
+
+@pytest.fixture
+def test_set():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 50, size=(300, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    X["X3 distance to the nearest MRT station"] *= 100
+    X["X4 number of convenience stores"] = rng.integers(0, 10, len(X))
+    return X, pd.Series(rng.uniform(10, 60, len(X)))
+
+
+def test_champion_predictions_are_cached_per_version_and_test_set(tmp_path, test_set):
+    X, y = test_set
+    model = CountingModel()
+    fingerprint = dataset_fingerprint(X, y)
+
+    preds, hit = cached_predictions(str(tmp_path), 3, fingerprint, model.load, X)
+    assert (hit, model.loads) == (False, 1)
+    cached, hit = cached_predictions(str(tmp_path), 3, fingerprint, model.load, X)
+    assert (hit, model.loads) == (True, 1)
+    np.testing.assert_array_equal(cached, preds)
+
+    # Another model version or a changed test set is scored again
+    assert cached_predictions(str(tmp_path), 4, fingerprint, model.load, X)[1] is False
+    changed = dataset_fingerprint(X, y + 1)
+    assert changed != fingerprint
+    assert cached_predictions(str(tmp_path), 3, changed, model.load, X)[1] is False
+    assert model.loads == 3
+
+
+def test_segment_rmse_matches_per_segment_groupby(test_set):
+    X, y = test_set
+    preds = CountingModel().predict(X)
+    report = segment_rmse(X, y, {"challenger": preds})
+
+    column, edges, labels = SEGMENTS["mrt_distance"]
+    segment = pd.cut(X[column], [-np.inf] + edges[1:] + [np.inf], right=False, labels=labels)
+    for label, rows in X.groupby(segment, observed=False).groups.items():
+        expected = report["mrt_distance"][label]
+        assert expected["n"] == len(rows)
+        if len(rows):
+            assert expected["challenger_rmse"] == pytest.approx(rmse(y[rows], preds[X.index.get_indexer(rows)]))
+        else:
+            assert expected["challenger_rmse"] is None
@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+from codec import SMALL_BATCH, decode_request, encode_predictions
+from feature_schema import DECODER
+
+ROW = [2013.5, 42.0, 55.0, 10, 24.98, 121.54]
+
+
+def rows(n):
+    return [[v + i * 0.001 if j != 3 else v for j, v in enumerate(ROW)] for i in range(n)]
+
+
+@pytest.mark.parametrize("n", [1, SMALL_BATCH, SMALL_BATCH + 1, 200])
+def test_fast_path_matches_the_general_decoder(n):
+    for body, content_type in ((json.dumps({"data": rows(n)}), "application/json"),
+                               (json.dumps(rows(n)), "application/json"),
+                               ("\n".join(",".join(map(str, r)) for r in rows(n)) + "\n", "text/csv")):
+        X = decode_request(body.encode(), content_type)
+        np.testing.assert_array_equal(X, DECODER.decode(body, content_type))
+        assert X.dtype == np.float64 and X.shape == (n, len(ROW))
+
+    np.testing.assert_array_equal(decode_request(json.dumps(ROW), "application/json"), [ROW])
+
+
+@pytest.mark.parametrize("payload", [
+    {"data": [ROW[:5]]},
+    {"data": [[*ROW[:2], -5, *ROW[3:]]]},
+    {"data": [[*ROW[:5], None]]},
+])
+def test_rejected_small_payloads_get_the_decoders_error(payload):
+    with pytest.raises(ValueError) as fast:
+        decode_request(json.dumps(payload), "application/json")
+    with pytest.raises(ValueError) as general:
+        DECODER.decode(json.dumps(payload), "application/json")
+    assert str(fast.value) == str(general.value)
+
+    with pytest.raises(ValueError, match="Unsupported content type"):
+        decode_request("<xml/>", "application/xml")
+
+
+@pytest.mark.parametrize("prediction", [
+    np.array([41.25, 38.0, 1e-7, 123456789.5]),
+    np.array([1, 2, 3]),
+    np.array([np.nan, 1.0]),
+    np.array([[1.5], [2.5]]),
+    np.array([], dtype=np.float64),
+    [40.5],
+])
+def test_encoded_predictions_match_json_dumps(prediction):
+    encoded = encode_predictions(prediction)
+    assert encoded == json.dumps({"predictions": np.asarray(prediction).tolist()})
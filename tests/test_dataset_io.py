@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from dataset_io import SCHEMA_METADATA_KEY, load_shards, read_dataset, read_schema, write_dataset
+from feature_schema import COLUMN_DTYPES, FEATURE_COLUMNS, TARGET
+
+
+def frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(1, 100, size=(n, len(FEATURE_COLUMNS) + 1)), columns=FEATURE_COLUMNS + [TARGET])
+    df["X4 number of convenience stores"] = rng.integers(0, 10, n)
+    return df
+
+
+def test_parquet_round_trip_keeps_schema_and_dtypes(tmp_path):
+    path = write_dataset(frame(50), str(tmp_path / "part-00000"))
+
+    schema = read_schema(path)
+    assert (schema["feature_columns"], schema["target"]) == (FEATURE_COLUMNS, TARGET)
+    df = read_dataset(path)
+    assert {c: str(t) for c, t in df.dtypes.items()} == COLUMN_DTYPES
+
+
+def test_csv_shards_parse_into_the_storage_dtypes(tmp_path):
+    files = [write_dataset(frame(20, seed), str(tmp_path / f"part-{seed:05d}"), "csv") for seed in range(3)]
+    df, stats = load_shards(files)
+    assert (len(df), stats["load_files"]) == (60, 3)
+    assert {c: str(t) for c, t in df.dtypes.items()} == COLUMN_DTYPES
+
+
+def test_shards_with_different_dtypes_are_rejected(tmp_path):
+    good = write_dataset(frame(10), str(tmp_path / "part-00000"))
+    # Same embedded schema, but the target was written as float64
+    table = pq.read_table(good)
+    bad = table.set_column(table.schema.get_field_index(TARGET), TARGET,
+                           table.column(TARGET).cast(pa.float64()))
+    pq.write_table(bad, str(tmp_path / "part-00001.parquet"))
+
+    with pytest.raises(ValueError, match="does not match"):
+        load_shards([good, str(tmp_path / "part-00001.parquet")])
+
+
+def test_parquet_from_another_feature_set_is_rejected(tmp_path):
+    path = write_dataset(frame(10), str(tmp_path / "part-00000"))
+    table = pq.read_table(path)
+    schema = dict(read_schema(path), feature_columns=FEATURE_COLUMNS[:-1])
+    metadata = {**table.schema.metadata, SCHEMA_METADATA_KEY: json.dumps(schema).encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+    with pytest.raises(ValueError, match="feature columns"):
+        read_dataset(path)
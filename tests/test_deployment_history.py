@@ -0,0 +1,109 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import deployment_history
+import deployment_state
+from deployment_history import LATEST, DeploymentHistory
+
+ENDPOINT = "real-estate-endpoint-test"
+
+
+@pytest.fixture
+def history(dynamodb, monkeypatch):
+    # One second per call, so deployed_at orders the records as they were made
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(deployment_history, "time", SimpleNamespace(time=lambda: next(clock)))
+    return DeploymentHistory()
+
+
+def deploy(history, config_name, settle_on=None):
+    history.record_deployment(ENDPOINT, config_name, f"model-{config_name}", f"arn:package/{config_name}",
+                              "deploy", metrics={"rmse": 7.31, "champion_rmse": None})
+    return history.reconcile(ENDPOINT, settle_on or config_name, "InService")
+
+
+def test_reconcile_moves_latest_and_marks_failed_deployments(history):
+    assert deploy(history, "config-1") == "in_service"
+    assert deploy(history, "config-2") == "in_service"
+    assert deploy(history, "config-3", settle_on="config-2") == "rolled_back"
+
+    latest = history.latest(ENDPOINT)
+    assert (latest["current_config"], latest["previous_config"]) == ("config-2", "config-1")
+    assert "pending_config" not in latest
+
+    assert history.get(ENDPOINT, "config-2")["status"] == "in_service"
+    assert history.get(ENDPOINT, "config-3")["status"] == "rolled_back"
+    # None metrics are dropped, floats are stored as numbers
+    assert history.get(ENDPOINT, "config-3")["metrics"] == {"rmse": deployment_history.Decimal("7.31")}
+
+    assert [item["config_name"] for item in history.history(ENDPOINT)] == ["config-3", "config-2", "config-1"]
+    # #LATEST / #OPERATION carry no deployed_at, so they never show up in the time index
+    assert LATEST not in [item["config_name"] for item in history.uncleaned(ENDPOINT)]
+
+
+def test_rollback_target_while_deployment_is_unconfirmed(history):
+    deploy(history, "config-1")
+    deploy(history, "config-2")
+    history.record_deployment(ENDPOINT, "config-3", "model-3", "arn:package/config-3", "deploy")
+
+    # Serving config-3 before the health check confirmed it: the last good one is the current config
+    assert history.rollback_target(ENDPOINT, "config-3") == "config-2"
+    assert history.rollback_target(ENDPOINT, "config-2") == "config-1"
+
+
+def test_rollback_lambda_walks_back_through_latest(history, load_lambda, sagemaker, application_autoscaling):
+    for config_name in ("config-1", "config-2", "config-3"):
+        deploy(history, config_name)
+    sagemaker.serve(ENDPOINT, "config-3")
+
+    rollback = load_lambda("rollback_lambda")
+    rollback.sm, rollback.aas = sagemaker, application_autoscaling
+
+    rollback.lambda_handler({"endpoint_name": ENDPOINT}, None)
+    assert sagemaker.called("UpdateEndpoint")[-1]["EndpointConfigName"] == "config-2"
+    latest = history.latest(ENDPOINT)
+    assert (latest["current_config"], latest["previous_config"]) == ("config-2", "config-1")
+    assert history.get(ENDPOINT, "config-3")["status"] == "rolled_back"
+
+    sagemaker.settle(ENDPOINT)
+    rollback.lambda_handler({"endpoint_name": ENDPOINT}, None)
+    assert sagemaker.called("UpdateEndpoint")[-1]["EndpointConfigName"] == "config-1"
+
+    sagemaker.settle(ENDPOINT)
+    with pytest.raises(Exception, match="No previous good configuration"):
+        rollback.lambda_handler({"endpoint_name": ENDPOINT}, None)
+
+
+def test_rollback_stops_at_configs_the_cleanup_deleted(history, load_lambda, sagemaker, application_autoscaling,
+                                                        monkeypatch):
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(deployment_state, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    health_check = {"endpoint_name": ENDPOINT, "role_arn": "arn:aws:iam::123456789012:role/SageMakerRole"}
+    history.record_deployment(ENDPOINT, "config-old", "model-old", "arn:package/old", "create")
+    history.reconcile(ENDPOINT, "config-old", "InService")
+    sagemaker.serve(ENDPOINT, "config-old")
+
+    deploy_lambda = load_lambda("deploy_lambda")
+    deploy_lambda.sm, deploy_lambda.aas = sagemaker, application_autoscaling
+    for version in (1, 2, 3):
+        deploy_lambda.lambda_handler(dict(health_check, model_package_arn=f"arn:package/{version}"), None)
+        sagemaker.settle(ENDPOINT)
+        assert deploy_lambda.lambda_handler(health_check, None)["status"] == "deployed"
+
+    # Cleanup kept the current and previous configs only
+    latest = history.latest(ENDPOINT)
+    assert set(sagemaker.configs) == {latest["current_config"], latest["previous_config"]}
+
+    rollback = load_lambda("rollback_lambda")
+    rollback.sm, rollback.aas = sagemaker, application_autoscaling
+    rollback.lambda_handler({"endpoint_name": ENDPOINT}, None)
+    assert sagemaker.called("UpdateEndpoint")[-1]["EndpointConfigName"] == latest["previous_config"]
+    assert "previous_config" not in history.latest(ENDPOINT)
+
+    sagemaker.settle(ENDPOINT)
+    deregistered = len(application_autoscaling.called("DeregisterScalableTarget"))
+    with pytest.raises(Exception, match="No previous good configuration"):
+        rollback.lambda_handler({"endpoint_name": ENDPOINT}, None)
+    assert len(application_autoscaling.called("DeregisterScalableTarget")) == deregistered
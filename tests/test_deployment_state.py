@@ -0,0 +1,103 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from deployment_history import DeploymentHistory
+from deployment_state import MAX_PHASE_ATTEMPTS
+
+ENDPOINT = "real-estate-endpoint-test"
+ROLE_ARN = "arn:aws:iam::123456789012:role/SageMakerExecutionRole-test"
+PACKAGE_ARN = "arn:aws:sagemaker:eu-north-1:123456789012:model-package/realestatemodelgroup-test/2"
+HEALTH_CHECK = {"endpoint_name": ENDPOINT, "role_arn": ROLE_ARN}
+DEPLOY = dict(HEALTH_CHECK, model_package_arn=PACKAGE_ARN, rmse=7.31, latency_p99_ms=1.2)
+
+
+def throttled(method, times):
+    calls = []
+
+    def call(**params):
+        calls.append(params)
+        if len(calls) <= times:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "Call")
+        return method(**params)
+    return call
+
+
+@pytest.fixture
+def deploy_lambda(load_lambda, sagemaker, application_autoscaling):
+    # An endpoint serving config-old, as recorded by an earlier deployment
+    history = DeploymentHistory()
+    history.record_deployment(ENDPOINT, "config-old", "model-old", "arn:package/1", "create")
+    history.reconcile(ENDPOINT, "config-old", "InService")
+    sagemaker.serve(ENDPOINT, "config-old")
+
+    handler = load_lambda("deploy_lambda")
+    handler.sm, handler.aas = sagemaker, application_autoscaling
+    return handler
+
+
+def test_update_is_resumed_from_dynamodb(deploy_lambda, sagemaker, application_autoscaling):
+    sagemaker.update_endpoint = throttled(sagemaker.update_endpoint, times=1)
+
+    result = deploy_lambda.lambda_handler(DEPLOY, None)
+    assert (result["status"], result["phase"]) == ("in_progress", "UPDATE_ENDPOINT")
+    assert "ThrottlingException" in result["error"]
+
+    # The retry runs from the state read back from DynamoDB; the stub validates it like botocore would
+    result = deploy_lambda.lambda_handler(HEALTH_CHECK, None)
+    assert (result["status"], result["phase"]) == ("in_progress", "WAIT_IN_SERVICE")
+    update = sagemaker.called("UpdateEndpoint")[-1]
+    routing = update["DeploymentConfig"]["BlueGreenUpdatePolicy"]["TrafficRoutingConfiguration"]
+    assert type(routing["WaitIntervalInSeconds"]) is int
+
+    # Every invocation returns instead of waiting for SageMaker
+    assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["phase"] == "WAIT_IN_SERVICE"
+
+    sagemaker.settle(ENDPOINT)
+    result = deploy_lambda.lambda_handler(HEALTH_CHECK, None)
+    assert result["status"] == "deployed"
+    assert result["config"] == update["EndpointConfigName"]
+
+    operation = deploy_lambda.history.get_operation(ENDPOINT)
+    assert (operation["phase"], operation["invocations"], operation["attempts"]) == ("DONE", 4, 0)
+    assert "last_error" not in operation and "lease_owner" not in operation
+    latest = deploy_lambda.history.latest(ENDPOINT)
+    assert (latest["current_config"], latest["previous_config"]) == (result["config"], "config-old")
+    assert application_autoscaling.targets
+
+
+def test_failing_phase_ends_in_failed(deploy_lambda, sagemaker):
+    create_model = sagemaker.create_model
+    sagemaker.create_model = throttled(create_model, times=MAX_PHASE_ATTEMPTS)
+
+    assert deploy_lambda.lambda_handler(DEPLOY, None)["status"] == "in_progress"
+    for _ in range(MAX_PHASE_ATTEMPTS - 2):
+        assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["status"] == "in_progress"
+    result = deploy_lambda.lambda_handler(HEALTH_CHECK, None)
+    assert result["status"] == "failed"
+    assert "ThrottlingException" in result["error"]
+
+    operation = deploy_lambda.history.get_operation(ENDPOINT)
+    assert operation["phase"] == "FAILED"
+    # No stray record for a config that was never created
+    assert deploy_lambda.history.get(ENDPOINT, operation["target_config"]) is None
+
+    # A failed deployment no longer blocks the next one
+    sagemaker.create_model = create_model
+    assert deploy_lambda.lambda_handler(DEPLOY, None)["phase"] == "WAIT_IN_SERVICE"
+
+
+def test_lease_keeps_invocations_apart(deploy_lambda, sagemaker):
+    assert deploy_lambda.lambda_handler(DEPLOY, None)["phase"] == "WAIT_IN_SERVICE"
+
+    history = deploy_lambda.history
+    operation = history.get_operation(ENDPOINT)
+    assert history.acquire_lease(operation, "other-invocation", 60)
+    assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["action"] == "locked"
+
+    with pytest.raises(RuntimeError, match="still in progress"):
+        deploy_lambda.lambda_handler(dict(DEPLOY, model_package_arn=PACKAGE_ARN.replace("/2", "/3")), None)
+
+    # A lease that ran out (crashed invocation) can be taken over
+    history.acquire_lease(operation, "other-invocation", -1)
+    sagemaker.settle(ENDPOINT)
+    assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["status"] == "deployed"
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from drift_history import DATASET_FEATURE, DriftHistory, rows_from_report
+
+REPORT = {"metrics": [
+    {"result": {"dataset_drift": True, "share_of_drifted_columns": 0.5, "number_of_drifted_columns": 1,
+                "number_of_columns": 2}},
+    {"result": {"drift_by_columns": {
+        "area": {"drift_score": 0.02, "drift_detected": True, "stattest_threshold": 0.05},
+        "rooms": {"drift_score": 0.4, "drift_detected": False, "stattest_threshold": 0.05}}}},
+]}
+
+
+@pytest.fixture
+def history(tmp_path):
+    with DriftHistory(str(tmp_path / "drift_history.sqlite")) as history:
+        yield history
+
+
+def test_rows_from_report_flattens_drift_and_current_stats():
+    current = pd.DataFrame({"area": [50.0, 70.0, 90.0], "rooms": [1, 2, "?"]})
+    rows = {(feature, statistic): value for feature, statistic, value in rows_from_report(REPORT, current)}
+
+    assert rows[(DATASET_FEATURE, "dataset_drift")] == 1.0
+    assert rows[("area", "drift_score")] == 0.02
+    assert rows[(DATASET_FEATURE, "row_count")] == 3.0
+    assert rows[("area", "current_mean")] == 70.0
+    # Non-numeric values are ignored, not fatal
+    assert rows[("rooms", "current_max")] == 2.0
+
+
+def test_rerun_of_a_day_replaces_all_its_rows(history):
+    assert history.append("2024-05-01", rows_from_report(REPORT)) == 10
+    history.append("2024-05-02", [("area", "drift_score", 0.03)])
+
+    # The rerun dropped "rooms" and the dataset metrics; none of the first run's rows may survive
+    history.append("2024-05-01", [("area", "drift_score", 0.01)])
+    assert history.conn.execute("SELECT COUNT(*) FROM drift_history WHERE date = '2024-05-01'").fetchone()[0] == 1
+    assert history.trend("rooms") == []
+    assert history.trend("area") == [("2024-05-01", 0.01), ("2024-05-02", 0.03)]
+
+
+def test_trend_summary_and_exceedances_use_the_window(history):
+    for day, score in (("2024-05-01", 0.1), ("2024-05-02", 0.3), ("2024-05-03", 0.6)):
+        history.append(day, [("area", "drift_score", score), ("rooms", "drift_score", score / 2)])
+
+    assert history.latest_date() == "2024-05-03"
+    assert history.trend("area", days=2) == [("2024-05-02", 0.3), ("2024-05-03", 0.6)]
+    summary = history.summary("area", days=2)
+    assert (summary["count"], summary["first"], summary["last"], summary["max"]) == (2, 0.3, 0.6, 0.6)
+
+    assert history.exceedances("drift_score", 0.25) == [("2024-05-02", "area", 0.3), ("2024-05-03", "area", 0.6),
+                                                        ("2024-05-03", "rooms", 0.3)]
+    assert history.exceedances("drift_score", 0.25, feature="rooms") == [("2024-05-03", "rooms", 0.3)]
+    assert history.exceedances("drift_score", 0.25, end="2024-05-02", days=1) == [("2024-05-02", "area", 0.3)]
@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+from feature_schema import DECODER, FEATURE_COLUMNS, first_row
+
+ROW = [2013.5, 42.0, 55.0, 10, 24.98, 121.54]
+
+
+@pytest.mark.parametrize("payload", [
+    {"data": [ROW, ROW]},
+    {"instances": [ROW, ROW]},
+    [ROW, ROW],
+    [dict(zip(FEATURE_COLUMNS, ROW)), dict(zip(FEATURE_COLUMNS, ROW))],
+])
+def test_json_payload_shapes_decode_to_one_array(payload):
+    X = DECODER.decode(json.dumps(payload).encode(), "application/json")
+    assert X.dtype == np.float64 and X.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(X, [ROW, ROW])
+
+
+def test_single_rows_and_csv_with_or_without_header():
+    np.testing.assert_array_equal(DECODER.decode(json.dumps(ROW), "application/json"), [ROW])
+    np.testing.assert_array_equal(DECODER.decode(json.dumps(dict(zip(FEATURE_COLUMNS, ROW))), "application/json"),
+                                  [ROW])
+    csv = "\n".join([",".join(map(str, ROW))] * 3)
+    np.testing.assert_array_equal(DECODER.decode(csv, "text/csv"), [ROW] * 3)
+    header = ",".join(FEATURE_COLUMNS) + "\n"
+    np.testing.assert_array_equal(DECODER.decode(header + csv, "text/csv"), [ROW] * 3)
+
+
+@pytest.mark.parametrize("body, content_type, message", [
+    (json.dumps({"data": [ROW[:5]]}), "application/json", "6 features"),
+    (json.dumps({"data": [ROW, ROW[:5]]}), "application/json", "6 values"),
+    (json.dumps({"data": [[*ROW[:2], -5, *ROW[3:]]]}), "application/json", "X3 distance"),
+    (json.dumps({"data": [[*ROW[:5], "NaN"]]}), "application/json", "X6 longitude"),
+    (json.dumps([{FEATURE_COLUMNS[0]: 2013.5}]), "application/json", "Missing features"),
+    (json.dumps({"data": []}), "application/json", "6 features"),
+    ("1,2,3\n", "text/csv", "6 features"),
+    ("2013.5,42,abc,10,24.98,121.54\n", "text/csv", "numeric"),
+    ("", "text/csv", "No feature rows"),
+    ("<xml/>", "application/xml", "Unsupported content type"),
+])
+def test_malformed_payloads_raise_value_error(body, content_type, message):
+    with pytest.raises(ValueError, match=message):
+        DECODER.decode(body, content_type)
+
+
+def test_first_row_of_every_logged_shape():
+    assert first_row({"data": [ROW, ROW]}) == ROW
+    assert first_row([ROW]) == ROW
+    assert first_row(ROW) == ROW
+    assert first_row({"other": 1}) is None
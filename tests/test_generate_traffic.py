@@ -0,0 +1,70 @@
+import os
+import json
+import random
+import argparse
+import importlib.util
+
+import pytest
+
+# A top-level script rather than a module on the import path
+spec = importlib.util.spec_from_file_location(
+    "generate_traffic", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "generate_traffic.py"))
+generate_traffic = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(generate_traffic)
+
+ROW = [2013.5, 42.0, 55.0, 10, 24.98, 121.54]
+
+
+def logged(timestamp, row=ROW):
+    # As written by lambda_api_wrapper/main.py
+    return {"uuid": "x", "timestamp": timestamp, "features": {"data": [row]}, "prediction": [40.1]}
+
+
+def test_parse_record_accepts_logs_payloads_and_rows():
+    assert generate_traffic.parse_record(logged("2024-05-01T00:00:01"))["rows"] == [ROW]
+    assert generate_traffic.parse_record({"data": [ROW, ROW]})["rows"] == [ROW, ROW]
+    assert generate_traffic.parse_record(ROW) == {"timestamp": None, "rows": [ROW]}
+    assert generate_traffic.parse_record({"features": {}}) is None
+
+
+def test_recorded_offsets_follow_timestamps_or_rate(tmp_path):
+    day = tmp_path / "day"
+    day.mkdir()
+    for name, timestamp in (("b.json", "2024-05-01T00:00:03"), ("a.json", "2024-05-01T00:00:05"),
+                            ("c.json", "2024-05-01T00:00:01")):
+        (day / name).write_text(json.dumps(logged(timestamp)))
+
+    # One object per request: key order is not request order
+    assert [r["offset"] for r in generate_traffic.recorded_records(str(day), None)] == [0.0, 2.0, 4.0]
+    assert [r["offset"] for r in generate_traffic.recorded_records(str(day), 4.0)] == [0.0, 0.25, 0.5]
+
+
+def test_shift_spec_parsing_and_ramp():
+    shift = generate_traffic.Shift("X3=scale:2,add:10")
+    assert shift.index == 2
+    assert generate_traffic.Shift("X2 house age=set:1").index == 1
+    with pytest.raises(argparse.ArgumentTypeError):
+        generate_traffic.Shift("X3=multiply:2")
+    with pytest.raises(argparse.ArgumentTypeError):
+        generate_traffic.Shift("X9=add:1")
+
+    row = list(ROW)
+    shift.apply(row, 0.5, random.Random(0))
+    assert row[2] == pytest.approx(55.0 * 1.5 + 5)
+
+    strengths = [generate_traffic.shift_strength(t, start=10, ramp=20) for t in (5, 10, 20, 30, 60)]
+    assert strengths == [0.0, 0.0, 0.5, 1.0, 1.0]
+    assert generate_traffic.shift_strength(10, start=10, ramp=0) == 1.0
+
+
+def test_replay_shifts_only_requests_after_the_start():
+    sent = []
+    records = [{"offset": i, "rows": [list(ROW)]} for i in range(10)]
+    args = argparse.Namespace(shift=[generate_traffic.Shift("X2=add:100")], shift_start=5, shift_ramp=0, seed=0,
+                              concurrency=1, limit=0, speed=1e6, verbose=False, progress_every=1000)
+
+    stats = generate_traffic.replay(records, lambda payload: sent.append(payload) or True, args)
+    assert (stats["sent"], stats["errors"], stats["shifted"]) == (10, 0, 5)
+    assert sorted(payload["data"][0][1] for payload in sent) == [42.0] * 5 + [142.0] * 5
+    # The source records are not modified
+    assert all(record["rows"][0][1] == 42.0 for record in records)
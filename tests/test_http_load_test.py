@@ -0,0 +1,86 @@
+import csv
+import json
+import asyncio
+from io import StringIO
+
+import pytest
+
+from http_load_test import HttpConnection, build_payload, run_mix
+
+
+async def serve(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/invocations"
+
+
+def responder(close=False, chunked=False):
+    # Answers every POST with {"rows": <rows in the body>}, like the serving container
+    async def handle(reader, writer):
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length)
+            rows = len(json.loads(body)["data"]) if body.startswith(b"{") else len(body.splitlines())
+            payload = json.dumps({"rows": rows}).encode()
+            if chunked:
+                writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                             + f"{len(payload):x}\r\n".encode() + payload + b"\r\n0\r\n\r\n")
+            else:
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Length: {len(payload)}\r\n"
+                             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + payload)
+            await writer.drain()
+            if close:
+                break
+        writer.close()
+    return handle
+
+
+def test_payload_mixes():
+    content_type, body, rows = build_payload("batch", 8)
+    assert (content_type, rows, len(json.loads(body)["data"])) == ("application/json", 8, 8)
+    content_type, body, rows = build_payload("csv", 5)
+    assert content_type == "text/csv"
+    assert [len(row) for row in csv.reader(StringIO(body.decode()))] == [6] * 5
+    with pytest.raises(ValueError):
+        build_payload("xml", 1)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_keep_alive_connection_reads_each_response(chunked):
+    async def scenario():
+        server, _ = await serve(responder(chunked=chunked))
+        conn = HttpConnection("127.0.0.1", server.sockets[0].getsockname()[1])
+        _, body, _ = build_payload("batch", 3)
+        responses = [await conn.post("/invocations", body, "application/json") for _ in range(3)]
+        conn.close()
+        server.close()
+        return responses, conn.connects
+
+    responses, connects = asyncio.run(scenario())
+    assert responses == [(200, b'{"rows": 3}')] * 3
+    assert connects == 1
+
+
+@pytest.mark.parametrize("close", [False, True])
+def test_closed_loop_run_reports_throughput_and_connects(close):
+    async def scenario():
+        server, url = await serve(responder(close=close))
+        result, histogram = await run_mix(url, "csv", 4, connections=2, duration=0.3, warmup=0.05)
+        server.close()
+        return result, histogram
+
+    result, histogram = asyncio.run(scenario())
+    assert result["errors"] == 0 and result["requests"] > 10
+    assert result["throughput_rows_per_sec"] == pytest.approx(4 * result["throughput_rps"])
+    assert histogram.total == result["requests"]
+    # Servers that close every connection cost one TCP connect per request
+    if close:
+        assert result["tcp_connects"] >= result["requests"]
+    else:
+        assert result["tcp_connects"] == 2
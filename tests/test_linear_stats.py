@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+import artifact_store
+from dataset_io import read_dataset, write_dataset
+from feature_schema import FEATURE_COLUMNS, TARGET
+from linear_stats import ShardedStats, SufficientStats
+from train import fold_in_shards
+
+
+def synthetic(n, rng):
+    X = np.column_stack([
+        rng.uniform(2012.6, 2013.6, n),
+        rng.uniform(0, 45, n),
+        rng.uniform(20, 6500, n),
+        rng.integers(0, 11, n).astype(np.float64),
+        rng.uniform(24.93, 25.02, n),
+        rng.uniform(121.47, 121.57, n),
+    ])
+    y = X @ np.array([5.0, -0.27, -0.0045, 1.1, 225.0, -12.0]) + rng.normal(0, 7.5, n) - 8000
+    return X, y
+
+
+def assert_same_fit(stats, X, y):
+    coef, intercept = stats.solve()
+    full = LinearRegression().fit(X, y)
+    np.testing.assert_allclose(coef, full.coef_, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(intercept, full.intercept_, rtol=1e-6)
+
+
+def test_fold_in_matches_full_refit():
+    rng = np.random.default_rng(42)
+    batches = [synthetic(n, rng) for n in (5_000, 1, 2_000, 0, 300)]
+
+    stats = SufficientStats.empty(len(FEATURE_COLUMNS))
+    for X, y in batches:
+        stats = stats.merge(SufficientStats.from_data(X, y))
+
+    assert_same_fit(stats, np.vstack([X for X, _ in batches]), np.concatenate([y for _, y in batches]))
+
+
+def test_sharded_stats_round_trip():
+    rng = np.random.default_rng(0)
+    state = ShardedStats(FEATURE_COLUMNS)
+    state.put("a.csv", "d1", SufficientStats.from_data(*synthetic(100, rng)))
+    loaded = ShardedStats.loads(state.dumps(), FEATURE_COLUMNS)
+
+    assert loaded.is_current("a.csv", "d1") and not loaded.is_current("a.csv", "d2")
+    np.testing.assert_allclose(loaded.total().sxx, state.total().sxx)
+
+
+def write_shard(directory, name, X, y):
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    df[TARGET] = y
+    return write_dataset(df, str(directory / name), fmt="csv")
+
+
+def test_fold_in_shards_reuses_refolds_and_drops(tmp_path):
+    rng = np.random.default_rng(1)
+    stats_uri = str(tmp_path / "state" / "linear_stats.json")
+    paths = {name: write_shard(tmp_path, name, *synthetic(500, rng)) for name in ("a", "b", "c")}
+
+    state, folded, reused, dropped = fold_in_shards(list(paths.values()), stats_uri)
+    assert (folded, reused, dropped) == (3, 0, 0)
+    artifact_store.write_bytes(stats_uri, state.dumps())
+
+    # "a" is deleted from the channel and "b" is rewritten: only "b" and "c" may count
+    write_shard(tmp_path, "b", *synthetic(200, rng))
+    state, folded, reused, dropped = fold_in_shards([paths["b"], paths["c"]], stats_uri)
+
+    assert (folded, reused, dropped) == (1, 1, 1)
+    assert sorted(state.shards) == ["b.csv", "c.csv"]
+    # Against a full refit on the same typed rows train.py would read
+    df = pd.concat([read_dataset(paths[name], FEATURE_COLUMNS + [TARGET]) for name in ("b", "c")])
+    assert_same_fit(state.total(), df[FEATURE_COLUMNS].to_numpy(np.float64), df[TARGET].to_numpy(np.float64))
@@ -0,0 +1,67 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import pytest
+
+from load_test import LatencyHistogram, add_common_arguments, evaluate_thresholds, run_open_loop
+
+
+def thresholds(*argv):
+    parser = argparse.ArgumentParser()
+    add_common_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_histogram_percentiles_keep_three_significant_digits():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(3, 1) for _ in range(20_000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (50, 90, 99, 99.9):
+        exact = np.percentile(values, q, method="inverted_cdf")
+        assert histogram.percentile(q) == pytest.approx(exact, rel=2e-3)
+    summary = histogram.summary()
+    assert summary["count"] == len(values)
+    assert summary["max_ms"] == pytest.approx(max(values), abs=1e-3)
+    assert histogram.distribution()[-1][0] == 100
+
+
+def test_merged_histograms_equal_one_recording_everything():
+    rng = random.Random(1)
+    values = [rng.uniform(0.1, 500) for _ in range(5000)]
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.record(value)
+        (first if i % 2 else second).record(value)
+
+    first.merge(second)
+    assert first.summary() == whole.summary()
+    assert first.distribution() == whole.distribution()
+
+
+def test_open_loop_counts_queueing_behind_slow_calls():
+    # 100 rps against a 20 ms service with one slot: a closed loop would report 20 ms for every call
+    result, ok = run_open_loop(lambda: time.sleep(0.02) or True, rate=100, duration=0.3, warmup=0.0,
+                               max_in_flight=1)
+    assert result["issued"] == pytest.approx(30, abs=1)
+    assert result["errors"] == 0
+    assert result["latency"]["p99_ms"] > 150
+    assert result["achieved_rate"] < 0.7 * result["target_rate"]
+
+
+def test_thresholds_report_each_failure():
+    result = {"target_rate": 100, "achieved_rate": 99.0, "error_rate": 0.0,
+              "latency": {"p50_ms": 4.0, "p99_ms": 40.0, "p99.9_ms": 90.0}}
+    assert evaluate_thresholds(result, thresholds("--max-p99-ms", "50")) == []
+
+    failures = evaluate_thresholds(dict(result, achieved_rate=80.0, error_rate=0.02),
+                                   thresholds("--max-p99-ms", "30", "--max-error-rate", "0.01"))
+    assert [f.split()[0] for f in failures] == ["p99_ms", "error_rate", "achieved"]
+
+    # No successful request at all fails a latency limit instead of passing it
+    assert evaluate_thresholds(dict(result, latency={"p50_ms": None, "p99_ms": None, "p99.9_ms": None}),
+                               thresholds("--max-p50-ms", "10"))
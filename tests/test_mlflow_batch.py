@@ -0,0 +1,50 @@
+import threading
+
+from mlflow_batch import (BatchLogger, MAX_ENTITIES_PER_BATCH, MAX_METRICS_PER_BATCH, MAX_PARAMS_PER_BATCH,
+                          MAX_TAGS_PER_BATCH)
+
+
+class RecordingClient:
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+
+    def log_batch(self, run_id, metrics, params, tags):
+        self.gate.wait(5)
+        self.batches.append((run_id, list(metrics), list(params), list(tags)))
+
+
+def test_batches_respect_per_type_and_total_limits():
+    client = RecordingClient()
+    logger = BatchLogger(client, "run-1", flush_interval=60)
+    # The 100th param wakes the worker, whose request then blocks on the gate; meanwhile 1500 metrics
+    # queue up next to the remaining params and tags, so the next batch must split them
+    for i in range(150):
+        logger.log_param(f"p{i}", i)
+        logger.set_tag(f"t{i}", i)
+    for i in range(1500):
+        logger.log_metric(f"m{i}", i)
+    client.gate.set()
+    logger.close()
+
+    for _, metrics, params, tags in client.batches:
+        assert len(metrics) <= MAX_METRICS_PER_BATCH
+        assert len(params) <= MAX_PARAMS_PER_BATCH and len(tags) <= MAX_TAGS_PER_BATCH
+        assert len(metrics) + len(params) + len(tags) <= MAX_ENTITIES_PER_BATCH
+
+    assert sum(len(b[1]) for b in client.batches) == 1500
+    assert sorted(p.key for b in client.batches for p in b[2]) == sorted(f"p{i}" for i in range(150))
+    assert sum(len(b[3]) for b in client.batches) == 150
+    assert logger.items_logged == 1800 and logger.errors == 0
+
+
+def test_close_flushes_small_batches_in_one_request():
+    client = RecordingClient()
+    client.gate.set()
+    with BatchLogger(client, "run-2", flush_interval=60) as logger:
+        logger.log_metrics({"rmse": 1.5, "r2": 0.9})
+        logger.log_params({"mode": "full"})
+        logger.set_tag("family", "linear")
+
+    assert len(client.batches) == 1
+    assert logger.requests_sent == 1
@@ -0,0 +1,70 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import joblib
+import numpy as np
+import pytest
+
+import model_cache
+from model_cache import ModelCache, ModelWatcher, UnknownModelVersion, file_version
+
+
+def test_manifest_watcher_does_not_reload_the_model_it_started_with(tmp_path):
+    model_path = tmp_path / "model.pkl"
+    joblib.dump({"coef": [1.0]}, model_path)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"version": "v1", "model_uri": str(model_path)}))
+
+    reloads = []
+    watcher = ModelWatcher(0, lambda model, version: reloads.append(version), manifest_uri=str(manifest))
+    watcher.start(str(model_path), file_version(model_path))
+    assert watcher.version == "v1"
+    assert watcher.poll() is False
+
+    manifest.write_text(json.dumps({"version": "v2", "model_uri": str(model_path)}))
+    assert watcher.poll() is True
+    assert reloads == ["v2"]
+
+
+def cache_of(tmp_path, versions, max_bytes):
+    for version in versions:
+        (tmp_path / version).mkdir()
+        joblib.dump(np.zeros(100_000), tmp_path / version / "model.pkl")  # 800 kB in memory
+    return ModelCache(str(tmp_path), max_bytes, download_dir=str(tmp_path / "downloads"))
+
+
+def test_cache_evicts_least_recently_used_by_memory(tmp_path):
+    cache = cache_of(tmp_path, ["v1", "v2", "v3"], max_bytes=2_000_000)
+    cache.get("v1")
+    cache.get("v2")
+    cache.get("v1")
+    cache.get("v3")
+
+    assert list(cache.entries) == ["v1", "v3"]
+    assert all(size >= 800_000 for _, size in cache.entries.values())
+    assert cache.stats["v2"].evictions == 1
+    assert cache.stats["v1"].hits == 1
+
+
+def test_concurrent_misses_load_once(tmp_path, monkeypatch):
+    cache = cache_of(tmp_path, ["v1"], max_bytes=10_000_000)
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.1)
+        return joblib.load(path)
+    monkeypatch.setattr(model_cache, "joblib", SimpleNamespace(load=slow_load))
+
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(lambda _: cache.get("v1"), range(8)))
+    assert len(loads) == 1
+    assert all(m is models[0] for m in models)
+    assert cache.stats["v1"].hits == 7
+    assert cache._loading == {}
+
+    with pytest.raises(UnknownModelVersion):
+        cache.get("v9")
+    assert cache._loading == {}
@@ -0,0 +1,47 @@
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from model_perf import PERF_METRICS, benchmark_model, check_regressions
+
+PRODUCTION = {"latency_p50_ms": 0.4, "latency_p99_ms": 2.0, "throughput_rows_per_sec": 100_000.0,
+              "load_time_ms": 20.0, "artifact_mb": 0.5}
+
+
+def test_benchmark_reports_every_perf_metric(tmp_path):
+    X = pd.DataFrame(np.random.default_rng(0).normal(size=(200, 3)), columns=["a", "b", "c"])
+    model_file = tmp_path / "model.pkl"
+    joblib.dump(LinearRegression().fit(X, X["a"]), model_file)
+
+    perf = benchmark_model(model_file, model_file, X, single_row_iters=50, warmup=5, batch_size=100, batch_repeat=2)
+    assert set(perf) == set(PERF_METRICS)
+    assert perf["latency_p50_ms"] <= perf["latency_p90_ms"] <= perf["latency_p99_ms"]
+    assert all(value > 0 for value in perf.values())
+
+
+def test_small_regressions_within_slack_pass():
+    # 1 ms of absolute slack: sub-millisecond latencies may double without failing
+    ok, checks = check_regressions(dict(PRODUCTION, latency_p50_ms=1.2, throughput_rows_per_sec=70_000.0),
+                                   PRODUCTION)
+    assert ok
+    assert checks["latency_p50_ms"]["limit"] == 1.4
+
+
+def test_regressions_fail_their_check():
+    ok, checks = check_regressions(dict(PRODUCTION, latency_p99_ms=3.5, throughput_rows_per_sec=50_000.0),
+                                   PRODUCTION)
+    assert not ok
+    assert [name for name, check in checks.items() if not check["ok"]] == ["latency_p99_ms",
+                                                                            "throughput_rows_per_sec"]
+
+    # A looser throughput limit lets a slower model through
+    ok, _ = check_regressions(dict(PRODUCTION, throughput_rows_per_sec=50_000.0), PRODUCTION,
+                              min_throughput_ratio=0.4)
+    assert ok
+
+
+def test_missing_baseline_passes():
+    ok, checks = check_regressions(dict(PRODUCTION, latency_p99_ms=50.0), {"latency_p99_ms": None})
+    assert ok
+    assert checks["latency_p99_ms"]["limit"] is None
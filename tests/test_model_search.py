@@ -0,0 +1,28 @@
+import numpy as np
+
+from model_search import SEARCH_SPACE, run_search
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 10, (n, 6))
+    return X, X @ np.arange(1, 7) + rng.normal(0, 0.5, n)
+
+
+def test_search_picks_a_finished_candidate():
+    X, y = synthetic(300)
+    space = {k: SEARCH_SPACE[k] for k in ("linear", "ridge")}
+    best, candidates = run_search(X, y, search_space=space, cv_folds=3, n_jobs=2)
+
+    assert best["status"] == "completed"
+    assert best["cv_rmse"] == min(c["cv_rmse"] for c in candidates if c["cv_rmse"] is not None)
+
+
+def test_exhausted_budget_falls_back_to_linear_regression():
+    X, y = synthetic(20_000)
+    space = {"random_forest": SEARCH_SPACE["random_forest"]}
+    best, candidates = run_search(X, y, search_space=space, cv_folds=3, n_jobs=2, time_budget=0.0)
+
+    assert best["status"] == "fallback"
+    assert best["family"] == "linear" and best["params"] == {} and best["cv_rmse"] is None
+    assert all(c["status"] == "timeout" for c in candidates)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from dataset_io import list_dataset_files, load_shards
+from feature_schema import FEATURE_COLUMNS, TARGET
+from preprocess import run_streaming, split_by_key
+
+
+def raw_dataset(n):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(1, 100, size=(n, len(FEATURE_COLUMNS) + 1)), columns=FEATURE_COLUMNS + [TARGET])
+    df["X4 number of convenience stores"] = rng.integers(0, 10, n)
+    df.insert(0, "No", np.arange(1, n + 1))
+    return df
+
+
+def test_hash_split_is_disjoint_and_independent_of_chunking():
+    df = raw_dataset(2000)
+    train, test = split_by_key(df, "No", 0.2)
+
+    assert set(train["No"]).isdisjoint(test["No"])
+    assert len(train) + len(test) == len(df)
+    assert 0.15 < len(test) / len(df) < 0.25
+
+    chunked = [split_by_key(df.iloc[i:i + 300], "No", 0.2)[1] for i in range(0, len(df), 300)]
+    assert set(pd.concat(chunked)["No"]) == set(test["No"])
+
+    # Rows already in the dataset keep their split as it grows
+    _, smaller_test = split_by_key(df.iloc[:1000], "No", 0.2)
+    assert set(smaller_test["No"]) == set(test["No"][test["No"] <= 1000])
+
+
+def test_split_without_id_hashes_the_whole_row():
+    df = raw_dataset(500).drop(columns=["No"])
+    _, test = split_by_key(df, "No", 0.2)
+    _, again = split_by_key(df.sample(frac=1, random_state=1), "No", 0.2)
+    assert set(test.index) == set(again.index)
+
+
+def test_streaming_writes_one_shard_per_chunk(tmp_path):
+    source = tmp_path / "real_estate.csv"
+    raw_dataset(1000).to_csv(source, index=False)
+    (tmp_path / "train").mkdir()
+    (tmp_path / "test").mkdir()
+
+    run_streaming(str(source), str(tmp_path), chunk_size=300, key_column="No", test_size=0.2, fmt="csv")
+
+    train_files = list_dataset_files(str(tmp_path / "train"))
+    test_files = list_dataset_files(str(tmp_path / "test"))
+    assert len(train_files) == len(test_files) == 4
+    train, _ = load_shards(train_files)
+    test, _ = load_shards(test_files)
+    assert len(train) + len(test) == 1000
+    assert list(train.columns) == FEATURE_COLUMNS + [TARGET]
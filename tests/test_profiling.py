@@ -0,0 +1,56 @@
+import time
+
+from profiling import Profiler, collapse
+
+kept = []
+
+
+def busy(seconds=0.03):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def allocate():
+    kept.append([bytearray(1024) for _ in range(100)])
+
+
+def read_profile(directory, mode):
+    files = list(directory.glob(f"*/*.{mode}.collapsed"))
+    assert len(files) == 1
+    lines = [line.rsplit(" ", 1) for line in files[0].read_text().splitlines()]
+    return {stack: int(count) for stack, count in lines}
+
+
+def test_collapse_joins_outermost_first():
+    assert collapse([busy.__code__, allocate.__code__]) == "test_profiling.py:busy;test_profiling.py:allocate"
+
+
+def test_only_every_nth_call_is_sampled(tmp_path):
+    profiler = Profiler("serving", every_n=3, modes=["cpu"], interval=0.001, output=str(tmp_path))
+    call = profiler.profiled_call()(busy)
+    for _ in range(6):
+        call()
+    assert (profiler.requests, profiler.profiled) == (6, 2)
+
+    profiler.flush()
+    stacks = read_profile(tmp_path, "cpu")
+    assert any(stack.endswith("test_profiling.py:busy") for stack in stacks)
+    # At most one sample per millisecond of the two profiled calls (the busy loop holds the GIL)
+    assert 0 < sum(stacks.values()) <= 60
+
+
+def test_allocations_are_attributed_to_their_stack(tmp_path):
+    profiler = Profiler("monitoring", every_n=1, modes=["alloc"], output=str(tmp_path))
+    profiler.profiled_call(flush=True)(allocate)()
+
+    stacks = read_profile(tmp_path, "alloc")
+    assert sum(size for stack, size in stacks.items() if "test_profiling.py" in stack) >= 100 * 1024
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = Profiler("serving", every_n=0, output=str(tmp_path))
+    assert not profiler.enabled
+    profiler.profiled_call(flush=True)(busy)(0.001)
+    assert profiler.profiled == 0
+    assert not list(tmp_path.iterdir())
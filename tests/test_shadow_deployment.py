@@ -0,0 +1,112 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import deployment_state
+import mlflow_registry
+from deployment_history import DeploymentHistory
+from deployment_state import SHADOW_VARIANT
+from test_deployment_state import throttled
+
+ENDPOINT = "real-estate-endpoint-test"
+ROLE_ARN = "arn:aws:iam::123456789012:role/SageMakerExecutionRole-test"
+GROUP = "RealEstateModelGroup-test"
+CHAMPION_ARN = f"arn:aws:sagemaker:eu-north-1:123456789012:model-package/{GROUP}/1"
+CHALLENGER_ARN = f"arn:aws:sagemaker:eu-north-1:123456789012:model-package/{GROUP}/2"
+HEALTH_CHECK = {"endpoint_name": ENDPOINT, "role_arn": ROLE_ARN}
+
+
+@pytest.fixture
+def aliases(monkeypatch):
+    calls = []
+    monkeypatch.setattr(mlflow_registry, "set_alias", lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.fixture
+def deploy_lambda(load_lambda, sagemaker, application_autoscaling, aliases, monkeypatch):
+    # Config and model names carry the start time; one second per call keeps the decisions' names apart
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(deployment_state, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    monkeypatch.setenv("MODEL_PACKAGE_GROUP_NAME", GROUP)
+    history = DeploymentHistory()
+    history.record_deployment(ENDPOINT, "config-old", "model-old", CHAMPION_ARN, "create")
+    history.reconcile(ENDPOINT, "config-old", "InService")
+    sagemaker.create_endpoint_config(EndpointConfigName="config-old", ProductionVariants=[
+        {"VariantName": "AllTraffic", "ModelName": "model-old", "InitialInstanceCount": 1,
+         "InstanceType": "ml.m5.large"}])
+    sagemaker.serve(ENDPOINT, "config-old")
+    sagemaker.packages = {CHAMPION_ARN: "Approved", CHALLENGER_ARN: "PendingManualApproval"}
+
+    handler = load_lambda("deploy_lambda")
+    handler.sm, handler.aas = sagemaker, application_autoscaling
+
+    # The pipeline's DeployToSageMaker step in shadow mode
+    result = handler.lambda_handler(dict(HEALTH_CHECK, model_package_arn=CHALLENGER_ARN, deployment_mode="shadow",
+                                         mlflow_model_version="7", rmse=6.1), None)
+    assert (result["action"], result["phase"]) == ("shadow", "WAIT_IN_SERVICE")
+    sagemaker.settle(ENDPOINT)
+    assert handler.lambda_handler(HEALTH_CHECK, None)["status"] == "deployed"
+    return handler
+
+
+def test_shadow_transitions_skip_deployment_guardrails(deploy_lambda, sagemaker):
+    # Blue/green with alarm rollback is rejected for multi-variant endpoints
+    deploy_lambda.lambda_handler(dict(HEALTH_CHECK, shadow_decision="promote"), None)
+    sagemaker.settle(ENDPOINT)
+    assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["status"] == "deployed"
+
+    shadow, promote = sagemaker.called("UpdateEndpoint")
+    assert "DeploymentConfig" not in shadow and "DeploymentConfig" not in promote
+
+
+def test_challenger_is_not_production_during_shadow(deploy_lambda, sagemaker, aliases):
+    shadow_config = sagemaker.describe_endpoint(EndpointName=ENDPOINT)["EndpointConfigName"]
+    variants = sagemaker.configs[shadow_config]["ProductionVariants"]
+    assert [v["VariantName"] for v in variants] == ["AllTraffic", SHADOW_VARIANT]
+
+    assert sagemaker.packages[CHALLENGER_ARN] == "PendingManualApproval"
+    assert aliases == []
+    # The repair path still finds the champion
+    assert deploy_lambda.get_latest_approved_model_package(GROUP) == CHAMPION_ARN
+
+
+def test_promote_approves_and_moves_the_alias(deploy_lambda, sagemaker, aliases):
+    sagemaker.update_endpoint = throttled(sagemaker.update_endpoint, times=1)
+    result = deploy_lambda.lambda_handler(dict(HEALTH_CHECK, shadow_decision="promote"), None)
+    assert (result["action"], result["phase"]) == ("promote", "UPDATE_ENDPOINT")
+
+    # Resumed from DynamoDB by the health checks
+    assert deploy_lambda.lambda_handler(HEALTH_CHECK, None)["phase"] == "WAIT_IN_SERVICE"
+    assert sagemaker.packages[CHALLENGER_ARN] == "PendingManualApproval"
+    sagemaker.settle(ENDPOINT)
+    result = deploy_lambda.lambda_handler(HEALTH_CHECK, None)
+    assert result["status"] == "deployed"
+
+    variants = sagemaker.configs[result["config"]]["ProductionVariants"]
+    assert [(v["VariantName"], sagemaker.models[v["ModelName"]]["PrimaryContainer"]["ModelPackageName"])
+            for v in variants] == [("AllTraffic", CHALLENGER_ARN)]
+    assert sagemaker.packages[CHALLENGER_ARN] == "Approved"
+    assert aliases == [("RealEstateModel", "Production", "7")]
+    assert deploy_lambda.get_latest_approved_model_package(GROUP) == CHALLENGER_ARN
+
+
+def test_abort_rejects_the_challenger(deploy_lambda, sagemaker, aliases):
+    result = deploy_lambda.lambda_handler(dict(HEALTH_CHECK, shadow_decision="abort"), None)
+    assert (result["action"], result["phase"]) == ("deploy", "WAIT_IN_SERVICE")
+    assert sagemaker.packages[CHALLENGER_ARN] == "Rejected"
+    assert "DeploymentConfig" not in sagemaker.called("UpdateEndpoint")[-1]
+
+    sagemaker.settle(ENDPOINT)
+    result = deploy_lambda.lambda_handler(HEALTH_CHECK, None)
+    assert result["status"] == "deployed"
+    variants = sagemaker.configs[result["config"]]["ProductionVariants"]
+    assert [sagemaker.models[v["ModelName"]]["PrimaryContainer"]["ModelPackageName"] for v in variants] \
+        == [CHAMPION_ARN]
+
+    assert aliases == []
+    assert deploy_lambda.get_latest_approved_model_package(GROUP) == CHAMPION_ARN
+
+    with pytest.raises(ValueError, match="not a shadow deployment"):
+        deploy_lambda.lambda_handler(dict(HEALTH_CHECK, shadow_decision="abort"), None)